@@ -0,0 +1,242 @@
+# benchmarks.py
+#
+# Offline benchmark suite over the hot paths: the backtrader indicators and
+# strategies, the vector engine and batch grid sweep, the pair screeners and
+# the SimpleStrategies kernels and simulators. All inputs come from the
+# seeded generators in synthetic.py, so runs are repeatable without network
+# access.
+#
+# Each case records its best wall time over `repeat` runs, peak traced memory
+# (a separate run under tracemalloc, which slows Python code down) and bars
+# processed per second. Results are written to JSON and can be compared
+# against a stored baseline:
+#
+#   python benchmarks.py --output baseline.json
+#   python benchmarks.py --baseline baseline.json --output latest.json
+#   python benchmarks.py --bars 1000 100000 10000000 --cases kernels portfolio
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from indicators import VWAP, AnchoredVWAP, ConnorsRSI
+from strategies import MeanReversionStrategy, TrendFollowingStrategy, BreakoutStrategy, CombinedStrategy
+from event_log import NullSink
+from grid_search import all_combinations, run_batch, run_backtest
+from indicator_cache import IndicatorCache
+import vector_engine
+from monte_carlo import simulate_paths
+from synthetic import synthetic_ohlcv, synthetic_universe
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'SimpleStrategies'))
+from pair_screener import pairs_below
+from rolling_correlation import crossing_events
+import kernels
+from pair_engine import spread_matrix, backtest_pairs
+from portfolio import simulate
+
+# Strategy that only builds the indicator under test
+class IndicatorOnly(bt.Strategy):
+    params = (('indicator', VWAP), ('kwargs', {}))
+
+    def __init__(self):
+        self.indicator = self.params.indicator(self.data, **self.params.kwargs)
+
+def _cerebro(data, strategy, **kwargs):
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=data))
+    cerebro.addstrategy(strategy, **kwargs)
+    return cerebro
+
+# Cases. Each takes the benchmark sizes, builds its inputs (not timed) and
+# returns (run, bars processed per run); run() is the timed call.
+
+def _indicator_case(indicator, **kwargs):
+    def case(bars, tickers, seed, grid_points):
+        data = synthetic_ohlcv(bars, seed=seed, freq='min')
+        return lambda: _cerebro(data, IndicatorOnly, indicator=indicator, kwargs=kwargs).run(), bars
+    return case
+
+def _strategy_case(strategy):
+    def case(bars, tickers, seed, grid_points):
+        data = synthetic_ohlcv(bars, seed=seed)
+        return lambda: _cerebro(data, strategy, event_sink=NullSink()).run(), bars
+    return case
+
+def _vector_backtest(bars, tickers, seed, grid_points):
+    data = synthetic_ohlcv(bars, seed=seed)
+    return lambda: vector_engine.backtest(data), bars
+
+def _grid_sweep(bars, tickers, seed, grid_points):
+    data = synthetic_ohlcv(bars, seed=seed)
+    combinations = all_combinations.sample(grid_points, seed)
+    return lambda: run_batch(combinations, data), bars * len(combinations)
+
+# The same sweep through Cerebro, run_backtest per combination sharing one
+# indicator cache as grid_search does. Capped at BACKTRADER_GRID_POINTS
+# combinations since each is a full Cerebro run.
+BACKTRADER_GRID_POINTS = 8
+
+def _backtrader_sweep(bars, tickers, seed, grid_points):
+    data = synthetic_ohlcv(bars, seed=seed)
+    combinations = all_combinations.sample(min(grid_points, BACKTRADER_GRID_POINTS), seed)
+
+    def run():
+        indicator_cache = IndicatorCache()
+        for param_comb in combinations:
+            run_backtest(param_comb, data, indicator_cache)
+    return run, bars * len(combinations)
+
+# One bootstrapped path per ticker
+def _monte_carlo(bars, tickers, seed, grid_points):
+    data = synthetic_ohlcv(bars, seed=seed)
+    return lambda: simulate_paths(data, n_paths=tickers, seed=seed), bars * tickers
+
+def _returns(bars, tickers, seed):
+    return synthetic_universe(tickers, bars + 1, seed=seed).pct_change().iloc[1:]
+
+def _pair_screener(bars, tickers, seed, grid_points):
+    returns = _returns(bars, tickers, seed)
+    return lambda: pairs_below(returns, -0.1), bars * tickers
+
+def _rolling_correlation(bars, tickers, seed, grid_points):
+    returns = _returns(bars, tickers, seed)
+    return lambda: crossing_events(returns, 60, -0.1), bars * tickers
+
+def _connors_rsi_kernel(bars, tickers, seed, grid_points):
+    close = synthetic_universe(tickers, bars, seed=seed).to_numpy().T
+    return lambda: kernels.connors_rsi(close, 3, 2, 100), bars * tickers
+
+def _pair_engine(bars, tickers, seed, grid_points):
+    prices = synthetic_universe(tickers, bars, seed=seed)
+    columns = list(prices.columns)
+    spreads = spread_matrix(prices, list(zip(columns[0::2], columns[1::2])))
+    return lambda: backtest_pairs(spreads, z_entry=2.0, zscore_window=60), bars * spreads.shape[1]
+
+def _portfolio(bars, tickers, seed, grid_points):
+    close = synthetic_universe(tickers, bars, seed=seed).to_numpy()
+    buy_signal = (np.random.default_rng(seed).random(close.shape) < 0.02).astype(int)
+    return lambda: simulate(close, buy_signal), bars * tickers
+
+CASES = {
+    'indicator.VWAP': _indicator_case(VWAP),
+    'indicator.VWAP_20': _indicator_case(VWAP, period=20),
+    'indicator.AnchoredVWAP': _indicator_case(AnchoredVWAP, band_dev=2.0),
+    'indicator.ConnorsRSI': _indicator_case(ConnorsRSI),
+    'strategy.MeanReversionStrategy': _strategy_case(MeanReversionStrategy),
+    'strategy.TrendFollowingStrategy': _strategy_case(TrendFollowingStrategy),
+    'strategy.BreakoutStrategy': _strategy_case(BreakoutStrategy),
+    'strategy.CombinedStrategy': _strategy_case(CombinedStrategy),
+    'vector.backtest': _vector_backtest,
+    'grid.batch': _grid_sweep,
+    'grid.backtrader': _backtrader_sweep,
+    'vector.monte_carlo': _monte_carlo,
+    'correlation.pair_screener': _pair_screener,
+    'correlation.rolling': _rolling_correlation,
+    'kernels.connors_rsi': _connors_rsi_kernel,
+    'pairs.backtest_pairs': _pair_engine,
+    'portfolio.simulate': _portfolio,
+}
+
+# Best wall time over `repeat` runs and, optionally, peak traced memory of one more run
+def measure(run, bars, repeat=3, memory=True):
+    wall = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        wall = min(wall, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        'bars': bars,
+        'wall_seconds': wall,
+        'peak_mb': None if peak is None else peak / 2 ** 20,
+        'bars_per_second': bars / wall if wall > 0 else float('inf'),
+    }
+
+# Run the selected cases (substring match on the name; None runs all) at each
+# bar count. Results are keyed 'name@bars'.
+def run_benchmarks(bar_counts=(5_000,), tickers=50, seed=0, grid_points=243, repeat=3, memory=True, cases=None):
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'backtrader': bt.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'tickers': tickers,
+            'seed': seed,
+            'grid_points': grid_points,
+            'repeat': repeat,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'cases': {},
+    }
+    for name, case in CASES.items():
+        if cases and not any(pattern in name for pattern in cases):
+            continue
+        for n_bars in bar_counts:
+            run, bars = case(n_bars, tickers, seed, grid_points)
+            row = measure(run, bars, repeat, memory)
+            results['cases'][f'{name}@{n_bars}'] = row
+            peak = '-' if row['peak_mb'] is None else f"{row['peak_mb']:.1f}"
+            print(f"{name + '@' + str(n_bars):<42} {row['wall_seconds']:10.4f}s {peak:>10} MB "
+                  f"{row['bars_per_second']:14,.0f} bars/s")
+    return results
+
+# Cases slower than the baseline by more than `threshold` (a ratio of wall
+# times). Prints one line per case present in both runs.
+def compare(results, baseline, threshold=1.25):
+    regressions = []
+    for key, row in results['cases'].items():
+        if key not in baseline['cases']:
+            continue
+        base = baseline['cases'][key]
+        ratio = row['wall_seconds'] / base['wall_seconds'] if base['wall_seconds'] > 0 else float('inf')
+        memory = ''
+        if row['peak_mb'] is not None and base.get('peak_mb'):
+            memory = f", memory x{row['peak_mb'] / base['peak_mb']:.2f}"
+        flag = 'REGRESSION' if ratio > threshold else ''
+        print(f"{key:<42} time x{ratio:.2f}{memory} {flag}")
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the offline benchmark suite.')
+    parser.add_argument('--bars', type=int, nargs='+', default=[5_000], help='bar counts to run every case at')
+    parser.add_argument('--tickers', type=int, default=50, help='universe size for the multi-ticker cases')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--grid-points', type=int, default=243, help='parameter sets in the grid sweep')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--cases', nargs='+', help='only run cases whose name contains one of these')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.bars, args.tickers, args.seed, args.grid_points, args.repeat,
+                             not args.no_memory, args.cases)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            sys.exit(1)
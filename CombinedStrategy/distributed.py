@@ -0,0 +1,427 @@
+# distributed.py
+#
+# Coordinator/worker mode for sweeping CombinedStrategy over (ticker,
+# parameter combination) tasks on any number of machines.
+#
+# The coordinator serves a work queue over plain TCP, one JSON object per
+# line. Workers lease a few tasks at a time, run them with
+# grid_search.run_backtest and report each task's metrics. A worker sends a
+# heartbeat every few seconds from a separate thread; when one goes silent
+# for lease_seconds its unfinished tasks go back on the queue for the other
+# workers (a task whose lease expires max_attempts times is recorded as
+# failed). The first result for a task wins, so a worker that was only slow
+# does no harm when it reports late. A worker that cannot load a ticker's
+# data gives its tasks back; once a ticker has failed max_attempts times its
+# remaining tasks are recorded as failed.
+#
+# The coordinator commits results to a results_store.ResultsStore as they
+# arrive, keyed by (ticker, *combination). Restarting it on the same store
+# skips every task already done and retries the failed ones.
+#
+#   python distributed.py coordinator tickers.txt --store sweep.sqlite --host 0.0.0.0 --port 9100
+#   python distributed.py worker coordinator-host:9100       (on every machine, as many as it has cores)
+#   python distributed.py demo --workers 4 --tickers 6 --kill 1 [--market-data]
+
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import zlib
+from collections import defaultdict, deque
+import pandas as pd
+from main import fetch_data
+from market_data import MarketDataStore, LocalDirectoryProvider
+from grid_search import all_combinations, run_backtest
+from indicator_cache import IndicatorCache
+from results_store import ResultsStore
+from synthetic import synthetic_ohlcv
+from telemetry import Progress
+from universe import read_tickers
+from parameters import START_DATE, END_DATE
+
+# Work queue and lease bookkeeping; thread-safe, transport-agnostic
+class Coordinator:
+    def __init__(self, tasks, sweep, lease_seconds=30.0, max_attempts=3):
+        self.tasks = list(tasks)
+        self.sweep = sweep
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.results = queue.Queue()  # (task id, row) in completion order
+        self.reissued = 0
+        self._lock = threading.Lock()
+        self._pending = deque(range(len(self.tasks)))
+        self._leases = {}  # task id -> worker
+        self._deadlines = {}  # worker -> time its leases expire
+        self._attempts = [0] * len(self.tasks)
+        self._load_failures = defaultdict(int)  # ticker -> data load failures
+        self._done = set()
+
+    @property
+    def finished(self):
+        return len(self._done) == len(self.tasks)
+
+    def _complete(self, task, row):
+        self._done.add(task)
+        self._leases.pop(task, None)
+        self.results.put((task, row))
+
+    # Return the tasks of workers whose heartbeats stopped to the queue
+    def expire(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for worker, deadline in list(self._deadlines.items()):
+                if deadline >= now:
+                    continue
+                del self._deadlines[worker]
+                for task in [task for task, holder in self._leases.items() if holder == worker]:
+                    del self._leases[task]
+                    if self._attempts[task] >= self.max_attempts:
+                        self._complete(task, {'status': 'error',
+                                              'error': f'lease expired {self._attempts[task]} times'})
+                    else:
+                        self._pending.appendleft(task)
+                        self.reissued += 1
+
+    def heartbeat(self, worker):
+        with self._lock:
+            self._deadlines[worker] = time.monotonic() + self.lease_seconds
+
+    def lease(self, worker, n=1):
+        self.expire()
+        self.heartbeat(worker)
+        leased = []
+        with self._lock:
+            while self._pending and len(leased) < n:
+                task = self._pending.popleft()
+                if task in self._done:
+                    continue
+                self._attempts[task] += 1
+                self._leases[task] = worker
+                ticker, param_comb = self.tasks[task]
+                leased.append([task, ticker, list(param_comb)])
+        return leased
+
+    def complete(self, worker, task, row):
+        with self._lock:
+            if task not in self._done:
+                self._complete(task, row)
+
+    # A worker could not load the data for `tasks` (all of one ticker): put
+    # them at the back of the queue, or fail every remaining task of the
+    # ticker once it has failed max_attempts times
+    def release(self, worker, tasks, error):
+        with self._lock:
+            for task in tasks:
+                if self._leases.get(task) == worker:
+                    del self._leases[task]
+                    self._attempts[task] -= 1
+                    self._pending.append(task)
+            if not tasks:
+                return
+            ticker = self.tasks[tasks[0]][0]
+            self._load_failures[ticker] += 1
+            if self._load_failures[ticker] >= self.max_attempts:
+                for task, (task_ticker, _) in enumerate(self.tasks):
+                    if task_ticker == ticker and task not in self._done:
+                        self._complete(task, {'status': 'error', 'error': error})
+
+    # Reply to one protocol message
+    def handle(self, message):
+        op = message.get('op')
+        worker = message.get('worker')
+        if op == 'lease':
+            tasks = self.lease(worker, message.get('n', 1))
+            return {'sweep': self.sweep, 'tasks': tasks, 'done': not tasks and self.finished,
+                    'lease_seconds': self.lease_seconds}
+        if op == 'heartbeat':
+            self.heartbeat(worker)
+            return {'ok': True}
+        if op == 'result':
+            self.complete(worker, message['task'], message['row'])
+            return {'ok': True}
+        if op == 'release':
+            self.release(worker, message['tasks'], message.get('error', ''))
+            return {'ok': True}
+        return {'error': f'unknown op: {op}'}
+
+    # Serve the protocol on (host, port) from background threads; port=0 picks a free one
+    def serve(self, host='127.0.0.1', port=0):
+        server = _Server((host, port), _Handler)
+        server.coordinator = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            reply = self.server.coordinator.handle(json.loads(line))
+            self.wfile.write((json.dumps(reply) + '\n').encode())
+
+# Sweep settings sent to every worker with its leases. source is a directory
+# of <ticker>.csv/.parquet files read through the workers' market data
+# stores instead of Yahoo Finance.
+def sweep_settings(start=START_DATE, end=END_DATE, backend='vector', synthetic_bars=None, source=None):
+    return {'start': start, 'end': end, 'backend': backend, 'synthetic_bars': synthetic_bars, 'source': source}
+
+# Run the coordinator until every (ticker, combination) task has a result in
+# `store` (a ResultsStore or a path). on_ready(port) is called once the
+# server is listening and on_result(done, total) after each stored result.
+# Returns the store's results table.
+def coordinate(tickers, combinations, store, sweep=None, host='127.0.0.1', port=0, lease_seconds=30.0,
+               max_attempts=3, on_ready=None, on_result=None):
+    sweep = sweep_settings() if sweep is None else sweep
+    if isinstance(store, str):
+        store = ResultsStore(store, sweep=sweep)
+    done = store.completed()
+    tickers = list(dict.fromkeys(tickers))
+    combinations = list(combinations)
+    tasks = [(ticker, tuple(param_comb)) for ticker in tickers for param_comb in combinations
+             if (ticker, *param_comb) not in done]
+    coordinator = Coordinator(tasks, sweep, lease_seconds, max_attempts)
+    server = coordinator.serve(host, port)
+    port = server.server_address[1]
+    print(f"Coordinator listening on {host}:{port}: {len(tasks)} tasks, "
+          f"{len(tickers) * len(combinations) - len(tasks)} already in {store.path}")
+    if on_ready is not None:
+        on_ready(port)
+
+    progress = Progress(len(tasks), label='tasks')
+    received = 0
+    try:
+        while received < len(tasks):
+            try:
+                task, row = coordinator.results.get(timeout=1.0)
+            except queue.Empty:
+                coordinator.expire()
+                continue
+            ticker, param_comb = coordinator.tasks[task]
+            store.add((ticker, *param_comb), row)
+            received += 1
+            progress.update()
+            if on_result is not None:
+                on_result(received, len(tasks))
+    finally:
+        server.shutdown()
+        server.server_close()
+    if coordinator.reissued:
+        print(f"{coordinator.reissued} tasks re-issued after their worker stopped responding")
+    return store.results()
+
+def _request(stream, message):
+    stream.write(json.dumps(message) + '\n')
+    stream.flush()
+    line = stream.readline()
+    if not line:
+        raise ConnectionError('coordinator closed the connection')
+    return json.loads(line)
+
+def _connect(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return socket.create_connection((host, port))
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+_source_stores = {}
+
+# One ticker's bars for a sweep: the market data store, or synthetic bars
+# seeded from the ticker name when the sweep sets synthetic_bars
+def load_ticker(ticker, sweep):
+    if sweep.get('synthetic_bars'):
+        return synthetic_ohlcv(sweep['synthetic_bars'], seed=zlib.crc32(ticker.encode()))
+    store = None
+    if sweep.get('source'):
+        if sweep['source'] not in _source_stores:
+            _source_stores[sweep['source']] = MarketDataStore(provider=LocalDirectoryProvider(sweep['source']))
+        store = _source_stores[sweep['source']]
+    data = fetch_data(ticker, start=sweep['start'], end=sweep['end'], store=store)
+    if data.empty:
+        raise ValueError(f"No data for {ticker} between {sweep['start']} and {sweep['end']}")
+    return data
+
+# load_ticker, tried `attempts` times with a growing pause in between
+def _load_with_retries(ticker, sweep, attempts=3, pause=1.0):
+    for attempt in range(attempts):
+        try:
+            return load_ticker(ticker, sweep)
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(pause * (attempt + 1))
+
+# Result row for one task; failures become error rows, as in universe.py
+def run_task(ticker, param_comb, data, sweep, indicator_cache=None):
+    try:
+        metrics, _ = run_backtest(tuple(param_comb), data, indicator_cache, sweep['backend'])
+        del metrics['params']
+        return {'status': 'ok', 'error': '', 'bars': len(data), **metrics}
+    except Exception as exc:
+        return {'status': 'error', 'error': ''.join(traceback.format_exception_only(type(exc), exc)).strip()}
+
+def _heartbeats(host, port, worker, interval, stop):
+    try:
+        with _connect(host, port, 10.0) as connection, connection.makefile('rw') as stream:
+            while not stop.wait(interval):
+                _request(stream, {'op': 'heartbeat', 'worker': worker})
+    except OSError:
+        # ConnectionError included: the coordinator is gone and so is the need for leases
+        pass
+
+# Lease, run and report tasks until the coordinator has none left. The last
+# ticker's data and an indicator cache are kept between tasks; the
+# coordinator hands out a ticker's combinations together. When a ticker's
+# data cannot be loaded the tasks leased for it are given back; the failure
+# is not remembered, so the next lease of that ticker loads it again.
+def work(host, port, worker=None, batch=1, poll=0.5, connect_timeout=30.0):
+    worker = worker or f'{socket.gethostname()}-{os.getpid()}'
+    stop = threading.Event()
+    completed = 0
+    loaded = (None, None)
+    indicator_cache = IndicatorCache()
+    try:
+        with _connect(host, port, connect_timeout) as connection, connection.makefile('rw') as stream:
+            reply = _request(stream, {'op': 'lease', 'worker': worker, 'n': batch})
+            interval = reply['lease_seconds'] / 3
+            threading.Thread(target=_heartbeats, args=(host, port, worker, interval, stop), daemon=True).start()
+            while not reply['done']:
+                sweep = reply['sweep']
+                if not reply['tasks']:
+                    time.sleep(poll)
+                failed = None
+                for task, ticker, param_comb in reply['tasks']:
+                    if loaded[0] != ticker and failed != ticker:
+                        try:
+                            loaded = (ticker, _load_with_retries(ticker, sweep))
+                        except Exception as exc:
+                            failed = ticker
+                            error = ''.join(traceback.format_exception_only(type(exc), exc)).strip()
+                            released = [t for t, t_ticker, _ in reply['tasks'] if t_ticker == ticker]
+                            _request(stream, {'op': 'release', 'worker': worker, 'tasks': released, 'error': error})
+                    if failed == ticker:
+                        continue
+                    row = run_task(ticker, param_comb, loaded[1], sweep, indicator_cache)
+                    _request(stream, {'op': 'result', 'worker': worker, 'task': task, 'row': row})
+                    completed += 1
+                reply = _request(stream, {'op': 'lease', 'worker': worker, 'n': batch})
+    except ConnectionError:
+        # The coordinator shuts down once every task has a result
+        pass
+    finally:
+        stop.set()
+    return completed
+
+# End-to-end run on this machine: a coordinator, n_workers worker processes
+# and synthetic data. kill workers are SIGKILLed once a quarter of the tasks
+# are done, so their leases expire and their tasks are re-issued. Every
+# stored row is checked against running the same task in this process.
+# With market_data the synthetic bars are written as CSV files and every
+# worker reads them through one shared on-disk MarketDataStore, all starting
+# on the same ticker at once.
+def demo(n_workers=4, n_tickers=6, n_combinations=20, bars=1500, kill=1, lease_seconds=3.0, backend='vector',
+         market_data=False):
+    tickers = [f'SYN{k:03d}' for k in range(n_tickers)]
+    combinations = all_combinations.sample(n_combinations, seed=0)
+    frames = {ticker: synthetic_ohlcv(bars, seed=zlib.crc32(ticker.encode())) for ticker in tickers}
+    workers = []
+    killed = []
+    env = dict(os.environ)
+
+    def start_workers(port):
+        for _ in range(n_workers):
+            workers.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), 'worker', f'127.0.0.1:{port}'],
+                                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env))
+
+    def kill_workers(done, total):
+        if kill and done >= total // 4 and not killed:
+            for w in workers[:kill]:
+                w.send_signal(signal.SIGKILL)
+            killed.append(done)
+            print(f"Killed {kill} worker(s) after {done} of {total} tasks")
+
+    with tempfile.TemporaryDirectory(prefix='distributed_') as directory:
+        if market_data:
+            source = os.path.join(directory, 'source')
+            os.makedirs(source)
+            for ticker, frame in frames.items():
+                frame.to_csv(os.path.join(source, f'{ticker}.csv'))
+            index = frames[tickers[0]].index
+            sweep = sweep_settings(str(index[0].date()), str((index[-1] + pd.Timedelta(days=1)).date()), backend,
+                                   source=source)
+            env['MARKET_DATA_CACHE'] = os.path.join(directory, 'market_data')
+        else:
+            sweep = sweep_settings(backend=backend, synthetic_bars=bars)
+        started = time.perf_counter()
+        results_df = coordinate(tickers, combinations, os.path.join(directory, 'sweep.sqlite'), sweep,
+                                lease_seconds=lease_seconds, on_ready=start_workers, on_result=kill_workers)
+        elapsed = time.perf_counter() - started
+        for w in workers:
+            w.wait()
+    print(f"{len(results_df)} tasks in {elapsed:.1f}s on {n_workers} workers")
+
+    mismatches = 0
+    for row in results_df.to_dict('records'):
+        ticker, *param_comb = row['params']
+        expected = run_task(ticker, param_comb, frames[ticker], sweep)
+        mismatches += not all(row[name] == value or (pd.isna(row[name]) and pd.isna(value))
+                              for name, value in expected.items())
+    print(f"Rows matching a local run: {len(results_df) - mismatches}/{len(results_df)}, "
+          f"error rows: {(results_df['status'] == 'error').sum()}")
+    return results_df
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Distributed CombinedStrategy sweep over tickers and parameters.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    coordinator_parser = commands.add_parser('coordinator', help='serve the task queue')
+    coordinator_parser.add_argument('tickers', help='file with one ticker per line')
+    coordinator_parser.add_argument('--store', default='distributed_results.sqlite')
+    coordinator_parser.add_argument('--host', default='127.0.0.1')
+    coordinator_parser.add_argument('--port', type=int, default=9100)
+    coordinator_parser.add_argument('--start', default=START_DATE)
+    coordinator_parser.add_argument('--end', default=END_DATE)
+    coordinator_parser.add_argument('--backend', default='vector', choices=['vector', 'backtrader'])
+    coordinator_parser.add_argument('--sample', type=int, help='sweep a random sample of this many combinations')
+    coordinator_parser.add_argument('--synthetic-bars', type=int, help='use synthetic data with this many bars')
+    coordinator_parser.add_argument('--source', help='directory of <ticker>.csv/.parquet files to read instead of Yahoo')
+    coordinator_parser.add_argument('--lease', type=float, default=30.0, help='seconds without a heartbeat before re-issuing')
+    worker_parser = commands.add_parser('worker', help='run tasks from a coordinator')
+    worker_parser.add_argument('address', help='coordinator host:port')
+    worker_parser.add_argument('--batch', type=int, default=1, help='tasks leased per request')
+    demo_parser = commands.add_parser('demo', help='coordinator and worker processes on this machine')
+    demo_parser.add_argument('--workers', type=int, default=4)
+    demo_parser.add_argument('--tickers', type=int, default=6)
+    demo_parser.add_argument('--combinations', type=int, default=20)
+    demo_parser.add_argument('--bars', type=int, default=1500)
+    demo_parser.add_argument('--kill', type=int, default=1, help='workers to SIGKILL part way through')
+    demo_parser.add_argument('--backend', default='vector', choices=['vector', 'backtrader'])
+    demo_parser.add_argument('--market-data', action='store_true',
+                             help='read the bars through a shared on-disk market data store')
+    args = parser.parse_args()
+
+    if args.command == 'coordinator':
+        combinations = all_combinations.sample(args.sample, seed=0) if args.sample else all_combinations
+        sweep = sweep_settings(args.start, args.end, args.backend, args.synthetic_bars, args.source)
+        results_df = coordinate(read_tickers(args.tickers), combinations, args.store, sweep, args.host, args.port,
+                                args.lease)
+        print(results_df)
+    elif args.command == 'worker':
+        host, port = args.address.rsplit(':', 1)
+        print(f"Worker finished after {work(host, int(port), batch=args.batch)} tasks")
+    else:
+        demo(args.workers, args.tickers, args.combinations, args.bars, args.kill, backend=args.backend,
+             market_data=args.market_data)
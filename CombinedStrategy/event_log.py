@@ -0,0 +1,102 @@
+# event_log.py
+#
+# Sinks for the BUY/SELL events the strategies log. A strategy checks the
+# sink's level once per call before doing any work, so a disabled level (or
+# NullSink) costs one comparison; dates are converted and messages formatted
+# only by sinks that need them.
+
+import queue
+import threading
+from collections import deque
+import backtrader as bt
+import pandas as pd
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+DISABLED = float('inf')
+
+COLUMNS = ['datetime', 'action', 'price', 'reason']
+
+# dt is backtrader's float date number (data.datetime[0])
+def format_event(dt, action, price, reason):
+    return f'{bt.num2date(dt).date().isoformat()} - {action} executed, Price: {price}, Strategy: {reason}'
+
+# Prints each event as it happens (the strategies' original behaviour)
+class PrintSink:
+    def __init__(self, level=INFO):
+        self.level = level
+
+    def write(self, dt, action, price, reason):
+        print(format_event(dt, action, price, reason))
+
+# Drops everything; use for sweeps
+class NullSink:
+    level = DISABLED
+
+    def write(self, dt, action, price, reason):
+        pass
+
+# Keeps events in memory, one list per column. With capacity set only the
+# most recent `capacity` events are kept.
+class BufferSink:
+    def __init__(self, level=INFO, capacity=None):
+        self.level = level
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self._columns = tuple(deque(maxlen=self.capacity) if self.capacity else [] for _ in COLUMNS)
+        self._dt, self._action, self._price, self._reason = self._columns
+
+    def write(self, dt, action, price, reason):
+        self._dt.append(dt)
+        self._action.append(action)
+        self._price.append(price)
+        self._reason.append(reason)
+
+    def __len__(self):
+        return len(self._dt)
+
+    def to_frame(self):
+        return pd.DataFrame({
+            'datetime': pd.to_datetime([bt.num2date(dt) for dt in self._dt]),
+            'action': list(self._action),
+            'price': pd.Series(list(self._price), dtype=float),
+            'reason': list(self._reason),
+        }, columns=COLUMNS)
+
+# Appends formatted events to a file from a background thread so the
+# backtest never waits on disk. Call close() (or use it as a context
+# manager) to flush what is still queued.
+class FileSink:
+    def __init__(self, path, level=INFO):
+        self.path = path
+        self.level = level
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='FileSink', daemon=True)
+        self._thread.start()
+
+    def write(self, dt, action, price, reason):
+        self._queue.put((dt, action, price, reason))
+
+    def _run(self):
+        with open(self.path, 'a') as f:
+            while True:
+                event = self._queue.get()
+                if event is None:
+                    break
+                f.write(format_event(*event) + '\n')
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,192 @@
+# feeds.py
+#
+# Columnar, memory-mapped OHLCV storage and a backtrader feed that reads it.
+#
+# write_columns() saves a frame once as a directory of .npy files: the values
+# as one column-major array (float64, or float32 to halve the file), the
+# index, and the index already converted to backtrader's date numbers.
+# ColumnStore opens such a directory with np.load(mmap_mode='r'), which reads
+# nothing until a column is touched, so opening costs the same at any length
+# and every process on the machine shares the same page cache copy.
+#
+# MemmapData is a drop-in for bt.feeds.PandasData on a ColumnStore. Instead of
+# loading bar by bar through pandas it fills each line's buffer with one
+# array copy per column at preload time. It needs no Open Interest column
+# (the line is zero when the store has none).
+#
+#   python feeds.py XOM 2000-01-01 2024-01-01 data/XOM --float32
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from array import array
+from datetime import datetime, timedelta
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+LINE_COLUMNS = {
+    'open': ('open',),
+    'high': ('high',),
+    'low': ('low',),
+    'close': ('close',),
+    'volume': ('volume',),
+    'openinterest': ('open interest', 'openinterest'),
+}
+
+# 1970-01-01 as a proleptic Gregorian ordinal
+_EPOCH_ORDINAL = 719163
+
+# bt.date2num for a whole DatetimeIndex, bit for bit. date2num rounds the
+# exact sum of the ordinal and the time-of-day fractions once; every ordinal
+# of the years 1436-2871 shares one binade, so that rounding only depends on
+# the time of day and is computed once per distinct time of day.
+def date2num(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    micros = index.to_numpy().astype('datetime64[us]').astype(np.int64)
+    days, time_of_day = np.divmod(micros, 86_400_000_000)
+    times, inverse = np.unique(time_of_day, return_inverse=True)
+    epoch = datetime(1970, 1, 1)
+    fractions = np.array([bt.date2num(epoch + timedelta(microseconds=int(t))) - _EPOCH_ORDINAL for t in times])
+    return (days + _EPOCH_ORDINAL).astype(np.float64) + fractions[inverse.reshape(-1)]
+
+# Save an OHLCV frame (DatetimeIndex) to `directory` and return its ColumnStore
+def write_columns(data, directory, dtype='float64'):
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    os.makedirs(directory, exist_ok=True)
+    values = np.asfortranarray(data.to_numpy(dtype=dtype))
+    np.save(os.path.join(directory, 'values.npy'), values)
+    np.save(os.path.join(directory, 'index.npy'), pd.DatetimeIndex(data.index).to_numpy())
+    np.save(os.path.join(directory, 'datetime.npy'), date2num(data.index))
+    meta = {'columns': [str(c) for c in data.columns], 'index_name': data.index.name, 'dtype': dtype.name,
+            'rows': len(data)}
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return ColumnStore(directory)
+
+# ColumnStore of `data` in a directory under `root` named after the frame's
+# contents: written the first time this exact frame is seen, reopened after.
+# The directory is written under a temporary name and renamed into place, so
+# concurrent callers never see a partial one.
+def cached_columns(data, root, dtype='float64'):
+    digest = hashlib.blake2b(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes(), digest_size=16)
+    directory = os.path.join(root, f'{digest.hexdigest()}-{np.dtype(dtype).name}')
+    if not os.path.exists(os.path.join(directory, 'meta.json')):
+        os.makedirs(root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=root)
+        write_columns(data, staging, dtype)
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # Another process got there first with the same contents
+            shutil.rmtree(staging, ignore_errors=True)
+    return ColumnStore(directory)
+
+# Read-only view of a write_columns directory. Columns are memory-mapped and
+# column k is the contiguous array values[:, k].
+class ColumnStore:
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        with open(os.path.join(self.directory, 'meta.json')) as f:
+            meta = json.load(f)
+        self.columns = meta['columns']
+        self.index_name = meta['index_name']
+        self.dtype = np.dtype(meta['dtype'])
+        self.values = np.load(os.path.join(self.directory, 'values.npy'), mmap_mode='r')
+        self.datetime = np.load(os.path.join(self.directory, 'datetime.npy'), mmap_mode='r')
+        self._index = np.load(os.path.join(self.directory, 'index.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.datetime)
+
+    @property
+    def index(self):
+        return pd.DatetimeIndex(self._index, name=self.index_name)
+
+    # Column array for a line name (see LINE_COLUMNS) or column name, None if absent
+    def column(self, name):
+        lowered = [c.lower() for c in self.columns]
+        for candidate in LINE_COLUMNS.get(name, (name.lower(),)):
+            if candidate in lowered:
+                return self.values[:, lowered.index(candidate)]
+        return None
+
+    # The stored frame, backed by the memory map (copied to float64 when stored as float32)
+    def frame(self):
+        values = self.values if self.dtype == np.float64 else self.values.astype(np.float64)
+        return pd.DataFrame(values, index=self.index, columns=self.columns, copy=False)
+
+    # Identifies the stored data for indicator_cache without reading it
+    def fingerprint(self):
+        digest = hashlib.blake2b(self.directory.encode(), digest_size=16)
+        for name in ('values.npy', 'datetime.npy'):
+            stat = os.stat(os.path.join(self.directory, name))
+            digest.update(f'{stat.st_size}:{stat.st_mtime_ns}'.encode())
+        return digest.hexdigest()
+
+# Backtrader feed over a ColumnStore (or a write_columns directory).
+# fromdate/todate work as for any feed; with preload the bars between them
+# are copied into the lines in bulk, otherwise they are read one at a time.
+class MemmapData(bt.feed.DataBase):
+    def start(self):
+        super().start()
+        store = self.p.dataname
+        self._store = store if isinstance(store, ColumnStore) else ColumnStore(store)
+        self._columns = {name: self._store.column(name) for name in self.getlinealiases() if name != 'datetime'}
+        self._row = -1
+
+    def preload(self):
+        if self._filters or self._tzinput:
+            return super().preload()
+        times = self._store.datetime
+        first = int(np.searchsorted(times, self.fromdate, side='left'))
+        last = int(np.searchsorted(times, self.todate, side='right'))
+        for name in self.getlinealiases():
+            line = getattr(self.lines, name)
+            column = times if name == 'datetime' else self._columns[name]
+            if column is None:
+                line.array = array('d', bytes(8 * (last - first)))
+            else:
+                line.array = array('d')
+                line.array.frombytes(memoryview(np.ascontiguousarray(column[first:last], dtype=np.float64)).cast('B'))
+        self._row = last - 1
+        self._last()
+        self.home()
+
+    def _load(self):
+        self._row += 1
+        if self._row >= len(self._store):
+            return False
+        row = self._row
+        self.lines.datetime[0] = float(self._store.datetime[row])
+        for name, column in self._columns.items():
+            getattr(self.lines, name)[0] = 0.0 if column is None else float(column[row])
+        return True
+
+# Feed for `data`: MemmapData for a ColumnStore or directory, PandasData for a frame
+def make_feed(data, name=None):
+    if isinstance(data, (ColumnStore, str)):
+        return MemmapData(dataname=data, name=name)
+    return bt.feeds.PandasData(dataname=data, name=name)
+
+if __name__ == '__main__':
+    from main import fetch_data
+
+    parser = argparse.ArgumentParser(description='Store a ticker\'s history as memory-mapped columns.')
+    parser.add_argument('ticker')
+    parser.add_argument('start')
+    parser.add_argument('end')
+    parser.add_argument('directory')
+    parser.add_argument('--float32', action='store_true', help='store prices and volume as float32')
+    args = parser.parse_args()
+
+    data = fetch_data(args.ticker, args.start, args.end)
+    store = write_columns(data, args.directory, dtype='float32' if args.float32 else 'float64')
+    print(f"{len(store):,} bars of {args.ticker} written to {store.directory}")
@@ -1,10 +1,21 @@
 # grid_search.py
 
-import itertools
-import random
+import functools
+import multiprocessing
+import signal
+import tempfile
+import time
 import backtrader as bt
 from main import fetch_data
 from strategies import CombinedStrategy
+from indicator_cache import IndicatorCache
+from feeds import ColumnStore, make_feed, write_columns
+from results_store import ResultsStore
+from event_log import NullSink
+from telemetry import NullTelemetry, profile
+import vector_engine
+import optimizer
+from optimizer import ParameterSpace
 from parameters import TICKER, START_DATE, END_DATE
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -22,43 +33,77 @@ param_grid = {
     'crsi_upper_threshold': [70, 80, 90]
 }
 
-# Select a subset of 20 different combinations
-all_combinations = list(itertools.product(*param_grid.values()))
-selected_combinations = random.sample(all_combinations, 20)
+# Every combination, decoded on demand rather than held in a list, and a
+# reproducible subset of 20 of them
+all_combinations = ParameterSpace(param_grid)
+selected_combinations = all_combinations.sample(20, seed=0)
 
-# Run the grid search
-def grid_search(combinations, data):
-    best_sharpe = -float('inf')
-    best_params = None
-    results_list = []
-    equity_curves = {}
+# Bars needed before every indicator in the grid has a value
+WARMUP_BARS = max(max(param_grid[name]) for name in param_grid if name.endswith('period'))
+
+# Shortest history the adaptive searches run a candidate on: the warmup plus
+# about a quarter of trading, so the first rung's Sharpe ratios mean something
+SEARCH_MIN_BARS = WARMUP_BARS + 63
 
-    for param_comb in combinations:
+# CombinedStrategy keyword arguments for one param_grid combination
+def strategy_params(param_comb):
+    return dict(
+        mean_reversion_period=param_comb[0],
+        mean_reversion_dev_factor=param_comb[1],
+        crsi_rsi_period=param_comb[2],
+        crsi_streak_rsi_period=param_comb[3],
+        crsi_rank_period=param_comb[4],
+        trend_following_period=param_comb[5],
+        breakout_period=param_comb[6],
+        stop_loss=0.02,
+        take_profit=0.04,
+        crsi_lower_threshold=param_comb[7],
+        crsi_upper_threshold=param_comb[8],
+        vwap_condition=False
+    )
+
+# Run one backtest and collect its metrics and TimeReturn analysis.
+# backend='vector' runs the same strategy on vector_engine instead of Cerebro.
+# A telemetry.Telemetry records where the time went (see telemetry.py).
+def run_backtest(param_comb, data, indicator_cache=None, backend='backtrader', telemetry=None):
+    if backend == 'vector':
+        if telemetry is None:
+            telemetry = NullTelemetry()
+        with telemetry.phase('run'):
+            metrics, timereturn = vector_engine.evaluate(data, **strategy_params(param_comb))
+        telemetry.count('bars', len(data))
+    elif backend == 'backtrader':
+        metrics, timereturn = backtrader_metrics(data, strategy_params(param_comb), indicator_cache, telemetry=telemetry)
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+    return {'params': param_comb, **metrics}, timereturn
+
+# Run CombinedStrategy through Cerebro and return its metrics and TimeReturn analysis.
+# data is an OHLCV frame or a feeds.ColumnStore (read through feeds.MemmapData).
+# Trade events are discarded unless an event_sink is given.
+def backtrader_metrics(data, params, indicator_cache=None, name=TICKER, event_sink=None, telemetry=None):
+    if event_sink is None:
+        event_sink = NullSink()
+    strategy_telemetry = telemetry
+    if telemetry is None:
+        telemetry = NullTelemetry()
+    with telemetry.phase('setup'):
         cerebro = bt.Cerebro()
-        data_feed = bt.feeds.PandasData(dataname=data, name=TICKER)
+        data_feed = make_feed(data, name)
+        telemetry.instrument_data(data_feed)
         cerebro.adddata(data_feed)
-        cerebro.addstrategy(
-            CombinedStrategy,
-            mean_reversion_period=param_comb[0],
-            mean_reversion_dev_factor=param_comb[1],
-            crsi_rsi_period=param_comb[2],
-            crsi_streak_rsi_period=param_comb[3],
-            crsi_rank_period=param_comb[4],
-            trend_following_period=param_comb[5],
-            breakout_period=param_comb[6],
-            stop_loss=0.02,
-            take_profit=0.04,
-            crsi_lower_threshold=param_comb[7],
-            crsi_upper_threshold=param_comb[8],
-            vwap_condition=False
-        )
+        cerebro.addstrategy(CombinedStrategy, indicator_cache=indicator_cache, event_sink=event_sink,
+                            telemetry=strategy_telemetry, **params)
         cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe', timeframe=bt.TimeFrame.Days)
         cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
         cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='tradeanalyzer')
         cerebro.addanalyzer(bt.analyzers.TimeReturn, _name='timereturn')
 
+    with telemetry.phase('run'):
         results = cerebro.run()
+    telemetry.count('bars', len(data))
 
+    with telemetry.phase('analysis'):
         sharpe_ratio = results[0].analyzers.sharpe.get_analysis().get('sharperatio')
         drawdown = results[0].analyzers.drawdown.get_analysis()
         trade_analysis = results[0].analyzers.tradeanalyzer.get_analysis()
@@ -76,7 +121,6 @@ def grid_search(combinations, data):
             total_returns = (final_value - initial_value) / initial_value
 
         metrics = {
-            'params': param_comb,
             'sharpe_ratio': sharpe_ratio,
             'max_drawdown': drawdown['max']['drawdown'],
             'total_trades': trade_analysis.total.closed,
@@ -85,28 +129,246 @@ def grid_search(combinations, data):
             'avg_trade_duration': trade_analysis.len.average,
             'total_returns': total_returns
         }
+    return metrics, timereturn
+
+# Evaluate every combination in one vector_engine.evaluate_batch pass and
+# return a results_df-style table
+def run_batch(combinations, data, chunk_size=1024):
+    combinations = list(combinations)
+    param_sets = pd.DataFrame([strategy_params(param_comb) for param_comb in combinations])
+    results_df = vector_engine.evaluate_batch(data, param_sets, chunk_size=chunk_size)
+    results_df.insert(0, 'params', pd.Series(combinations, index=results_df.index, dtype=object))
+    return results_df
+
+# run_batch a chunk at a time. Yields (results_df, days, returns) per chunk:
+# its results and each combination's TimeReturn as a (combination x day)
+# matrix over the DatetimeIndex `days`.
+def iter_batch(combinations, data, chunk_size=1024):
+    combinations = list(combinations)
+    param_sets = pd.DataFrame([strategy_params(param_comb) for param_comb in combinations])
+    last_of_day = vector_engine.last_bars_of_day(data.index)
+    days = pd.DatetimeIndex(data.index).normalize()[last_of_day]
+    for results_df, value in vector_engine.iter_evaluate_batch(data, param_sets, chunk_size=chunk_size):
+        results_df.insert(0, 'params', pd.Series(combinations[results_df.index[0]:results_df.index[-1] + 1],
+                                                 index=results_df.index, dtype=object))
+        yield results_df, days, vector_engine.batch_time_returns(value, last_of_day)
+
+# Write the OHLCV frame to memory-mapped .npy files (feeds.write_columns) so
+# worker processes can read it without each task pickling its own copy
+def share_frame(data, directory):
+    return write_columns(data, directory).directory
+
+def load_shared_frame(spec):
+    return ColumnStore(spec).frame()
+
+_worker_data = None
+_worker_cache = None
+_worker_backend = 'backtrader'
+
+def _init_worker(spec, cache_indicators, backend):
+    global _worker_data, _worker_cache, _worker_backend
+    # Ctrl-C is handled once in the parent, which tears the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Cerebro reads the columns straight from the memory map
+    _worker_data = ColumnStore(spec) if backend == 'backtrader' else load_shared_frame(spec)
+    _worker_cache = IndicatorCache() if cache_indicators else None
+    _worker_backend = backend
+
+def _run_shared(param_comb):
+    return run_backtest(param_comb, _worker_data, _worker_cache, _worker_backend)
+
+# Yield (metrics, timereturn) in submission order from a process pool.
+# Closing the generator early (or Ctrl-C) terminates the workers.
+def run_parallel(combinations, data, n_jobs=None, chunksize=1, cache_indicators=True, backend='backtrader'):
+    with tempfile.TemporaryDirectory(prefix='grid_search_') as directory:
+        spec = share_frame(data, directory)
+        pool = multiprocessing.Pool(n_jobs, initializer=_init_worker, initargs=(spec, cache_indicators, backend))
+        try:
+            yield from pool.imap(_run_shared, combinations, chunksize=chunksize)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+# What a results store records about a sweep, so it is only ever resumed on
+# the same data and engine
+def sweep_description(data, backend):
+    return {'backend': backend, 'bars': len(data), 'first': str(data.index[0]), 'last': str(data.index[-1])}
+
+# Run the grid search
+# n_jobs=1 runs serially, n_jobs=None uses every core. Setting stop_event
+# (e.g. a threading.Event) stops the sweep after the current result and
+# returns what has finished so far. cache_indicators shares identical
+# indicator series between combinations (one cache per process) and
+# backend='vector' evaluates combinations with vector_engine.
+# backend='batch' evaluates the whole grid at once (see run_batch); n_jobs,
+# chunksize, stop_event and cache_indicators do not apply to it.
+# With a telemetry.Telemetry the sweep prints progress and an ETA and
+# records its timings; per-backtest phases are only recorded with n_jobs=1.
+# store (a results_store.ResultsStore or a path to one) writes every result
+# and equity curve to disk as it finishes instead of keeping them in memory;
+# combinations already in the store are skipped, so an interrupted sweep
+# resumes where it stopped. results_df then holds everything in the store.
+def grid_search(combinations, data, n_jobs=1, chunksize=1, stop_event=None, cache_indicators=True, backend='backtrader',
+                telemetry=None, store=None):
+    if not isinstance(store, str):
+        return _grid_search(combinations, data, n_jobs, chunksize, stop_event, cache_indicators, backend,
+                            telemetry, store)
+    # A store opened here is closed here
+    store = ResultsStore(store, sweep=sweep_description(data, backend))
+    try:
+        return _grid_search(combinations, data, n_jobs, chunksize, stop_event, cache_indicators, backend,
+                            telemetry, store)
+    finally:
+        store.close()
+
+def _grid_search(combinations, data, n_jobs, chunksize, stop_event, cache_indicators, backend, telemetry, store):
+    best_sharpe = -float('inf')
+    best_params = None
+    results_list = []
+    equity_curves = {}
+
+    combinations = list(combinations)
+    if store is not None:
+        done = store.completed()
+        skipped = len(combinations)
+        combinations = [param_comb for param_comb in combinations if param_comb not in done]
+        skipped -= len(combinations)
+        if skipped:
+            print(f"Resuming: {skipped} combinations already in {store.path}")
+    if backend == 'batch':
+        return batch_grid_search(combinations, data, telemetry, store)
+    if n_jobs == 1:
+        indicator_cache = IndicatorCache() if cache_indicators else None
+        runs = (run_backtest(param_comb, data, indicator_cache, backend, telemetry) for param_comb in combinations)
+    else:
+        runs = run_parallel(combinations, data, n_jobs=n_jobs, chunksize=chunksize,
+                            cache_indicators=cache_indicators, backend=backend)
+    if telemetry is None:
+        telemetry = NullTelemetry()
+    progress = telemetry.progress(len(combinations))
+    sweep_started = time.perf_counter()
+
+    finished = 0
+    try:
+        for param_comb, (metrics, timereturn) in zip(combinations, runs):
+            finished += 1
+            telemetry.count('combinations')
+            progress.update()
+            sharpe_ratio = metrics['sharpe_ratio']
+            if store is not None:
+                store.add(param_comb, metrics, timereturn)
+            else:
+                results_list.append(metrics)
+                equity_curves[param_comb] = timereturn
 
-        results_list.append(metrics)
-        equity_curves[param_comb] = timereturn
+            if sharpe_ratio > best_sharpe:
+                best_sharpe = sharpe_ratio
+                best_params = param_comb
 
-        if sharpe_ratio > best_sharpe:
-            best_sharpe = sharpe_ratio
-            best_params = param_comb
+            print(f"Tested params: {param_comb}, Sharpe Ratio: {sharpe_ratio}")
 
-        print(f"Tested params: {param_comb}, Sharpe Ratio: {sharpe_ratio}")
+            if stop_event is not None and stop_event.is_set():
+                print(f"Sweep stopped after {finished} of {len(combinations)} combinations")
+                break
+    finally:
+        if hasattr(runs, 'close'):
+            runs.close()
+        telemetry.add('sweep', time.perf_counter() - sweep_started)
 
+    if store is not None:
+        # Runs from earlier sessions count too
+        best_params, best_sharpe = store.best()
     print(f"Best params: {best_params}, Best Sharpe Ratio: {best_sharpe:.2f}")
 
     # Create a DataFrame to display the results
-    results_df = pd.DataFrame(results_list)
+    results_df = store.results() if store is not None else pd.DataFrame(results_list)
     print(results_df)
 
     # Plot the equity curve for the best parameters
     if best_params:
-        plot_equity_curve(equity_curves[best_params])
+        if store is not None:
+            plot_equity_curve(store.equity_curve(best_params).to_dict())
+        else:
+            plot_equity_curve(equity_curves[best_params])
 
     return best_params, best_sharpe, results_df
 
+def batch_grid_search(combinations, data, telemetry=None, store=None):
+    if telemetry is None:
+        telemetry = NullTelemetry()
+    if store is None:
+        with telemetry.phase('sweep'):
+            results_df = run_batch(combinations, data)
+        telemetry.count('combinations', len(results_df))
+        telemetry.count('bars', len(results_df) * len(data))
+    else:
+        # Each chunk and its equity curves are committed as soon as it is done
+        with telemetry.phase('sweep'):
+            for chunk, days, returns in iter_batch(combinations, data):
+                store.add_frame(chunk, curves=(days, returns))
+                telemetry.count('combinations', len(chunk))
+                telemetry.count('bars', len(chunk) * len(data))
+        results_df = store.results()
+    best_sharpe = -float('inf')
+    best_params = None
+    if len(results_df) and results_df['sharpe_ratio'].max() > best_sharpe:
+        # idxmax keeps the first of equal Sharpe ratios, as the serial loop does
+        best = results_df['sharpe_ratio'].idxmax()
+        best_sharpe = results_df.at[best, 'sharpe_ratio']
+        best_params = results_df.at[best, 'params']
+
+    print(f"Best params: {best_params}, Best Sharpe Ratio: {best_sharpe:.2f}")
+    print(results_df)
+
+    if best_params:
+        if store is not None:
+            plot_equity_curve(store.equity_curve(best_params).to_dict())
+        else:
+            _, timereturn = run_backtest(best_params, data, backend='vector')
+            plot_equity_curve(timereturn)
+
+    return best_params, best_sharpe, results_df
+
+def _search_metrics(param_comb, data, backend):
+    return run_backtest(param_comb, data, backend=backend)[0]
+
+# Adaptive alternative to grid_search: method='halving' (successive halving
+# on truncated history), 'hyperband' or 'tpe'. Extra keyword arguments go to
+# the optimizer function. Returns (best_params, best_sharpe, results_df) like
+# grid_search, with results_df holding the full-history backtests; every
+# backtest the search ran, truncated ones included, is in results_df.attrs['history'].
+def optimize(data, method='halving', backend='vector', seed=0, **kwargs):
+    evaluate = functools.partial(_search_metrics, backend=backend)
+    if method == 'halving':
+        history = optimizer.successive_halving(all_combinations, data, evaluate, min_bars=SEARCH_MIN_BARS,
+                                               warmup_bars=WARMUP_BARS, seed=seed, **kwargs)
+    elif method == 'hyperband':
+        history = optimizer.hyperband(all_combinations, data, evaluate, min_bars=SEARCH_MIN_BARS,
+                                      warmup_bars=WARMUP_BARS, seed=seed, **kwargs)
+    elif method == 'tpe':
+        history = optimizer.tpe(all_combinations, data, evaluate, seed=seed, **kwargs)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    full = history[history['bars'] == len(data)]
+    results_df = full.drop(columns=['bars', 'stage']).drop_duplicates('params').reset_index(drop=True)
+    results_df.attrs['history'] = history
+    best_sharpe = -float('inf')
+    best_params = None
+    if len(results_df) and results_df['sharpe_ratio'].max() > best_sharpe:
+        best = results_df['sharpe_ratio'].idxmax()
+        best_sharpe = results_df.at[best, 'sharpe_ratio']
+        best_params = results_df.at[best, 'params']
+    print(f"{method}: {len(history)} backtests ({history['bars'].sum() / len(data):.1f} full-history equivalents)")
+    print(f"Best params: {best_params}, Best Sharpe Ratio: {best_sharpe:.2f}")
+    return best_params, best_sharpe, results_df
+
+# cProfile one combination through run_backtest; the stats go to `path`
+# (view with `python -m pstats`, snakeviz or flameprof) and the top entries are printed
+def profile_combination(param_comb, data, path='grid_search.prof', backend='backtrader', sort='cumulative', limit=25):
+    return profile(run_backtest, param_comb, data, backend=backend, path=path, sort=sort, limit=limit)
+
 def plot_equity_curve(timereturn):
     plt.figure(figsize=(12, 8))
     plt.plot(timereturn.keys(), timereturn.values(), label='Equity Curve')
@@ -117,8 +379,14 @@ def plot_equity_curve(timereturn):
     plt.grid(True)
     plt.show()
 
-if __name__ == '__':
-    best_params, best_sharpe, results_df = grid_search(selected_combinations, data)
+if __name__ == '__main__':
+    data = fetch_data(TICKER, start=START_DATE, end=END_DATE)
+    # The batch engine sweeps the full grid; pass selected_combinations with
+    # backend='backtrader' to run a sample through Cerebro instead. Results go
+    # to a SQLite store as they finish; re-running resumes an unfinished sweep.
+    # Equity curves are kept weekly (every 5th bar) to keep the file small.
+    with ResultsStore('grid_search_results.sqlite', sweep=sweep_description(data, 'batch'), downsample=5) as store:
+        best_params, best_sharpe, results_df = grid_search(all_combinations, data, backend='batch', store=store)
     print(f"Best Parameters: {best_params}")
     print(f"Best Sharpe Ratio: {best_sharpe}")
 
@@ -0,0 +1,279 @@
+# incremental.py
+#
+# Streaming versions of CombinedStrategy's indicators for live.py. Each one
+# takes a single new value per update() call and returns the indicator's
+# current value (NaN until it has enough bars), following the formulas of
+# vector_engine and backtrader:
+#   SMA, StdDev     - running sums over a ring buffer, O(1); the sums are
+#                     recomputed with math.fsum every `period` bars so
+#                     rounding error never accumulates
+#   Highest, Lowest - monotonic deque, amortised O(1)
+#   RSI             - Wilder smoothing seeded with the first period's mean, O(1)
+#   PercentRank     - sorted copy of the window searched with bisect,
+#                     O(log period) comparisons plus a short list shift
+#   ConnorsRSI      - the three components above
+#   VWAP            - cumulative sums of typical price * volume and volume, O(1)
+#   AnchoredVWAP    - the same sums reset at session boundaries, with
+#                     optional standard deviation bands, O(1)
+
+import math
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import datetime, timedelta
+
+NAN = float('nan')
+
+class SMA:
+    __slots__ = ('period', 'value', '_window', '_sum', '_updates')
+
+    def __init__(self, period):
+        self.period = period
+        self.value = NAN
+        self._window = deque(maxlen=period)
+        self._sum = 0.0
+        self._updates = 0
+
+    def update(self, x):
+        window = self._window
+        if len(window) == self.period:
+            self._sum -= window[0]
+        window.append(x)
+        self._updates += 1
+        if self._updates % self.period == 0:
+            self._sum = math.fsum(window)
+        else:
+            self._sum += x
+        if len(window) == self.period:
+            self.value = self._sum / self.period
+        return self.value
+
+# backtrader's StandardDeviation: sqrt(mean(x^2) - mean(x)^2) over the window
+class StdDev:
+    __slots__ = ('period', 'value', '_window', '_sum', '_sum_sq', '_updates')
+
+    def __init__(self, period):
+        self.period = period
+        self.value = NAN
+        self._window = deque(maxlen=period)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._updates = 0
+
+    def update(self, x):
+        window = self._window
+        if len(window) == self.period:
+            old = window[0]
+            self._sum -= old
+            self._sum_sq -= old * old
+        window.append(x)
+        self._updates += 1
+        if self._updates % self.period == 0:
+            self._sum = math.fsum(window)
+            self._sum_sq = math.fsum([v * v for v in window])
+        else:
+            self._sum += x
+            self._sum_sq += x * x
+        if len(window) == self.period:
+            mean = self._sum / self.period
+            self.value = math.sqrt(max(self._sum_sq / self.period - mean * mean, 0.0))
+        return self.value
+
+# Largest value of the last `period` updates
+class Highest:
+    __slots__ = ('period', 'value', '_deque', '_count', '_sign')
+
+    def __init__(self, period):
+        self.period = period
+        self.value = NAN
+        self._deque = deque()  # (update number, signed value), signed values decreasing
+        self._count = 0
+        self._sign = 1.0
+
+    def update(self, x):
+        x = self._sign * x
+        items = self._deque
+        while items and items[-1][1] <= x:
+            items.pop()
+        items.append((self._count, x))
+        if items[0][0] <= self._count - self.period:
+            items.popleft()
+        self._count += 1
+        if self._count >= self.period:
+            self.value = self._sign * items[0][1]
+        return self.value
+
+class Lowest(Highest):
+    __slots__ = ()
+
+    def __init__(self, period):
+        super().__init__(period)
+        self._sign = -1.0
+
+# backtrader's RSI: Wilder-smoothed up and down moves. NaN inputs are skipped,
+# so it can run on a series (such as a price change) that starts with NaN.
+class RSI:
+    __slots__ = ('period', 'value', '_previous', '_up', '_down', '_moves')
+
+    def __init__(self, period):
+        self.period = period
+        self.value = NAN
+        self._previous = None
+        self._up = 0.0
+        self._down = 0.0
+        self._moves = 0
+
+    def update(self, x):
+        if x != x:
+            return self.value
+        previous = self._previous
+        self._previous = x
+        if previous is None:
+            return self.value
+        change = x - previous
+        up = change if change > 0.0 else 0.0
+        down = -change if change < 0.0 else 0.0
+        self._moves += 1
+        period = self.period
+        if self._moves < period:
+            self._up += up
+            self._down += down
+            return self.value
+        if self._moves == period:
+            self._up = (self._up + up) / period
+            self._down = (self._down + down) / period
+        else:
+            alpha = 1.0 / period
+            alpha1 = 1.0 - alpha
+            self._up = self._up * alpha1 + up * alpha
+            self._down = self._down * alpha1 + down * alpha
+        if self._down:
+            self.value = 100.0 - 100.0 / (1.0 + self._up / self._down)
+        else:
+            self.value = 100.0 if self._up else NAN
+        return self.value
+
+# backtrader's PercentRank: share of the window strictly below the latest value
+class PercentRank:
+    __slots__ = ('period', 'value', '_window', '_sorted')
+
+    def __init__(self, period):
+        self.period = period
+        self.value = NAN
+        self._window = deque(maxlen=period)
+        self._sorted = []
+
+    def update(self, x):
+        window = self._window
+        ordered = self._sorted
+        if len(window) == self.period:
+            del ordered[bisect_left(ordered, window[0])]
+        window.append(x)
+        insort(ordered, x)
+        if len(window) == self.period:
+            self.value = bisect_left(ordered, x) / self.period
+        return self.value
+
+# indicators.ConnorsRSI: mean of RSI(close), RSI(close change) and PercentRank(close)
+class ConnorsRSI:
+    __slots__ = ('value', 'minperiod', '_rsi', '_streak', '_rank', '_previous', '_count')
+
+    def __init__(self, rsi_period=3, streak_rsi_period=2, rank_period=100):
+        self.value = NAN
+        self.minperiod = max(rsi_period + 1, streak_rsi_period + 2, rank_period)
+        self._rsi = RSI(rsi_period)
+        self._streak = RSI(streak_rsi_period)
+        self._rank = PercentRank(rank_period)
+        self._previous = None
+        self._count = 0
+
+    def update(self, close):
+        rsi = self._rsi.update(close)
+        if self._previous is not None:
+            self._streak.update(close - self._previous)
+        self._previous = close
+        rank = self._rank.update(close)
+        self._count += 1
+        if self._count >= self.minperiod:
+            self.value = (rsi + self._streak.value + rank) / 3
+        return self.value
+
+# Cumulative VWAP of the typical price (indicators.VWAP with period=0)
+class VWAP:
+    __slots__ = ('value', '_tpv', '_volume', '_bars')
+
+    def __init__(self):
+        self.value = NAN
+        self._tpv = 0.0
+        self._volume = 0.0
+        self._bars = 0
+
+    def update(self, high, low, close, volume):
+        typical_price = (high + low + close) / 3
+        self._tpv += typical_price * volume
+        self._volume += volume
+        self._bars += 1
+        self.value = typical_price if self._bars == 1 else self._tpv / self._volume
+        return self.value
+
+# indicators.AnchoredVWAP: VWAP restarted each day, week (from Monday) or
+# month of bar time shifted by `offset`, and at every timestamp in `anchors`.
+# update() takes the bar's datetime; value, upper and lower are current.
+class AnchoredVWAP:
+    __slots__ = ('anchor', 'band_dev', 'value', 'upper', 'lower', '_offset', '_anchors', '_next_anchor', '_session',
+                 '_tpv', '_tp2v', '_volume', '_bars')
+
+    def __init__(self, anchor='day', anchors=(), offset=timedelta(0), band_dev=0.0):
+        if anchor not in (None, 'day', 'week', 'month'):
+            raise ValueError(f"Unknown anchor: {anchor}")
+        self.anchor = anchor
+        self.band_dev = band_dev
+        self.value = self.upper = self.lower = NAN
+        self._offset = offset
+        self._anchors = sorted(datetime.fromisoformat(a) if isinstance(a, str) else a for a in anchors)
+        self._next_anchor = 0
+        self._session = None
+        self._tpv = self._tp2v = self._volume = 0.0
+        self._bars = 0
+
+    def _session_key(self, time):
+        if self.anchor is None:
+            return None
+        shifted = time - self._offset
+        if self.anchor == 'day':
+            return shifted.toordinal()
+        if self.anchor == 'week':
+            return (shifted.toordinal() - 1) // 7
+        return shifted.year, shifted.month
+
+    def update(self, time, high, low, close, volume):
+        session = self._session_key(time)
+        new_session = self._bars == 0 or session != self._session
+        anchors = self._anchors
+        while self._next_anchor < len(anchors) and time >= anchors[self._next_anchor]:
+            self._next_anchor += 1
+            new_session = True
+        if new_session:
+            self._session = session
+            self._tpv = self._tp2v = self._volume = 0.0
+            self._bars = 0
+
+        typical_price = (high + low + close) / 3
+        self._tpv += typical_price * volume
+        self._tp2v += typical_price * typical_price * volume
+        self._volume += volume
+        self._bars += 1
+        vwap = typical_price if self._bars == 1 or not self._volume else self._tpv / self._volume
+        self.value = vwap
+        if self.band_dev:
+            deviation = 0.0
+            if self._bars > 1 and self._volume:
+                deviation = max(self._tp2v / self._volume - vwap * vwap, 0.0) ** 0.5
+            self.upper = vwap + self.band_dev * deviation
+            self.lower = vwap - self.band_dev * deviation
+        return vwap
+
+# Streaming counterpart of indicators.session_vwap for a vwap_anchor value
+def session_vwap(anchor=None):
+    if anchor is None or isinstance(anchor, str):
+        return AnchoredVWAP(anchor=anchor)
+    return AnchoredVWAP(anchor=None, anchors=anchor)
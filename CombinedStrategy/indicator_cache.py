@@ -0,0 +1,104 @@
+# indicator_cache.py
+
+import hashlib
+from array import array
+from collections import OrderedDict
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from indicators import ConnorsRSI, VWAP, session_vwap
+
+# How each cacheable indicator is built on a data feed
+INDICATORS = {
+    'sma': lambda data, period: bt.indicators.SimpleMovingAverage(data, period=period),
+    'stddev': lambda data, period: bt.indicators.StandardDeviation(data, period=period),
+    'highest': lambda data, period: bt.indicators.Highest(data.high, period=period),
+    'lowest': lambda data, period: bt.indicators.Lowest(data.low, period=period),
+    'crsi': lambda data, rsi_period, streak_rsi_period, rank_period: ConnorsRSI(
+        data, rsi_period=rsi_period, streak_rsi_period=streak_rsi_period, rank_period=rank_period),
+    'vwap': lambda data, period=0, anchor=None: VWAP(data, period=period) if anchor is None else session_vwap(data, anchor),
+}
+
+# Replays a precomputed series as an indicator line, keeping the original minimum period
+class CachedLine(bt.Indicator):
+    lines = ('value',)
+    params = (('values', None), ('minperiod', 1))
+
+    def __init__(self):
+        self.addminperiod(self.params.minperiod)
+
+    def next(self):
+        self.lines.value[0] = self.params.values[len(self) - 1]
+
+    def once(self, start, end):
+        self.lines.value.array[start:end] = array('d', self.params.values[start:end])
+
+# Stable hash of a feed's underlying frame (or feeds.ColumnStore) and its feed parameters
+def fingerprint(data_feed):
+    kwargs = data_feed.params._getkwargs()
+    frame = kwargs.pop('dataname')
+    if hasattr(frame, 'fingerprint'):
+        digest = hashlib.blake2b(frame.fingerprint().encode(), digest_size=16)
+    else:
+        digest = hashlib.blake2b(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes(), digest_size=16)
+    digest.update(repr(sorted(kwargs.items())).encode())
+    return digest.hexdigest()
+
+# Computes each (data, indicator, params) series once and serves it to every
+# strategy instance in a sweep. A miss builds the real indicator in the
+# running strategy; commit() at the end of that run stores its line array.
+# Least recently used series are evicted once the arrays exceed max_bytes.
+class IndicatorCache:
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = []
+        self._last_feed = (None, None)
+
+    def _fingerprint(self, data_feed):
+        frame = data_feed.params.dataname
+        if self._last_feed[0] is not frame:
+            self._last_feed = (frame, fingerprint(data_feed))
+        return self._last_feed[1]
+
+    # Return one line object per (kind, params) spec; call from the strategy's __init__
+    def lines(self, data_feed, specs):
+        # Anything still pending belongs to a run that never reached commit()
+        self._pending = []
+        data_key = self._fingerprint(data_feed)
+        lines = []
+        for kind, params in specs:
+            key = (data_key, kind, tuple(sorted(params.items())))
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                indicator = INDICATORS[kind](data_feed, **params)
+                self._pending.append((key, indicator))
+                lines.append(indicator)
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                lines.append(CachedLine(data_feed, values=entry[0], minperiod=entry[1]))
+        return lines
+
+    # Store the indicators computed during the run that just finished; call from stop()
+    def commit(self):
+        for key, indicator in self._pending:
+            if key not in self._entries:
+                self._store(key, (np.array(indicator.lines[0].array), indicator._minperiod))
+        self._pending = []
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self.nbytes += entry[0].nbytes
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, (values, _) = self._entries.popitem(last=False)
+            self.nbytes -= values.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self._pending = []
+        self.nbytes = 0
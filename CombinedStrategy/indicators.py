@@ -1,5 +1,6 @@
 # indicators.py
 
+from datetime import datetime, timedelta
 import backtrader as bt
 
 # Connors RSI indicator
@@ -16,24 +17,115 @@ class ConnorsRSI(bt.Indicator):
         self.lines.crsi[0] = (self.rsi[0] + self.streak[0] + self.rank[0]) / 3
 
 # Custom VWAP indicator
+# period=0 accumulates from the first bar, period=N uses a rolling N-bar window.
+# Running sums of price*volume and volume keep each bar O(1).
 class VWAP(bt.Indicator):
     lines = ('vwap',)
     params = (('period', 0),)
 
     def __init__(self):
-        self.addminperiod(1)
+        self.addminperiod(max(self.params.period, 1))
         self.plotinfo.ploty = True
+        self.cumulative_tpv = 0.0
+        self.cumulative_volume = 0.0
+
+    def prenext(self):
+        self._accumulate()
 
     def next(self):
-        typical_price = (self.data.high[0] + self.data.low[0] + self.data.close[0]) / 3
-        volume = self.data.volume[0]
-        
+        typical_price = self._accumulate()
         if len(self) == 1:
             self.lines.vwap[0] = typical_price
         else:
-            cumulative_tpv = typical_price * volume
-            cumulative_volume = volume
-            for i in range(1, len(self)):
-                cumulative_tpv += (self.data.high[-i] + self.data.low[-i] + self.data.close[-i]) / 3 * self.data.volume[-i]
-                cumulative_volume += self.data.volume[-i]
-            self.lines.vwap[0] = cumulative_tpv / cumulative_volume
+            self.lines.vwap[0] = self.cumulative_tpv / self.cumulative_volume
+
+    def _accumulate(self):
+        typical_price = (self.data.high[0] + self.data.low[0] + self.data.close[0]) / 3
+        volume = self.data.volume[0]
+        self.cumulative_tpv += typical_price * volume
+        self.cumulative_volume += volume
+
+        # Drop the bar that just left the rolling window
+        period = self.params.period
+        if period and len(self) > period:
+            old_volume = self.data.volume[-period]
+            self.cumulative_tpv -= (self.data.high[-period] + self.data.low[-period] + self.data.close[-period]) / 3 * old_volume
+            self.cumulative_volume -= old_volume
+        return typical_price
+
+# Session-anchored VWAP for intraday bars. The running sums reset on the first
+# bar of every session: anchor='day', 'week' (weeks start on Monday) or
+# 'month', shifted by `offset` (e.g. timedelta(hours=-6) starts each day at
+# 18:00 the evening before), and at every timestamp in `anchors` (datetimes
+# or ISO strings). With
+# anchor=None and no anchors it never resets and matches VWAP(period=0).
+# upper/lower are the volume-weighted standard deviation bands
+# vwap +/- band_dev * std (NaN when band_dev is 0). Each bar is O(1) and the
+# state is a handful of floats.
+class AnchoredVWAP(bt.Indicator):
+    lines = ('vwap', 'upper', 'lower')
+    params = (('anchor', 'day'), ('anchors', ()), ('offset', timedelta(0)), ('band_dev', 0.0))
+    plotinfo = dict(subplot=False)
+
+    def __init__(self):
+        if self.params.anchor not in (None, 'day', 'week', 'month'):
+            raise ValueError(f"Unknown anchor: {self.params.anchor}")
+        self._offset = self.params.offset / timedelta(days=1)
+        self._anchors = sorted(bt.date2num(datetime.fromisoformat(anchor) if isinstance(anchor, str) else anchor)
+                               for anchor in self.params.anchors)
+        self._next_anchor = 0
+        self._day = self._month = None
+        self._session = None
+        self._tpv = self._tp2v = self._volume = 0.0
+        self._bars = 0
+
+    def _session_key(self, dt):
+        anchor = self.params.anchor
+        if anchor is None:
+            return None
+        day = int(dt - self._offset)
+        if anchor == 'day':
+            return day
+        if anchor == 'week':
+            # Day 1 of backtrader's date numbers (0001-01-01) was a Monday
+            return (day - 1) // 7
+        if day != self._day:
+            date = bt.num2date(day)
+            self._day, self._month = day, (date.year, date.month)
+        return self._month
+
+    def next(self):
+        dt = self.data.datetime[0]
+        session = self._session_key(dt)
+        new_session = self._bars == 0 or session != self._session
+        while self._next_anchor < len(self._anchors) and dt >= self._anchors[self._next_anchor]:
+            self._next_anchor += 1
+            new_session = True
+        if new_session:
+            self._session = session
+            self._tpv = self._tp2v = self._volume = 0.0
+            self._bars = 0
+
+        typical_price = (self.data.high[0] + self.data.low[0] + self.data.close[0]) / 3
+        volume = self.data.volume[0]
+        self._tpv += typical_price * volume
+        self._tp2v += typical_price * typical_price * volume
+        self._volume += volume
+        self._bars += 1
+        vwap = typical_price if self._bars == 1 or not self._volume else self._tpv / self._volume
+        self.lines.vwap[0] = vwap
+        if self.params.band_dev:
+            deviation = 0.0
+            if self._bars > 1 and self._volume:
+                deviation = max(self._tp2v / self._volume - vwap * vwap, 0.0) ** 0.5
+            self.lines.upper[0] = vwap + self.params.band_dev * deviation
+            self.lines.lower[0] = vwap - self.params.band_dev * deviation
+
+# The VWAP a strategy compares against: cumulative when anchor is None,
+# otherwise session-anchored (a list of timestamps anchors at those times only)
+def session_vwap(data, anchor=None):
+    if anchor is None:
+        return VWAP(data)
+    if isinstance(anchor, str):
+        return AnchoredVWAP(data, anchor=anchor)
+    return AnchoredVWAP(data, anchor=None, anchors=tuple(anchor))
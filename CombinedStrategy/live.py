@@ -0,0 +1,284 @@
+# live.py
+#
+# Bar-by-bar paper trading of CombinedStrategy. Bars arrive one at a time,
+# for any number of symbols, from a replay file or a local TCP socket; each
+# symbol keeps its own incremental indicators (incremental.py), so a bar
+# costs the same whether it is the 10th or the 10 millionth. Decisions follow
+# CombinedStrategy.next() and orders fill like vector_engine.simulate: one
+# share at the next bar's open, 10,000 starting cash per symbol. No broker is
+# involved.
+#
+# Bar-to-decision latency is measured for every bar, from the moment the feed
+# received the raw line to the moment the decision was made.
+#
+# Feeds carry one bar per line: symbol,time,open,high,low,close,volume with an
+# ISO time. write_replay() builds such a file from OHLCV frames and serve()
+# streams one over a local socket as a stand-in for a market data feed.
+#
+#   python live.py replay.csv
+#   python live.py --connect 127.0.0.1:9000
+#   python live.py --demo --symbols 300 --bars 2000
+
+import argparse
+import os
+import socket
+import tempfile
+import threading
+import time
+from array import array
+from collections import namedtuple
+from datetime import datetime
+import backtrader as bt
+import numpy as np
+import pandas as pd
+import incremental
+from event_log import INFO, PrintSink, NullSink
+from synthetic import synthetic_ohlcv
+from vector_engine import STARTING_CASH, default_params, warmup_bars
+
+Bar = namedtuple('Bar', ['symbol', 'time', 'open', 'high', 'low', 'close', 'volume', 'received'])
+Signal = namedtuple('Signal', ['symbol', 'time', 'action', 'price', 'reason', 'latency'])
+
+HEADER = 'symbol,time,open,high,low,close,volume'
+
+# Parse one feed line; received is the perf_counter() time the line arrived
+def parse_bar(line, received):
+    symbol, stamp, open_, high, low, close, volume = line.rstrip('\r\n').split(',')
+    return Bar(symbol, datetime.fromisoformat(stamp), float(open_), float(high), float(low), float(close),
+               float(volume), received)
+
+# Decision logic and paper fills for one symbol
+class SymbolTrader:
+    def __init__(self, symbol, params):
+        p = params
+        self.symbol = symbol
+        self.params = p
+        self.sma_mr = incremental.SMA(p['mean_reversion_period'])
+        self.stddev_mr = incremental.StdDev(p['mean_reversion_period'])
+        self.crsi = incremental.ConnorsRSI(p['crsi_rsi_period'], p['crsi_streak_rsi_period'], p['crsi_rank_period'])
+        self.sma_tf = incremental.SMA(p['trend_following_period'])
+        self.highest_bo = incremental.Highest(p['breakout_period'])
+        self.lowest_bo = incremental.Lowest(p['breakout_period'])
+        self.vwap = incremental.session_vwap(p['vwap_anchor']) if p['vwap_condition'] else None
+        self.start = warmup_bars(p)
+        self.stop_factor = 1 - p['stop_loss']
+        self.profit_factor = 1 + p['take_profit']
+
+        self.bars = 0
+        self.cash = STARTING_CASH
+        self.position = 0
+        self.buy_price = None
+        self.pending = 0
+        self.entry = None
+        self.trades = []
+        self.value = STARTING_CASH
+
+    # Process one bar; returns (action, reason) when an order is placed, else None
+    def on_bar(self, time_, open_, high, low, close, volume):
+        t = self.bars
+        self.bars += 1
+        # Orders placed on the previous bar fill at this bar's open
+        if self.pending == 1:
+            if open_ <= self.cash:
+                self.cash -= open_
+                self.position = 1
+                self.entry = (t, time_, open_)
+        elif self.pending == -1:
+            self.cash += open_
+            self.position = 0
+            entry_bar, entry_time, entry_price = self.entry
+            self.trades.append((entry_bar, entry_time, entry_price, t, time_, open_))
+        self.pending = 0
+
+        # next() compares against the previous bar's Highest/Lowest
+        prev_high = self.highest_bo.value
+        prev_low = self.lowest_bo.value
+        sma_mr = self.sma_mr.update(close)
+        deviation = self.stddev_mr.update(close) * self.params['mean_reversion_dev_factor']
+        crsi = self.crsi.update(close)
+        sma_tf = self.sma_tf.update(close)
+        self.highest_bo.update(high)
+        self.lowest_bo.update(low)
+        vwap = self.vwap.update(time_, high, low, close, volume) if self.vwap is not None else None
+
+        decision = None
+        if t >= self.start:
+            decision = self._decide(close, sma_mr + deviation, sma_mr - deviation, crsi, sma_tf, prev_high, prev_low,
+                                    vwap)
+        self.value = self.cash + self.position * close
+        return decision
+
+    # CombinedStrategy.next() for a long-only book
+    def _decide(self, close, upper, lower, crsi, sma_tf, prev_high, prev_low, vwap):
+        p = self.params
+        use_vwap = vwap is not None
+        if not self.position:
+            if close < lower and crsi < p['crsi_lower_threshold'] and (not use_vwap or close < vwap):
+                return self._buy(close, 'Mean Reversion')
+            elif close > upper or crsi > p['crsi_upper_threshold'] or (use_vwap and close > vwap):
+                return None
+            elif close > sma_tf and (not use_vwap or close > vwap):
+                return self._buy(close, 'Trend Following')
+            elif close < sma_tf or (use_vwap and close < vwap):
+                return None
+            elif close > prev_high and (not use_vwap or close > vwap):
+                return self._buy(close, 'Breakout')
+            return None
+        if self.buy_price and (close <= self.buy_price * self.stop_factor or close >= self.buy_price * self.profit_factor):
+            self.pending = -1
+            return 'SELL', 'Exit Position (Stop Loss/Take Profit)'
+        if close < lower or close < sma_tf or close < prev_low:
+            self.pending = -1
+            return 'SELL', 'Exit Position'
+        return None
+
+    def _buy(self, close, reason):
+        self.pending = 1
+        self.buy_price = close
+        return 'BUY', reason
+
+# Routes bars to one SymbolTrader per symbol and records signals and latency.
+# Signals also go to event_sink (PrintSink by default) with the symbol in the reason.
+class PaperTrader:
+    def __init__(self, params=None, event_sink=None):
+        self.params = default_params()
+        self.params.update(params or {})
+        self.event_sink = event_sink if event_sink is not None else PrintSink()
+        self._log_level = self.event_sink.level
+        self.traders = {}
+        self.signals = []
+        self.latencies = array('d')
+        self.bars = 0
+
+    def on_bar(self, bar):
+        trader = self.traders.get(bar.symbol)
+        if trader is None:
+            trader = self.traders[bar.symbol] = SymbolTrader(bar.symbol, self.params)
+        decision = trader.on_bar(bar.time, bar.open, bar.high, bar.low, bar.close, bar.volume)
+        latency = time.perf_counter() - bar.received
+        self.latencies.append(latency)
+        self.bars += 1
+        if decision is not None:
+            action, reason = decision
+            self.signals.append(Signal(bar.symbol, bar.time, action, bar.close, reason, latency))
+            if INFO >= self._log_level:
+                self.event_sink.write(bt.date2num(bar.time), action, bar.close, f'{reason} ({bar.symbol})')
+        return decision
+
+    # Consume a feed until it ends
+    def run(self, bars):
+        for bar in bars:
+            self.on_bar(bar)
+        return self
+
+    # Bar-to-decision latency percentiles in microseconds
+    def latency_summary(self):
+        if not self.latencies:
+            return {}
+        values = np.frombuffer(self.latencies, dtype=float) * 1e6
+        return {'bars': len(values), 'mean_us': float(values.mean()),
+                **{f'p{q}_us': float(np.percentile(values, q)) for q in (50, 90, 99)}, 'max_us': float(values.max())}
+
+    # Closed trades of every symbol
+    def trades(self):
+        rows = [(symbol, *trade) for symbol, trader in self.traders.items() for trade in trader.trades]
+        return pd.DataFrame(rows, columns=['symbol', 'entry_bar', 'entry_time', 'entry_price', 'exit_bar', 'exit_time',
+                                           'exit_price'])
+
+    def values(self):
+        return pd.Series({symbol: trader.value for symbol, trader in self.traders.items()}, name='value')
+
+# Write {symbol: OHLCV frame} as one replay file, bars interleaved by time
+def write_replay(frames, path):
+    parts = []
+    for symbol, frame in frames.items():
+        columns = {c.lower(): c for c in frame.columns}
+        part = pd.DataFrame({name: frame[columns[name]].to_numpy(dtype=float)
+                             for name in ('open', 'high', 'low', 'close', 'volume')})
+        part.insert(0, 'time', pd.DatetimeIndex(frame.index).strftime('%Y-%m-%dT%H:%M:%S'))
+        part.insert(0, 'symbol', symbol)
+        parts.append(part)
+    bars = pd.concat(parts, ignore_index=True).sort_values('time', kind='stable')
+    bars.to_csv(path, index=False, header=HEADER.split(','))
+
+# Bars from a replay file. speed=None replays as fast as possible; speed=60
+# plays a minute of bar time per second of wall time.
+def replay_file(path, speed=None):
+    with open(path) as f:
+        first = f.readline()
+        if first.strip() and first.strip() != HEADER:
+            yield parse_bar(first, time.perf_counter())
+        last_time = None
+        started = None
+        for line in f:
+            received = time.perf_counter()
+            bar = parse_bar(line, received)
+            if speed:
+                if last_time is None:
+                    last_time, started = bar.time, received
+                else:
+                    due = started + (bar.time - last_time).total_seconds() / speed
+                    if due > received:
+                        time.sleep(due - received)
+                        bar = bar._replace(received=time.perf_counter())
+            yield bar
+
+# Bars from a TCP server sending one line per bar; ends when the server closes
+def socket_feed(host, port):
+    with socket.create_connection((host, port)) as connection, connection.makefile('r') as stream:
+        for line in stream:
+            received = time.perf_counter()
+            if line.strip() and not line.startswith(HEADER):
+                yield parse_bar(line, received)
+
+# Local stand-in for a market data feed: serve the lines of a replay file to
+# the first client that connects, then close. Returns (thread, port).
+def serve(path, host='127.0.0.1', port=0):
+    server = socket.create_server((host, port))
+    port = server.getsockname()[1]
+
+    def stream():
+        with server:
+            connection, _ = server.accept()
+            with connection, open(path, 'rb') as f:
+                connection.sendfile(f)
+    thread = threading.Thread(target=stream, daemon=True)
+    thread.start()
+    return thread, port
+
+def _report(trader, elapsed):
+    print(f"{trader.bars:,} bars for {len(trader.traders)} symbols in {elapsed:.2f}s "
+          f"({trader.bars / elapsed:,.0f} bars/s), {len(trader.signals)} signals")
+    latency = trader.latency_summary()
+    latency.pop('bars', None)
+    print('Bar-to-decision latency: ' + ', '.join(f'{name} {value:,.1f}' for name, value in latency.items()))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Paper-trade CombinedStrategy on a bar stream.')
+    parser.add_argument('replay', nargs='?', help='replay file (symbol,time,open,high,low,close,volume)')
+    parser.add_argument('--connect', help='host:port of a line feed')
+    parser.add_argument('--speed', type=float, help='replay speed-up over bar time (default: as fast as possible)')
+    parser.add_argument('--demo', action='store_true', help='replay synthetic minute bars over a local socket')
+    parser.add_argument('--symbols', type=int, default=300)
+    parser.add_argument('--bars', type=int, default=1000)
+    parser.add_argument('--quiet', action='store_true', help='do not print signals')
+    args = parser.parse_args()
+
+    trader = PaperTrader(event_sink=NullSink() if args.quiet or args.demo else None)
+    started = time.perf_counter()
+    if args.demo:
+        with tempfile.TemporaryDirectory(prefix='live_') as directory:
+            path = os.path.join(directory, 'replay.csv')
+            write_replay({f'S{k:04d}': synthetic_ohlcv(args.bars, seed=k, freq='min') for k in range(args.symbols)},
+                         path)
+            _, port = serve(path)
+            started = time.perf_counter()
+            trader.run(socket_feed('127.0.0.1', port))
+    elif args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        trader.run(socket_feed(host, int(port)))
+    elif args.replay:
+        trader.run(replay_file(args.replay, args.speed))
+    else:
+        parser.error('give a replay file, --connect or --demo')
+    _report(trader, time.perf_counter() - started)
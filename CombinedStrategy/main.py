@@ -1,18 +1,32 @@
 # main.py
 
-import yfinance as yf
+import os
+import sys
 import backtrader as bt
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from parameters import *
 from strategies import CombinedStrategy
+from feeds import make_feed, cached_columns
 
-# Fetch historical stock data for a single stock
-def fetch_data(ticker, start, end):
-    stock_data = yf.download(ticker, start=start, end=end)
-    stock_data['Open Interest'] = 0  # Backtrader requires this column
-    return stock_data
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from market_data import MarketDataStore, DEFAULT_CACHE_DIR
+
+# Memory-mapped feed columns written from the market data, one directory per distinct history
+COLUMNS_DIR = os.path.join(DEFAULT_CACHE_DIR, '_columns')
+
+_store = None
+
+# Fetch historical stock data for a single stock, served from the local store
+# (or the given MarketDataStore) when cached
+def fetch_data(ticker, start, end, store=None):
+    global _store
+    if store is None:
+        if _store is None:
+            _store = MarketDataStore()
+        store = _store
+    return store.get(ticker, start, end).copy()
 
 # Performance metrics calculation
 def calculate_performance_metrics(strategy):
@@ -44,13 +58,14 @@ def calculate_performance_metrics(strategy):
 
 # Main script execution
 if __name__ == '__main__':
-    # Fetch data
+    # Fetch data; Cerebro reads it from memory-mapped columns written on the first run
     data = fetch_data(TICKER, start=START_DATE, end=END_DATE)
+    columns = cached_columns(data, COLUMNS_DIR)
 
     # Backtesting with combined strategy
     cerebro = bt.Cerebro()
     start_value = cerebro.broker.getvalue()
-    data_feed = bt.feeds.PandasData(dataname=data, name=TICKER)
+    data_feed = make_feed(columns, TICKER)
     cerebro.adddata(data_feed)
     cerebro.addstrategy(CombinedStrategy)
     cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
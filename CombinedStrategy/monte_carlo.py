@@ -0,0 +1,141 @@
+# monte_carlo.py
+#
+# Robustness check for a CombinedStrategy parameter set: resample the
+# historical bars into thousands of synthetic price paths and report the
+# distribution of Sharpe ratio, drawdown and return across them.
+#
+# A path is built from the bars' shapes relative to the previous close:
+# close-to-close growth, open/high/low as fractions of the close, and volume,
+# all taken from the same historical bar so every bar stays consistent. Bars
+# are resampled in blocks so short-range structure such as volatility
+# clustering survives:
+#   method='block'      - moving blocks of block_size bars, wrapping around
+#   method='stationary' - Politis-Romano stationary bootstrap, block lengths
+#                         geometric with mean block_size
+# Each path starts from the first historical bar and keeps the historical
+# timestamps, so daily returns and Sharpe are measured as in evaluate().
+#
+# Every path draws from its own random stream spawned from `seed`, so a path
+# is the same whatever chunk_size is. Paths are evaluated chunk_size at a time
+# as (path x time) matrices through vector_engine.signals and batch_simulate;
+# peak memory follows chunk_size x bars and does not grow with n_paths.
+#
+#   python monte_carlo.py --paths 10000 --method stationary --block 20
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import vector_engine
+from vector_engine import STARTING_CASH, default_params, frame_arrays, signals, batch_simulate, batch_metrics
+from main import fetch_data
+from synthetic import synthetic_ohlcv
+from parameters import TICKER, START_DATE, END_DATE
+
+SUMMARY_METRICS = ['sharpe_ratio', 'max_drawdown', 'final_return', 'total_trades']
+
+# Indices of `length` resampled bars out of n, for one path
+def resample_indices(n, length, block_size, method, rng):
+    if method == 'block':
+        starts = rng.integers(0, n, -(-length // block_size))
+        return ((starts[:, None] + np.arange(block_size)) % n).ravel()[:length]
+    if method == 'stationary':
+        new_block = rng.random(length) < 1.0 / block_size
+        new_block[0] = True
+        starts = rng.integers(0, n, length)
+        positions = np.arange(length)
+        block_start = np.maximum.accumulate(np.where(new_block, positions, 0))
+        return (starts[block_start] + positions - block_start) % n
+    raise ValueError(f"Unknown method: {method}")
+
+# Per-bar shapes of bars 1..n-1: growth of the close and open/high/low relative to the close
+def bar_shapes(arrays):
+    close = arrays['close']
+    return {
+        'growth': close[1:] / close[:-1],
+        'open': arrays['open'][1:] / close[1:],
+        'high': arrays['high'][1:] / close[1:],
+        'low': arrays['low'][1:] / close[1:],
+        'volume': arrays['volume'][1:],
+    }
+
+# (path x time) price arrays from a matrix of resampled bar indices
+def build_paths(arrays, shapes, indices):
+    n_paths = len(indices)
+    close = np.empty((n_paths, indices.shape[1] + 1))
+    close[:, 0] = arrays['close'][0]
+    close[:, 1:] = arrays['close'][0] * np.cumprod(shapes['growth'][indices], axis=1)
+    paths = {'close': close, 'time': arrays['time']}
+    for name in ('open', 'high', 'low'):
+        paths[name] = np.empty_like(close)
+        paths[name][:, 0] = arrays[name][0]
+        paths[name][:, 1:] = close[:, 1:] * shapes[name][indices]
+    paths['volume'] = np.empty_like(close)
+    paths['volume'][:, 0] = arrays['volume'][0]
+    paths['volume'][:, 1:] = shapes['volume'][indices]
+    return paths
+
+# Metrics of params on n_paths resampled paths, one row per path (the
+# grid_search metrics plus final_return, the change in portfolio value)
+def simulate_paths(data, params=None, n_paths=1000, method='stationary', block_size=20, seed=0, chunk_size=256):
+    p = default_params()
+    p.update(params or {})
+    arrays = frame_arrays(data)
+    shapes = bar_shapes(arrays)
+    n_shapes = len(shapes['growth'])
+    days = pd.DatetimeIndex(data.index).normalize()
+    last_of_day = np.flatnonzero(np.append(days[1:] != days[:-1], True))
+    one_row = pd.DataFrame([p])
+    generators = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(n_paths)]
+
+    frames = []
+    for first in range(0, n_paths, chunk_size):
+        rngs = generators[first:first + chunk_size]
+        indices = np.stack([resample_indices(n_shapes, n_shapes, block_size, method, rng) for rng in rngs])
+        paths = build_paths(arrays, shapes, indices)
+        buy, exit_signal, start = signals(paths, p)
+        value, closed, won, bars = batch_simulate(paths, one_row, buy, exit_signal, start)
+        metrics = batch_metrics(value, closed, won, bars, last_of_day,
+                                index=pd.RangeIndex(first, first + len(rngs), name='path'))
+        metrics['final_return'] = value[:, -1] / STARTING_CASH - 1.0
+        frames.append(metrics)
+    return pd.concat(frames)
+
+# The same metrics on the historical path
+def historical_metrics(data, params=None):
+    metrics, _ = vector_engine.evaluate(data, **(params or {}))
+    _, value = vector_engine.backtest(data, **(params or {}))
+    return {**metrics, 'final_return': value.iloc[-1] / STARTING_CASH - 1.0}
+
+# Distribution of each metric across paths: mean, spread and percentiles,
+# with the historical value and the share of paths below it when given.
+# Paths without a Sharpe ratio (no variation in value) are left out of its row.
+def summarize(path_metrics, historical=None, metrics=SUMMARY_METRICS):
+    rows = {}
+    for name in metrics:
+        values = path_metrics[name].replace([np.inf, -np.inf], np.nan).dropna()
+        row = {'paths': len(values), 'mean': values.mean(), 'std': values.std()}
+        row.update({f'p{q}': values.quantile(q / 100) for q in (5, 25, 50, 75, 95)})
+        if historical is not None:
+            row['historical'] = historical[name]
+            row['below_historical'] = (values < historical[name]).mean()
+        rows[name] = row
+    return pd.DataFrame(rows).T
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bootstrap robustness check of CombinedStrategy.')
+    parser.add_argument('--paths', type=int, default=10_000)
+    parser.add_argument('--method', default='stationary', choices=['stationary', 'block'])
+    parser.add_argument('--block', type=int, default=20, help='block size (mean block size for stationary)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=256, help='paths evaluated at once')
+    parser.add_argument('--synthetic', type=int, help='use this many synthetic bars instead of market data')
+    args = parser.parse_args()
+
+    data = synthetic_ohlcv(args.synthetic) if args.synthetic else fetch_data(TICKER, start=START_DATE, end=END_DATE)
+    started = time.perf_counter()
+    path_metrics = simulate_paths(data, n_paths=args.paths, method=args.method, block_size=args.block,
+                                  seed=args.seed, chunk_size=args.chunk)
+    elapsed = time.perf_counter() - started
+    print(summarize(path_metrics, historical_metrics(data)).to_string(float_format='{:.4f}'.format))
+    print(f"{args.paths:,} paths of {len(data):,} bars in {elapsed:.1f}s ({args.paths / elapsed:,.0f} paths/s)")
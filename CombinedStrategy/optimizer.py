@@ -0,0 +1,156 @@
+# optimizer.py
+#
+# Parameter search for grid_search without materialising the grid.
+# ParameterSpace decodes any combination from its position in the grid, so
+# sampling is a seeded draw of integers. On top of it:
+#   successive_halving - score many candidates on a truncated history and
+#                        promote the best 1/eta to longer histories
+#   hyperband          - several successive-halving brackets trading the
+#                        number of candidates against their starting history
+#   tpe                - Tree-structured Parzen Estimator over the discrete
+#                        grid: propose combinations that look like the best
+#                        ones so far and unlike the rest
+# Every function takes evaluate(param_comb, data) -> grid_search metrics dict
+# and returns a history DataFrame with one row per backtest: the metrics plus
+# 'bars' (history length used) and 'stage'.
+
+import itertools
+import math
+import random
+from collections.abc import Sequence
+import numpy as np
+import pandas as pd
+
+# Lazy view of itertools.product(*grid.values()) with the same ordering
+class ParameterSpace(Sequence):
+    def __init__(self, grid):
+        self.names = list(grid)
+        self.values = [list(values) for values in grid.values()]
+        self.sizes = [len(values) for values in self.values]
+        self._len = math.prod(self.sizes)
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError('ParameterSpace index out of range')
+        combination = []
+        for size, values in zip(reversed(self.sizes), reversed(self.values)):
+            i, digit = divmod(i, size)
+            combination.append(values[digit])
+        return tuple(reversed(combination))
+
+    def __iter__(self):
+        return itertools.product(*self.values)
+
+    def index(self, combination, start=0, stop=None):
+        i = 0
+        for size, values, value in zip(self.sizes, self.values, combination):
+            i = i * size + values.index(value)
+        return i
+
+    # n distinct combinations drawn without replacement; the same seed gives the same draw
+    def sample(self, n, seed=None):
+        rng = random.Random(seed)
+        return [self[i] for i in rng.sample(range(self._len), min(n, self._len))]
+
+def _evaluate(evaluate, param_comb, data, bars, stage):
+    metrics = evaluate(param_comb, data.iloc[:bars])
+    return {**metrics, 'params': param_comb, 'bars': bars, 'stage': stage}
+
+# Keep the best `keep` rows by Sharpe ratio (ties keep the earlier candidate)
+def _top(rows, keep):
+    order = sorted(range(len(rows)), key=lambda k: (-rows[k]['sharpe_ratio'], k))
+    return [rows[k]['params'] for k in order[:keep]]
+
+# Most rungs of eta-fold growth that fit between min_window and window bars
+def _max_rungs(window, min_window, eta):
+    if window < min_window:
+        return 0
+    return int(math.floor(math.log(window / min_window, eta) + 1e-9))
+
+# Successive halving: evaluate the candidates on a truncated history, keep the
+# best 1/eta, multiply the history by eta, and repeat until the survivors have
+# been run on the full history. The first warmup_bars of every history only
+# let the indicators fill, so what grows is the part after them: the first
+# rung trades (len(data) - warmup_bars) / eta**n_rungs bars, and never fewer
+# than min_bars - warmup_bars. n_rungs defaults to as many halvings as the
+# candidate count allows and is capped by what the data allows, so no two
+# rungs run on the same history.
+def successive_halving(space, data, evaluate, n_candidates=81, eta=3, min_bars=0, warmup_bars=0, seed=0,
+                       candidates=None, n_rungs=None, stage=''):
+    if candidates is None:
+        candidates = space.sample(n_candidates, seed)
+    candidates = list(candidates)
+    if n_rungs is None:
+        n_rungs = int(math.floor(math.log(len(candidates), eta) + 1e-9)) if candidates else 0
+    window = len(data) - warmup_bars
+    min_window = max(min_bars - warmup_bars, 1)
+    n_rungs = min(n_rungs, _max_rungs(window, min_window, eta))
+    history = []
+    for rung in range(n_rungs + 1):
+        bars = len(data) if rung == n_rungs else warmup_bars + max(min_window, window // eta ** (n_rungs - rung))
+        rows = [_evaluate(evaluate, param_comb, data, bars, f'{stage}rung {rung}') for param_comb in candidates]
+        history.extend(rows)
+        if rung < n_rungs:
+            candidates = _top(rows, max(len(candidates) // eta, 1))
+    return pd.DataFrame(history)
+
+# Hyperband: brackets of successive halving from many short runs to a few full
+# ones, so a bad choice of starting history length cannot sink the search
+def hyperband(space, data, evaluate, eta=3, min_bars=0, warmup_bars=0, seed=0):
+    s_max = _max_rungs(len(data) - warmup_bars, max(min_bars - warmup_bars, 1), eta)
+    history = []
+    for s in range(s_max, -1, -1):
+        # Bracket s starts n_candidates on the shortest history and halves s times
+        n_candidates = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        candidates = space.sample(n_candidates, None if seed is None else seed + s)
+        history.append(successive_halving(space, data, evaluate, eta=eta, min_bars=min_bars, warmup_bars=warmup_bars,
+                                          candidates=candidates, n_rungs=s, stage=f'bracket {s} '))
+    return pd.concat(history, ignore_index=True)
+
+# Tree-structured Parzen Estimator over the grid. After n_startup random
+# combinations, each trial splits the results into the best `gamma` share and
+# the rest, models each parameter as a smoothed categorical distribution in
+# both groups, draws n_proposals combinations from the good model and runs
+# the unseen one with the highest good/bad likelihood ratio.
+def tpe(space, data, evaluate, n_trials=60, n_startup=15, gamma=0.25, n_proposals=64, seed=0):
+    rng = np.random.default_rng(seed)
+    startup = space.sample(min(n_startup, n_trials), seed)
+    seen = set()
+    history = []
+
+    def log_density(rows, dim):
+        counts = np.ones(space.sizes[dim])
+        for row in rows:
+            counts[space.values[dim].index(row['params'][dim])] += 1
+        return np.log(counts / counts.sum())
+
+    for trial in range(min(n_trials, len(space))):
+        if trial < len(startup):
+            param_comb = startup[trial]
+        else:
+            ranked = sorted(history, key=lambda row: -row['sharpe_ratio'])
+            n_good = max(1, int(math.ceil(gamma * len(ranked))))
+            good, bad = ranked[:n_good], ranked[n_good:]
+            good_density = [log_density(good, d) for d in range(len(space.sizes))]
+            bad_density = [log_density(bad, d) for d in range(len(space.sizes))]
+            digits = np.column_stack([rng.choice(size, n_proposals, p=np.exp(good_density[d]))
+                                      for d, size in enumerate(space.sizes)])
+            score = sum(good_density[d][digits[:, d]] - bad_density[d][digits[:, d]] for d in range(len(space.sizes)))
+            param_comb = None
+            for k in np.argsort(-score, kind='stable'):
+                proposal = tuple(space.values[d][digit] for d, digit in enumerate(digits[k]))
+                if proposal not in seen:
+                    param_comb = proposal
+                    break
+            while param_comb is None or param_comb in seen:
+                param_comb = space[int(rng.integers(len(space)))]
+        seen.add(param_comb)
+        history.append(_evaluate(evaluate, param_comb, data, len(data), f'trial {trial}'))
+    return pd.DataFrame(history)
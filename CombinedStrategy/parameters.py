@@ -14,4 +14,5 @@ STOP_LOSS = 0.02
 TAKE_PROFIT = 0.04
 CRSI_LOWER_THRESHOLD = 30
 CRSI_UPPER_THRESHOLD =80
-VWAP_CONDITION = False
\ No newline at end of file
+VWAP_CONDITION = False
+VWAP_ANCHOR = None  # None: VWAP from the first bar; 'day', 'week', 'month' or a list of timestamps to reset at
@@ -0,0 +1,174 @@
+# results_store.py
+#
+# On-disk results for grid search sweeps, one SQLite file per sweep. Every
+# finished run is committed as it arrives: one row of metrics in `runs` and
+# its TimeReturn series in `curves`, so memory stays flat however long the
+# sweep is and a crash loses at most the run in flight. Re-running a sweep on
+# the same file skips the combinations that are already stored.
+#
+# Equity curves are stored compactly: returns as float32, timestamps as
+# zlib-compressed int64 steps, and with downsample=k only every k-th point is
+# kept (returns compounded over each block of k periods, so the curve is
+# exact at the points that remain).
+#
+# top() and best() sort inside SQLite and read back only the rows asked for.
+
+import json
+import sqlite3
+import zlib
+import numpy as np
+import pandas as pd
+
+# Compound per-period returns over blocks of `every` periods; each block is
+# stamped with its last timestamp
+def downsample_returns(times, returns, every):
+    if not len(returns):
+        return times, returns
+    ends = np.arange(every - 1, len(returns), every)
+    if not len(ends) or ends[-1] != len(returns) - 1:
+        ends = np.append(ends, len(returns) - 1)
+    growth = np.cumprod(1.0 + returns)
+    return times[ends], growth[ends] / np.concatenate(([1.0], growth[ends[:-1]])) - 1.0
+
+def _value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+def _key(param_comb):
+    return json.dumps([_value(value) for value in param_comb])
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+class ResultsStore:
+    # sweep: optional dict describing the sweep (data, backend...). It is saved
+    # with a new store and a store opened with a different one raises ValueError,
+    # so a resumed sweep cannot mix results from different data.
+    def __init__(self, path, sweep=None, downsample=None):
+        self.path = path
+        self.downsample = downsample
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS runs (seq INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS curves (key TEXT PRIMARY KEY, times BLOB, returns BLOB)')
+        self._columns = [row[1] for row in self._connection.execute('PRAGMA table_info(runs)')]
+        if sweep is not None:
+            self._check_sweep(sweep)
+
+    def _check_sweep(self, sweep):
+        text = json.dumps(sweep, sort_keys=True, default=str)
+        row = self._connection.execute("SELECT value FROM meta WHERE name = 'sweep'").fetchone()
+        if row is None:
+            with self._connection:
+                self._connection.execute("INSERT INTO meta VALUES ('sweep', ?)", (text,))
+        elif row[0] != text:
+            raise ValueError(f"{self.path} holds results of a different sweep: {row[0]}")
+
+    def _add_columns(self, names):
+        for name in names:
+            if name not in self._columns:
+                self._connection.execute(f'ALTER TABLE runs ADD COLUMN {_quote(name)}')
+                self._columns.append(name)
+
+    def _insert(self, param_comb, metrics):
+        self._add_columns(metrics)
+        names = ['key', *metrics]
+        self._connection.execute(
+            f'INSERT OR REPLACE INTO runs ({", ".join(map(_quote, names))}) VALUES ({", ".join("?" * len(names))})',
+            [_key(param_comb), *(_value(metrics[name]) for name in metrics)])
+
+    # times: int64 nanoseconds, returns: float64 per-period returns
+    def _insert_curve(self, param_comb, times, returns):
+        if self.downsample and self.downsample > 1:
+            times, returns = downsample_returns(times, returns, self.downsample)
+        steps = np.diff(times, prepend=np.int64(0)).astype('<i8')
+        self._connection.execute('INSERT OR REPLACE INTO curves VALUES (?, ?, ?)',
+                                 (_key(param_comb), zlib.compress(steps.tobytes()),
+                                  returns.astype('<f4').tobytes()))
+
+    # Store one finished run: its metrics dict (without 'params') and,
+    # optionally, its TimeReturn analysis. Committed before returning.
+    def add(self, param_comb, metrics, timereturn=None):
+        metrics = {name: value for name, value in metrics.items() if name != 'params'}
+        with self._connection:
+            self._insert(param_comb, metrics)
+            if timereturn is not None:
+                times = pd.DatetimeIndex(list(timereturn.keys())).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+                returns = np.fromiter(timereturn.values(), dtype=np.float64, count=len(timereturn))
+                self._insert_curve(param_comb, times, returns)
+
+    # Store a results_df-style table (a 'params' column plus metrics) in one
+    # transaction. curves=(times, returns) adds an equity curve per row:
+    # returns is a (row x period) matrix over the DatetimeIndex `times`.
+    def add_frame(self, results_df, curves=None):
+        metrics = [column for column in results_df.columns if column != 'params']
+        if curves is not None:
+            times = pd.DatetimeIndex(curves[0]).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        with self._connection:
+            for k, row in enumerate(results_df.itertuples(index=False)):
+                row = row._asdict()
+                self._insert(row['params'], {name: row[name] for name in metrics})
+                if curves is not None:
+                    self._insert_curve(row['params'], times, np.asarray(curves[1][k], dtype=np.float64))
+
+    def __len__(self):
+        return self._connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+
+    def __contains__(self, param_comb):
+        return self._connection.execute('SELECT 1 FROM runs WHERE key = ?', (_key(param_comb),)).fetchone() is not None
+
+    # Parameter tuples already stored, leaving out runs stored with
+    # status 'error' so a resumed sweep tries them again
+    def completed(self):
+        query = 'SELECT key FROM runs'
+        if 'status' in self._columns:
+            query += " WHERE status IS NOT 'error'"
+        return {tuple(json.loads(key)) for key, in self._connection.execute(query)}
+
+    def _frame(self, query, args=()):
+        cursor = self._connection.execute(query, args)
+        names = [d[0] for d in cursor.description]
+        frame = pd.DataFrame(cursor.fetchall(), columns=names)
+        frame.insert(0, 'params', pd.Series([tuple(json.loads(key)) for key in frame.pop('key')], dtype=object))
+        return frame.drop(columns='seq')
+
+    # Every stored run in insertion order, as a results_df-style table
+    def results(self):
+        return self._frame('SELECT * FROM runs ORDER BY seq')
+
+    # The n best runs by `by`; ties keep insertion order and NULLs sort last
+    def top(self, n=10, by='sharpe_ratio', ascending=False):
+        if by not in self._columns:
+            raise ValueError(f"Unknown column: {by}")
+        order = 'ASC' if ascending else 'DESC'
+        by = _quote(by)
+        return self._frame(f'SELECT * FROM runs ORDER BY {by} IS NULL, {by} {order}, seq LIMIT ?', (n,))
+
+    # (params, value) of the best run by `by`, (None, -inf) when empty
+    def best(self, by='sharpe_ratio'):
+        if by not in self._columns:
+            return None, -float('inf')
+        top = self.top(1, by)
+        if not len(top):
+            return None, -float('inf')
+        return top.at[0, 'params'], top.at[0, by]
+
+    # Stored TimeReturn series of one run (None if it has none)
+    def equity_curve(self, param_comb):
+        row = self._connection.execute('SELECT times, returns FROM curves WHERE key = ?', (_key(param_comb),)).fetchone()
+        if row is None:
+            return None
+        times = np.cumsum(np.frombuffer(zlib.decompress(row[0]), dtype='<i8'))
+        returns = np.frombuffer(row[1], dtype='<f4').astype(np.float64)
+        return pd.Series(returns, index=pd.DatetimeIndex(times.astype('datetime64[ns]')), name='returns')
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,7 +1,8 @@
 # strategies.py
 
 import backtrader as bt
-from indicators import ConnorsRSI, VWAP
+from indicators import ConnorsRSI, session_vwap
+from event_log import INFO, PrintSink
 from parameters import *
 
 # Mean Reversion Strategy class for Backtrader with Connors RSI and VWAP
@@ -17,6 +18,9 @@ class MeanReversionStrategy(bt.Strategy):
         ('crsi_lower_threshold', CRSI_LOWER_THRESHOLD),
         ('crsi_upper_threshold', CRSI_UPPER_THRESHOLD),
         ('vwap_condition', VWAP_CONDITION),
+        ('vwap_anchor', VWAP_ANCHOR),
+        ('event_sink', None),
+        ('telemetry', None),
     )
 
     def __init__(self):
@@ -28,8 +32,12 @@ class MeanReversionStrategy(bt.Strategy):
                                rsi_period=self.params.crsi_rsi_period, 
                                streak_rsi_period=self.params.crsi_streak_rsi_period, 
                                rank_period=self.params.crsi_rank_period)
-        self.vwap = VWAP(self.data)
+        self.vwap = session_vwap(self.data, self.params.vwap_anchor) if self.params.vwap_condition else None
+        self.event_sink = self.params.event_sink if self.params.event_sink is not None else PrintSink()
+        self._log_level = self.event_sink.level
         self.buy_price = None
+        if self.params.telemetry is not None:
+            self.params.telemetry.instrument(self)
 
     def next(self):
         if not self.position:
@@ -38,7 +46,7 @@ class MeanReversionStrategy(bt.Strategy):
                 (not self.params.vwap_condition or self.data.close < self.vwap)):
                 self.buy()
                 self.buy_price = self.data.close[0]
-                self.log(f'BUY executed, Price: {self.data.close[0]}, Strategy: Mean Reversion')
+                self.log('BUY', self.data.close[0], 'Mean Reversion')
         elif self.position:
             if self.buy_price and (
                 self.data.close > self.upper_band or 
@@ -46,17 +54,17 @@ class MeanReversionStrategy(bt.Strategy):
                 (self.params.vwap_condition and self.data.close > self.vwap)):
                 self.sell()
                 self.buy_price = None
-                self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Mean Reversion')
+                self.log('SELL', self.data.close[0], 'Mean Reversion')
             elif self.buy_price and (
                 self.data.close <= self.buy_price * (1 - self.params.stop_loss) or 
                 self.data.close >= self.buy_price * (1 + self.params.take_profit)):
                 self.sell()
                 self.buy_price = None
-                self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Mean Reversion (Stop Loss/Take Profit)')
+                self.log('SELL', self.data.close[0], 'Mean Reversion (Stop Loss/Take Profit)')
 
-    def log(self, text):
-        dt = self.datas[0].datetime.date(0)
-        print(f'{dt.isoformat()} - {text}')
+    def log(self, action, price, reason, level=INFO):
+        if level >= self._log_level:
+            self.event_sink.write(self.datas[0].datetime[0], action, price, reason)
 
 # Trend Following Strategy class for Backtrader
 class TrendFollowingStrategy(bt.Strategy):
@@ -65,34 +73,41 @@ class TrendFollowingStrategy(bt.Strategy):
         ('stop_loss', STOP_LOSS),
         ('take_profit', TAKE_PROFIT),
         ('vwap_condition', VWAP_CONDITION),
+        ('vwap_anchor', VWAP_ANCHOR),
+        ('event_sink', None),
+        ('telemetry', None),
     )
 
     def __init__(self):
         self.sma = bt.indicators.SimpleMovingAverage(self.data, period=self.params.period)
-        self.vwap = VWAP(self.data)
+        self.vwap = session_vwap(self.data, self.params.vwap_anchor) if self.params.vwap_condition else None
+        self.event_sink = self.params.event_sink if self.params.event_sink is not None else PrintSink()
+        self._log_level = self.event_sink.level
         self.buy_price = None
+        if self.params.telemetry is not None:
+            self.params.telemetry.instrument(self)
 
     def next(self):
         if not self.position:
             if self.data.close > self.sma and (not self.params.vwap_condition or self.data.close > self.vwap):
                 self.buy()
                 self.buy_price = self.data.close[0]
-                self.log(f'BUY executed, Price: {self.data.close[0]}, Strategy: Trend Following')
+                self.log('BUY', self.data.close[0], 'Trend Following')
         elif self.position:
             if self.buy_price and (self.data.close < self.sma or (self.params.vwap_condition and self.data.close < self.vwap)):
                 self.sell()
                 self.buy_price = None
-                self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Trend Following')
+                self.log('SELL', self.data.close[0], 'Trend Following')
             elif self.buy_price and (
                 self.data.close <= self.buy_price * (1 - self.params.stop_loss) or 
                 self.data.close >= self.buy_price * (1 + self.params.take_profit)):
                 self.sell()
                 self.buy_price = None
-                self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Trend Following (Stop Loss/Take Profit)')
+                self.log('SELL', self.data.close[0], 'Trend Following (Stop Loss/Take Profit)')
 
-    def log(self, text):
-        dt = self.datas[0].datetime.date(0)
-        print(f'{dt.isoformat()} - {text}')
+    def log(self, action, price, reason, level=INFO):
+        if level >= self._log_level:
+            self.event_sink.write(self.datas[0].datetime[0], action, price, reason)
 
 # Breakout Strategy class for Backtrader
 class BreakoutStrategy(bt.Strategy):
@@ -101,35 +116,42 @@ class BreakoutStrategy(bt.Strategy):
         ('stop_loss', STOP_LOSS),
         ('take_profit', TAKE_PROFIT),
         ('vwap_condition', VWAP_CONDITION),
+        ('vwap_anchor', VWAP_ANCHOR),
+        ('event_sink', None),
+        ('telemetry', None),
     )
 
     def __init__(self):
         self.highest = bt.indicators.Highest(self.data.high, period=self.params.period)
         self.lowest = bt.indicators.Lowest(self.data.low, period=self.params.period)
-        self.vwap = VWAP(self.data)
+        self.vwap = session_vwap(self.data, self.params.vwap_anchor) if self.params.vwap_condition else None
+        self.event_sink = self.params.event_sink if self.params.event_sink is not None else PrintSink()
+        self._log_level = self.event_sink.level
         self.buy_price = None
+        if self.params.telemetry is not None:
+            self.params.telemetry.instrument(self)
 
     def next(self):
         if not self.position:
             if self.data.close > self.highest[-1] and (not self.params.vwap_condition or self.data.close > self.vwap):
                 self.buy()
                 self.buy_price = self.data.close[0]
-                self.log(f'BUY executed, Price: {self.data.close[0]}, Strategy: Breakout')
+                self.log('BUY', self.data.close[0], 'Breakout')
         elif self.position:
             if self.buy_price and (self.data.close < self.lowest[-1] or (self.params.vwap_condition and self.data.close < self.vwap)):
                 self.sell()
                 self.buy_price = None
-                self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Breakout')
+                self.log('SELL', self.data.close[0], 'Breakout')
             elif self.buy_price and (
                 self.data.close <= self.buy_price * (1 - self.params.stop_loss) or 
                 self.data.close >= self.buy_price * (1 + self.params.take_profit)):
                 self.sell()
                 self.buy_price = None
-                self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Breakout (Stop Loss/Take Profit)')
+                self.log('SELL', self.data.close[0], 'Breakout (Stop Loss/Take Profit)')
 
-    def log(self, text):
-        dt = self.datas[0].datetime.date(0)
-        print(f'{dt.isoformat()} - {text}')
+    def log(self, action, price, reason, level=INFO):
+        if level >= self._log_level:
+            self.event_sink.write(self.datas[0].datetime[0], action, price, reason)
 
 # Combined Strategy class for Backtrader
 class CombinedStrategy(bt.Strategy):
@@ -146,76 +168,110 @@ class CombinedStrategy(bt.Strategy):
         ('crsi_lower_threshold', CRSI_LOWER_THRESHOLD),
         ('crsi_upper_threshold', CRSI_UPPER_THRESHOLD),
         ('vwap_condition', VWAP_CONDITION),
+        ('vwap_anchor', VWAP_ANCHOR),
+        ('indicator_cache', None),
+        ('event_sink', None),
+        ('telemetry', None),
     )
 
     def __init__(self):
-        # Mean Reversion Strategy
-        self.sma_mr = bt.indicators.SimpleMovingAverage(self.data, period=self.params.mean_reversion_period)
-        self.stddev_mr = bt.indicators.StandardDeviation(self.data, period=self.params.mean_reversion_period)
-        self.upper_band_mr = self.sma_mr + self.stddev_mr * self.params.mean_reversion_dev_factor
-        self.lower_band_mr = self.sma_mr - self.stddev_mr * self.params.mean_reversion_dev_factor
-        self.crsi = ConnorsRSI(self.data, 
-                               rsi_period=self.params.crsi_rsi_period, 
-                               streak_rsi_period=self.params.crsi_streak_rsi_period, 
-                               rank_period=self.params.crsi_rank_period)
-        self.vwap = VWAP(self.data)
+        if self.params.indicator_cache is not None:
+            self._init_cached_indicators()
+        else:
+            # Mean Reversion Strategy
+            self.sma_mr = bt.indicators.SimpleMovingAverage(self.data, period=self.params.mean_reversion_period)
+            self.stddev_mr = bt.indicators.StandardDeviation(self.data, period=self.params.mean_reversion_period)
+            self.crsi = ConnorsRSI(self.data, 
+                                   rsi_period=self.params.crsi_rsi_period, 
+                                   streak_rsi_period=self.params.crsi_streak_rsi_period, 
+                                   rank_period=self.params.crsi_rank_period)
+            self.vwap = session_vwap(self.data, self.params.vwap_anchor) if self.params.vwap_condition else None
 
-        # Trend Following Strategy
-        self.sma_tf = bt.indicators.SimpleMovingAverage(self.data, period=self.params.trend_following_period)
+            # Trend Following Strategy
+            self.sma_tf = bt.indicators.SimpleMovingAverage(self.data, period=self.params.trend_following_period)
 
-        # Breakout Strategy
-        self.highest_bo = bt.indicators.Highest(self.data.high, period=self.params.breakout_period)
-        self.lowest_bo = bt.indicators.Lowest(self.data.low, period=self.params.breakout_period)
+            # Breakout Strategy
+            self.highest_bo = bt.indicators.Highest(self.data.high, period=self.params.breakout_period)
+            self.lowest_bo = bt.indicators.Lowest(self.data.low, period=self.params.breakout_period)
 
+        self.upper_band_mr = self.sma_mr + self.stddev_mr * self.params.mean_reversion_dev_factor
+        self.lower_band_mr = self.sma_mr - self.stddev_mr * self.params.mean_reversion_dev_factor
+        self.event_sink = self.params.event_sink if self.params.event_sink is not None else PrintSink()
+        self._log_level = self.event_sink.level
         self.buy_price = None
+        if self.params.telemetry is not None:
+            self.params.telemetry.instrument(self)
+
+    # Read the same indicator series from a shared IndicatorCache instead of rebuilding them
+    def _init_cached_indicators(self):
+        specs = [
+            ('sma', {'period': self.params.mean_reversion_period}),
+            ('stddev', {'period': self.params.mean_reversion_period}),
+            ('crsi', {'rsi_period': self.params.crsi_rsi_period,
+                      'streak_rsi_period': self.params.crsi_streak_rsi_period,
+                      'rank_period': self.params.crsi_rank_period}),
+            ('sma', {'period': self.params.trend_following_period}),
+            ('highest', {'period': self.params.breakout_period}),
+            ('lowest', {'period': self.params.breakout_period}),
+        ]
+        if self.params.vwap_condition:
+            anchor = self.params.vwap_anchor
+            specs.append(('vwap', {'anchor': anchor if anchor is None or isinstance(anchor, str) else tuple(anchor)}))
+        lines = self.params.indicator_cache.lines(self.data, specs)
+        self.sma_mr, self.stddev_mr, self.crsi, self.sma_tf, self.highest_bo, self.lowest_bo = lines[:6]
+        self.vwap = lines[6] if self.params.vwap_condition else None
 
     def next(self):
         if not self.position:
             # Check for Mean Reversion
             if (self.data.close < self.lower_band_mr and 
-                self.crsi.crsi < self.params.crsi_lower_threshold and 
+                self.crsi[0] < self.params.crsi_lower_threshold and 
                 (not self.params.vwap_condition or self.data.close < self.vwap)):
                 self.buy()
                 self.buy_price = self.data.close[0]
-                self.log(f'BUY executed, Price: {self.data.close[0]}, Strategy: Mean Reversion')
-            elif self.data.close > self.upper_band_mr or self.crsi.crsi > self.params.crsi_upper_threshold or (self.params.vwap_condition and self.data.close > self.vwap):
+                self.log('BUY', self.data.close[0], 'Mean Reversion')
+            elif self.data.close > self.upper_band_mr or self.crsi[0] > self.params.crsi_upper_threshold or (self.params.vwap_condition and self.data.close > self.vwap):
                 if self.position:
                     self.sell()
-                    self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Mean Reversion')
+                    self.log('SELL', self.data.close[0], 'Mean Reversion')
             # Check for Trend Following
             elif self.data.close > self.sma_tf and (not self.params.vwap_condition or self.data.close > self.vwap):
                 self.buy()
                 self.buy_price = self.data.close[0]
-                self.log(f'BUY executed, Price: {self.data.close[0]}, Strategy: Trend Following')
+                self.log('BUY', self.data.close[0], 'Trend Following')
             elif self.data.close < self.sma_tf or (self.params.vwap_condition and self.data.close < self.vwap):
                 if self.position:
                     self.sell()
-                    self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Trend Following')
+                    self.log('SELL', self.data.close[0], 'Trend Following')
             # Check for Breakout
             elif self.data.close > self.highest_bo[-1] and (not self.params.vwap_condition or self.data.close > self.vwap):
                 self.buy()
                 self.buy_price = self.data.close[0]
-                self.log(f'BUY executed, Price: {self.data.close[0]}, Strategy: Breakout')
+                self.log('BUY', self.data.close[0], 'Breakout')
             elif self.data.close < self.lowest_bo[-1] or (self.params.vwap_condition and self.data.close < self.vwap):
                 if self.position:
                     self.sell()
-                    self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Breakout')
+                    self.log('SELL', self.data.close[0], 'Breakout')
         elif self.position:
             # Managing positions once in a trade based on highest priority strategy
             if self.buy_price and (
                 self.data.close <= self.buy_price * (1 - self.params.stop_loss) or 
                 self.data.close >= self.buy_price * (1 + self.params.take_profit)):
                 self.sell()
-                self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Exit Position (Stop Loss/Take Profit)')
+                self.log('SELL', self.data.close[0], 'Exit Position (Stop Loss/Take Profit)')
             elif self.position.size > 0:  # Long position
                 if self.data.close < self.lower_band_mr or self.data.close < self.sma_tf or self.data.close < self.lowest_bo[-1]:
                     self.sell()
-                    self.log(f'SELL executed, Price: {self.data.close[0]}, Strategy: Exit Position')
+                    self.log('SELL', self.data.close[0], 'Exit Position')
             elif self.position.size < 0:  # Short position
                 if self.data.close > self.upper_band_mr or self.data.close > self.sma_tf or self.data.close > self.highest_bo[-1]:
                     self.buy()
-                    self.log(f'BUY executed, Price: {self.data.close[0]}, Strategy: Exit Position')
+                    self.log('BUY', self.data.close[0], 'Exit Position')
+
+    def stop(self):
+        if self.params.indicator_cache is not None:
+            self.params.indicator_cache.commit()
 
-    def log(self, text):
-        dt = self.datas[0].datetime.date(0)
-        print(f'{dt.isoformat()} - {text}')
+    def log(self, action, price, reason, level=INFO):
+        if level >= self._log_level:
+            self.event_sink.write(self.datas[0].datetime[0], action, price, reason)
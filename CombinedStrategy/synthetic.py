@@ -0,0 +1,39 @@
+# synthetic.py
+
+import numpy as np
+import pandas as pd
+
+# Seeded random-walk OHLCV frame shaped like fetch_data's output, for offline runs
+def synthetic_ohlcv(n_bars, seed=0, start='2000-01-03', freq='B', start_price=100.0, volatility=0.02):
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, n_bars)))
+    open_ = np.empty(n_bars)
+    open_[0] = start_price
+    open_[1:] = close[:-1] * np.exp(rng.normal(0, volatility / 4, n_bars - 1))
+    spread = np.abs(rng.normal(0, volatility / 2, n_bars))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.integers(100_000, 1_000_000, n_bars).astype(float)
+
+    data = pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Adj Close': close,
+        'Volume': volume,
+    }, index=pd.date_range(start, periods=n_bars, freq=freq, name='Date'))
+    return data
+
+# Seeded close prices for a universe of tickers sharing one market factor.
+# Each ticker's daily log return is beta * market + its own noise, with betas
+# drawn from [-1, 1], so the universe holds both positively and negatively
+# correlated pairs for the pair screeners.
+def synthetic_universe(n_tickers, n_bars, seed=0, start='2000-01-03', freq='B', start_price=100.0, volatility=0.02):
+    rng = np.random.default_rng(seed)
+    beta = rng.uniform(-1.0, 1.0, n_tickers)
+    market = rng.normal(0, volatility, (n_bars, 1))
+    returns = market * beta + rng.normal(0, volatility, (n_bars, n_tickers))
+    close = start_price * np.exp(np.cumsum(returns, axis=0))
+    columns = [f'T{k:04d}' for k in range(n_tickers)]
+    return pd.DataFrame(close, index=pd.date_range(start, periods=n_bars, freq=freq, name='Date'), columns=columns)
@@ -0,0 +1,187 @@
+# telemetry.py
+#
+# Opt-in timing for backtests and sweeps. Pass a Telemetry to a strategy
+# (telemetry=...) or to grid_search / run_backtest and it records
+#   - phase timers: setup, run, analysis, the whole sweep
+#   - inside Cerebro's run: loading the data feeds, each top-level
+#     indicator's compute time, the strategy's next()/prenext(), order
+#     notifications, broker, analyzers and observers ('run.*' timers;
+#     'run.other' is what is left of 'run')
+#   - bars and combinations processed, and their rates
+# report() returns all of it as a JSON-ready dict. Nothing is wrapped when
+# telemetry is None; NullTelemetry turns every hook into a no-op.
+
+import cProfile
+import io
+import json
+import pstats
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+import backtrader as bt
+
+# Prints done/total, rate and ETA at most every `interval` seconds
+class Progress:
+    def __init__(self, total, interval=1.0, label='combinations', stream=None):
+        self.total = total
+        self.interval = interval
+        self.label = label
+        self.stream = sys.stderr if stream is None else stream
+        self.done = 0
+        self.started = time.perf_counter()
+        self._printed = self.started
+
+    def update(self, n=1):
+        self.done += n
+        now = time.perf_counter()
+        if now - self._printed >= self.interval or self.done == self.total:
+            self._printed = now
+            print(self.status(now), file=self.stream)
+
+    def status(self, now=None):
+        elapsed = (time.perf_counter() if now is None else now) - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else float('inf')
+        return (f"{self.done}/{self.total} {self.label} ({self.done / max(self.total, 1):.0%}), "
+                f"{rate:.1f}/s, elapsed {elapsed:.0f}s, ETA {eta:.0f}s")
+
+class Telemetry:
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counts = defaultdict(int)
+        self.started = time.perf_counter()
+
+    def add(self, name, seconds, calls=1):
+        self.seconds[name] += seconds
+        self.calls[name] += calls
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    # function wrapped so every call adds to timer `name`
+    def timed(self, name, function):
+        seconds = self.seconds
+        calls = self.calls
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds[name] += perf_counter() - start
+                calls[name] += 1
+        return wrapper
+
+    # Time a strategy's hot paths by wrapping them on the instance. Call at the
+    # end of the strategy's __init__, once its indicators exist. Indicators are
+    # named after the strategy attribute holding them; each timer includes the
+    # indicator's own sub-indicators.
+    def instrument(self, strategy):
+        names = {id(value): name for name, value in vars(strategy).items()}
+        for k, indicator in enumerate(strategy._lineiterators[bt.LineIterator.IndType]):
+            label = f"run.indicator.{names.get(id(indicator), f'{type(indicator).__name__}_{k}')}"
+            indicator._once = self.timed(label, indicator._once)
+            indicator._next = self.timed(label, indicator._next)
+        strategy.next = self.timed('run.next', strategy.next)
+        strategy.prenext = self.timed('run.next', strategy.prenext)
+        strategy._notify = self.timed('run.notify', strategy._notify)
+        strategy._next_analyzers = self.timed('run.analyzers', strategy._next_analyzers)
+        strategy._next_observers = self.timed('run.observers', strategy._next_observers)
+        broker = strategy.broker
+        if not getattr(broker, '_telemetry_wrapped', False):
+            broker.next = self.timed('run.broker', broker.next)
+            broker._telemetry_wrapped = True
+
+    # Time a data feed's loading as 'run.data': the whole preload() when
+    # Cerebro preloads, otherwise every bar it loads. Feeds are preloaded
+    # before any strategy exists, so call this when adding the feed.
+    def instrument_data(self, data):
+        load = data._load
+        timed_load = self.timed('run.data', load)
+        timed_preload = self.timed('run.data', data.preload)
+
+        def preload():
+            # The bars loaded here are already inside preload's timer
+            data._load = load
+            try:
+                return timed_preload()
+            finally:
+                data._load = timed_load
+        data._load = timed_load
+        data.preload = preload
+
+    def progress(self, total, interval=1.0, label='combinations'):
+        return Progress(total, interval, label)
+
+    def report(self):
+        wall = time.perf_counter() - self.started
+        seconds = dict(self.seconds)
+        calls = dict(self.calls)
+        if 'run' in seconds:
+            inner = sum(value for name, value in seconds.items() if name.startswith('run.'))
+            seconds['run.other'] = max(seconds['run'] - inner, 0.0)
+            calls['run.other'] = calls['run']
+        bars = self.counts.get('bars', 0)
+        combinations = self.counts.get('combinations', 0)
+        return {
+            'wall_seconds': wall,
+            'phases': {name: {'seconds': seconds[name], 'calls': calls[name]} for name in sorted(seconds)},
+            'counts': dict(self.counts),
+            'bars_per_second': bars / wall if wall > 0 else 0.0,
+            'combinations_per_second': combinations / wall if wall > 0 else 0.0,
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+# Accepts every call and records nothing
+class NullTelemetry:
+    def add(self, name, seconds, calls=1):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def phase(self, name):
+        return nullcontext()
+
+    def timed(self, name, function):
+        return function
+
+    def instrument(self, strategy):
+        pass
+
+    def instrument_data(self, data):
+        pass
+
+    def progress(self, total, interval=1.0, label='combinations'):
+        return _NullProgress()
+
+class _NullProgress:
+    def update(self, n=1):
+        pass
+
+# Run function(*args, **kwargs) under cProfile. The stats are written to
+# `path` (a .prof file for pstats, snakeviz or flameprof) when given and the
+# top `limit` entries by `sort` are printed. Returns the function's result.
+def profile(function, *args, path=None, sort='cumulative', limit=25, stream=None, **kwargs):
+    profiler = cProfile.Profile()
+    result = profiler.runcall(function, *args, **kwargs)
+    if path is not None:
+        profiler.dump_stats(path)
+    buffer = io.StringIO()
+    pstats.Stats(profiler, stream=buffer).sort_stats(sort).print_stats(limit)
+    print(buffer.getvalue(), file=sys.stdout if stream is None else stream)
+    return result
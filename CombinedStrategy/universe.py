@@ -0,0 +1,107 @@
+# universe.py
+#
+# Runs CombinedStrategy over a list of tickers on a process pool. Tickers are
+# split into shards and a worker loads one ticker's data at a time, so memory
+# stays bounded by what a single backtest needs rather than by the universe.
+# Rows stream back as shards finish; a ticker that fails (no data, a download
+# error, an exception in the strategy) is recorded as an error row and the
+# rest of the batch carries on.
+
+import contextlib
+import csv
+import multiprocessing
+import signal
+import sys
+import traceback
+import pandas as pd
+from main import fetch_data
+from grid_search import backtrader_metrics
+import vector_engine
+from parameters import TICKER, START_DATE, END_DATE
+
+COLUMNS = ['ticker', 'status', 'error', 'bars', 'sharpe_ratio', 'max_drawdown', 'total_trades',
+           'winning_trades', 'losing_trades', 'avg_trade_duration', 'total_returns']
+
+# Backtest one ticker and return its metrics; raises on missing data
+def run_ticker(ticker, start=START_DATE, end=END_DATE, backend='backtrader', **params):
+    data = fetch_data(ticker, start=start, end=end)
+    if data.empty:
+        raise ValueError(f"No data for {ticker} between {start} and {end}")
+    if backend == 'vector':
+        metrics, _ = vector_engine.evaluate(data, **params)
+    elif backend == 'backtrader':
+        metrics, _ = backtrader_metrics(data, params, name=ticker)
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+    return {'bars': len(data), **metrics}
+
+def _run_shard(task):
+    shard, start, end, backend, params = task
+    rows = []
+    for ticker in shard:
+        row = {'ticker': ticker}
+        try:
+            row.update(status='ok', error='', **run_ticker(ticker, start, end, backend, **params))
+        except Exception as exc:
+            row.update(status='error', error=''.join(traceback.format_exception_only(type(exc), exc)).strip())
+        rows.append(row)
+    return rows
+
+def _init_worker():
+    # Ctrl-C is handled once in the parent, which tears the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+# Yield one result row per ticker as shards complete (not in ticker order).
+# n_jobs=1 runs in this process, n_jobs=None uses every core.
+def iter_universe(tickers, start=START_DATE, end=END_DATE, n_jobs=None, shard_size=4, backend='backtrader', **params):
+    tickers = list(dict.fromkeys(tickers))
+    tasks = [(tickers[i:i + shard_size], start, end, backend, params) for i in range(0, len(tickers), shard_size)]
+    if n_jobs == 1:
+        for task in tasks:
+            yield from _run_shard(task)
+        return
+
+    pool = multiprocessing.Pool(n_jobs, initializer=_init_worker)
+    try:
+        for rows in pool.imap_unordered(_run_shard, tasks):
+            yield from rows
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+# Run the universe and return one row per ticker in the order given.
+# With output set, each row is appended to that CSV as soon as it arrives,
+# so a long run that dies part way still leaves its finished tickers on disk.
+def run_universe(tickers, start=START_DATE, end=END_DATE, n_jobs=None, shard_size=4, backend='backtrader',
+                 output=None, **params):
+    tickers = list(dict.fromkeys(tickers))
+    rows = []
+    with contextlib.ExitStack() as stack:
+        writer = None
+        if output is not None:
+            f = stack.enter_context(open(output, 'w', newline=''))
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, restval='')
+            writer.writeheader()
+        for row in iter_universe(tickers, start, end, n_jobs, shard_size, backend, **params):
+            rows.append(row)
+            if writer is not None:
+                writer.writerow(row)
+                f.flush()
+            print(f"{row['ticker']}: {row['status']} ({len(rows)}/{len(tickers)})")
+
+    results_df = pd.DataFrame(rows, columns=COLUMNS)
+    return results_df.set_index('ticker').reindex(tickers).reset_index()
+
+def read_tickers(path):
+    with open(path) as f:
+        return [line.split('#')[0].strip() for line in f if line.split('#')[0].strip()]
+
+if __name__ == '__main__':
+    # python universe.py tickers.txt [results.csv]
+    tickers = read_tickers(sys.argv[1]) if len(sys.argv) > 1 else [TICKER]
+    output = sys.argv[2] if len(sys.argv) > 2 else 'universe_results.csv'
+    results_df = run_universe(tickers, output=output)
+    failed = results_df[results_df['status'] != 'ok']
+    print(results_df)
+    print(f"{len(results_df) - len(failed)} tickers ok, {len(failed)} failed; results written to {output}")
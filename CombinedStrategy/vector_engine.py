@@ -0,0 +1,503 @@
+# vector_engine.py
+#
+# Array-based execution engine for CombinedStrategy. Indicators are computed
+# over whole NumPy arrays with the same formulas backtrader uses, the entry
+# and exit conditions are evaluated as boolean arrays, and a tight loop only
+# carries the position/buy-price state machine. Execution follows
+# backtrader's defaults: market orders of one share filled at the next bar's
+# open, no commission, 10,000 starting cash.
+
+import math
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from parameters import *
+
+STARTING_CASH = 10000.0
+RISK_FREE_RATE = 0.01
+TRADING_DAYS = 252
+
+# Apply a reduction over every trailing window, NaN until `period` values are available
+def _rolling(x, period, reduce):
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= period:
+        out[..., period - 1:] = reduce(sliding_window_view(x, period, axis=-1), axis=-1)
+    return out
+
+def sma(x, period):
+    return _rolling(x, period, np.sum) / period
+
+# backtrader's StandardDeviation: sqrt(mean(x^2) - mean(x)^2) over the window
+def stddev(x, period):
+    with np.errstate(invalid='ignore'):
+        return np.sqrt(sma(x * x, period) - sma(x, period) ** 2)
+
+def highest(x, period):
+    return _rolling(x, period, np.max)
+
+def lowest(x, period):
+    return _rolling(x, period, np.min)
+
+# Wilder smoothing seeded with the mean of the first `period` valid values
+def smma(x, period, first_valid):
+    out = np.full(x.shape, np.nan)
+    seed = first_valid + period - 1
+    if seed >= x.shape[-1]:
+        return out
+    alpha = 1.0 / period
+    alpha1 = 1.0 - alpha
+    prev = x[..., first_valid:seed + 1].sum(axis=-1) / period
+    out[..., seed] = prev
+    for i in range(seed + 1, x.shape[-1]):
+        out[..., i] = prev = prev * alpha1 + x[..., i] * alpha
+    return out
+
+# backtrader's RSI (SMMA of up/down moves) on a series whose first valid index is first_valid
+def rsi(x, period, first_valid=0):
+    change = np.full(x.shape, np.nan)
+    change[..., 1:] = x[..., 1:] - x[..., :-1]
+    up = np.maximum(change, 0.0)
+    down = np.maximum(-change, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = smma(up, period, first_valid + 1) / smma(down, period, first_valid + 1)
+    return 100.0 - 100.0 / (1.0 + rs)
+
+# backtrader's PercentRank: share of the window strictly below the latest value
+def percent_rank(x, period):
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    if n < period:
+        return out
+    latest = x[..., period - 1:]
+    below = np.zeros(latest.shape)
+    for k in range(period):
+        below += x[..., k:k + n - period + 1] < latest
+    out[..., period - 1:] = below / period
+    return out
+
+# indicators.ConnorsRSI and the bar on which it first has a value
+def connors_rsi(close, rsi_period, streak_rsi_period, rank_period):
+    change = np.full(close.shape, np.nan)
+    change[..., 1:] = close[..., 1:] - close[..., :-1]
+    crsi = (rsi(close, rsi_period) + rsi(change, streak_rsi_period, first_valid=1) + percent_rank(close, rank_period)) / 3
+    minperiod = max(rsi_period + 1, streak_rsi_period + 2, rank_period)
+    crsi[..., :minperiod - 1] = np.nan
+    return crsi, minperiod
+
+# Cumulative VWAP of the typical price (indicators.VWAP with period=0)
+def vwap(high, low, close, volume):
+    typical_price = (high + low + close) / 3
+    out = np.cumsum(typical_price * volume, axis=-1) / np.cumsum(volume, axis=-1)
+    out[..., 0] = typical_price[..., 0]
+    return out
+
+# First bar of every session for indicators.AnchoredVWAP: anchor='day',
+# 'week' (from Monday) or 'month' after shifting the bar times by `offset`,
+# plus every bar at or after each timestamp in `anchors`. Bar 0 always starts one.
+def session_starts(times, anchor=None, anchors=(), offset=None):
+    times = np.asarray(times, dtype='datetime64[ns]')
+    starts = np.zeros(len(times), dtype=bool)
+    if anchor is not None:
+        shifted = times - np.timedelta64(pd.Timedelta(offset or 0))
+        if anchor == 'day':
+            key = shifted.astype('datetime64[D]')
+        elif anchor == 'week':
+            # 1970-01-01 was a Thursday; shift so weeks change on Monday
+            key = (shifted.astype('datetime64[D]').astype(np.int64) + 3) // 7
+        elif anchor == 'month':
+            key = shifted.astype('datetime64[M]')
+        else:
+            raise ValueError(f"Unknown anchor: {anchor}")
+        starts[1:] = key[1:] != key[:-1]
+    if len(anchors):
+        crossed = np.searchsorted(np.sort(pd.DatetimeIndex(list(anchors)).to_numpy()), times, side='right')
+        starts[1:] |= crossed[1:] != crossed[:-1]
+    if len(starts):
+        starts[0] = True
+    return starts
+
+# VWAP restarted at every session start, summed in the same order as AnchoredVWAP
+def anchored_vwap(high, low, close, volume, starts):
+    typical_price = (high + low + close) / 3
+    tpv = typical_price * volume
+    out = np.empty(close.shape)
+    bounds = np.append(np.flatnonzero(starts), close.shape[-1])
+    for first, stop in zip(bounds[:-1], bounds[1:]):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[..., first:stop] = np.cumsum(tpv[..., first:stop], axis=-1) / np.cumsum(volume[..., first:stop], axis=-1)
+        out[..., first] = typical_price[..., first]
+    return out
+
+# vwap_anchor as a hashable value (a DataFrame column turns None into NaN)
+def _anchor_key(anchor):
+    if anchor is None or isinstance(anchor, float):
+        return None
+    return anchor if isinstance(anchor, str) else tuple(anchor)
+
+# VWAP for CombinedStrategy's vwap_anchor parameter (see indicators.session_vwap)
+def session_vwap(arrays, anchor=None):
+    high, low, close, volume = arrays['high'], arrays['low'], arrays['close'], arrays['volume']
+    anchor = _anchor_key(anchor)
+    if anchor is None:
+        return vwap(high, low, close, volume)
+    if isinstance(anchor, str):
+        starts = session_starts(arrays['time'], anchor)
+    else:
+        starts = session_starts(arrays['time'], anchors=anchor)
+    return anchored_vwap(high, low, close, volume, starts)
+
+# Column arrays backtrader's PandasData would read from a fetch_data frame, plus the bar times
+def frame_arrays(data):
+    columns = {c.lower(): c for c in data.columns}
+    arrays = {name: data[columns[name]].to_numpy(dtype=float) for name in ('open', 'high', 'low', 'close', 'volume')}
+    arrays['time'] = data.index.to_numpy()
+    return arrays
+
+def default_params():
+    return {
+        'mean_reversion_period': MEAN_REVERSION_PERIOD,
+        'mean_reversion_dev_factor': MEAN_REVERSION_DEV_FACTOR,
+        'crsi_rsi_period': CRSI_RSI_PERIOD,
+        'crsi_streak_rsi_period': CRSI_STREAK_RSI_PERIOD,
+        'crsi_rank_period': CRSI_RANK_PERIOD,
+        'trend_following_period': TREND_FOLLOWING_PERIOD,
+        'breakout_period': BREAKOUT_PERIOD,
+        'stop_loss': STOP_LOSS,
+        'take_profit': TAKE_PROFIT,
+        'crsi_lower_threshold': CRSI_LOWER_THRESHOLD,
+        'crsi_upper_threshold': CRSI_UPPER_THRESHOLD,
+        'vwap_condition': VWAP_CONDITION,
+        'vwap_anchor': VWAP_ANCHOR,
+    }
+
+# Entry and exit condition arrays of CombinedStrategy.next() plus the first bar next() runs on.
+# The price arrays may also be (path x time) matrices sharing arrays['time'].
+def signals(arrays, params):
+    close = arrays['close']
+    p = params
+    sma_mr = sma(close, p['mean_reversion_period'])
+    std_mr = stddev(close, p['mean_reversion_period'])
+    upper = sma_mr + std_mr * p['mean_reversion_dev_factor']
+    lower = sma_mr - std_mr * p['mean_reversion_dev_factor']
+    crsi, _ = connors_rsi(close, p['crsi_rsi_period'], p['crsi_streak_rsi_period'], p['crsi_rank_period'])
+    sma_tf = sma(close, p['trend_following_period'])
+    # next() compares against the previous bar's Highest/Lowest
+    prev_high = np.full(close.shape, np.nan)
+    prev_low = np.full(close.shape, np.nan)
+    prev_high[..., 1:] = highest(arrays['high'], p['breakout_period'])[..., :-1]
+    prev_low[..., 1:] = lowest(arrays['low'], p['breakout_period'])[..., :-1]
+
+    with np.errstate(invalid='ignore'):
+        if p['vwap_condition']:
+            vw = session_vwap(arrays, p['vwap_anchor'])
+            below_vwap, above_vwap = close < vw, close > vw
+        else:
+            below_vwap = above_vwap = np.ones(close.shape, dtype=bool)
+
+        entry_mr = (close < lower) & (crsi < p['crsi_lower_threshold']) & below_vwap
+        block_mr = (close > upper) | (crsi > p['crsi_upper_threshold'])
+        entry_tf = (close > sma_tf) & above_vwap
+        block_tf = close < sma_tf
+        entry_bo = (close > prev_high) & above_vwap
+        if p['vwap_condition']:
+            block_mr |= above_vwap
+            block_tf |= below_vwap
+        exit_signal = (close < lower) | (close < sma_tf) | (close < prev_low)
+
+    # Same if/elif chain as next(): a blocking sell check ends the chain while flat
+    buy = entry_mr | (~block_mr & (entry_tf | (~block_tf & entry_bo)))
+    return buy, exit_signal, warmup_bars(p)
+
+# Index of the first bar CombinedStrategy.next() runs on (every indicator has a value)
+def warmup_bars(params):
+    p = {**default_params(), **params}
+    crsi_minperiod = max(p['crsi_rsi_period'] + 1, p['crsi_streak_rsi_period'] + 2, p['crsi_rank_period'])
+    return max(p['mean_reversion_period'], crsi_minperiod, p['trend_following_period'], p['breakout_period']) - 1
+
+# Run the position state machine; returns the trade list and per-bar portfolio value
+def simulate(arrays, params, buy, exit_signal, start):
+    open_ = arrays['open'].tolist()
+    close = arrays['close'].tolist()
+    buy = buy.tolist()
+    exit_signal = exit_signal.tolist()
+    n = len(close)
+    stop_factor = 1 - params['stop_loss']
+    profit_factor = 1 + params['take_profit']
+
+    value = np.empty(n)
+    trades = []
+    cash = STARTING_CASH
+    position = 0
+    buy_price = None
+    pending = 0
+    entry_bar = entry_price = None
+    for t in range(n):
+        # Orders placed on the previous bar fill at this bar's open
+        if pending == 1:
+            if open_[t] <= cash:
+                cash -= open_[t]
+                position = 1
+                entry_bar, entry_price = t, open_[t]
+        elif pending == -1:
+            cash += open_[t]
+            position = 0
+            trades.append((entry_bar, entry_price, t, open_[t]))
+        pending = 0
+
+        if t >= start:
+            c = close[t]
+            if not position:
+                if buy[t]:
+                    pending = 1
+                    buy_price = c
+            elif buy_price and (c <= buy_price * stop_factor or c >= buy_price * profit_factor):
+                pending = -1
+            elif exit_signal[t]:
+                pending = -1
+        value[t] = cash + position * close[t]
+    return trades, value
+
+# Per-day returns keyed like backtrader's TimeReturn analyzer (Days timeframe)
+def time_returns(index, value):
+    days = pd.DatetimeIndex(index).normalize()
+    last_of_day = np.flatnonzero(np.append(days[1:] != days[:-1], True))
+    day_values = value[last_of_day].tolist()
+    previous = [STARTING_CASH] + day_values[:-1]
+    return OrderedDict((day.to_pydatetime(), v / p - 1.0) for day, v, p in zip(days[last_of_day], day_values, previous))
+
+# backtrader's SharpeRatio with timeframe=Days (daily rate, population stddev)
+def sharpe_ratio(returns):
+    if not returns:
+        return None
+    rate = pow(1.0 + RISK_FREE_RATE, 1.0 / TRADING_DAYS) - 1.0
+    ret_free = [r - rate for r in returns]
+    average = math.fsum(ret_free) / len(ret_free)
+    deviation = math.sqrt(math.fsum([pow(r - average, 2.0) for r in ret_free]) / len(ret_free))
+    try:
+        return average / deviation
+    except ZeroDivisionError:
+        return None
+
+def max_drawdown(value):
+    peak = np.maximum.accumulate(value)
+    return float(np.max(100.0 * (peak - value) / peak))
+
+# Run CombinedStrategy over a fetch_data-style frame
+def backtest(data, **params):
+    p = default_params()
+    p.update(params)
+    arrays = frame_arrays(data)
+    buy, exit_signal, start = signals(arrays, p)
+    trades, value = simulate(arrays, p, buy, exit_signal, start)
+    index = data.index
+    trades = pd.DataFrame(trades, columns=['entry_bar', 'entry_price', 'exit_bar', 'exit_price'])
+    trades = trades.astype({'entry_bar': int, 'entry_price': float, 'exit_bar': int, 'exit_price': float})
+    trades['entry_date'] = index[trades['entry_bar'].to_numpy()]
+    trades['exit_date'] = index[trades['exit_bar'].to_numpy()]
+    trades['pnl'] = trades['exit_price'] - trades['entry_price']
+    trades['bars'] = trades['exit_bar'] - trades['entry_bar']
+    return trades, pd.Series(value, index=index, name='value')
+
+# Metrics in grid_search's results format (without 'params') and the TimeReturn analysis
+def evaluate(data, **params):
+    trades, value = backtest(data, **params)
+    timereturn = time_returns(data.index, value.to_numpy())
+    returns = list(timereturn.values())
+
+    sharpe = sharpe_ratio(returns)
+    if sharpe is None:
+        sharpe = float('-inf')
+
+    initial_value = returns[0]
+    if initial_value == 0:
+        total_returns = 0
+    else:
+        total_returns = (returns[-1] - initial_value) / initial_value
+
+    closed = len(trades)
+    won = int((trades['pnl'] >= 0).sum())
+    metrics = {
+        'sharpe_ratio': sharpe,
+        'max_drawdown': max_drawdown(value.to_numpy()),
+        'total_trades': closed,
+        'winning_trades': won,
+        'losing_trades': closed - won,
+        'avg_trade_duration': float(trades['bars'].sum()) / closed if closed else 0.0,
+        'total_returns': total_returns
+    }
+    return metrics, timereturn
+
+# Batched evaluation: many parameter sets against one price series.
+# Each distinct indicator series is computed once, gathered into
+# (parameter x time) matrices, and the state machine steps through time
+# for every parameter set at once.
+
+def _gather(memo, name, keys, compute):
+    keys = [tuple(k) for k in keys]
+    for key in dict.fromkeys(keys):
+        if (name,) + key not in memo:
+            memo[(name,) + key] = compute(*key)
+    return np.stack([memo[(name,) + key] for key in keys])
+
+def _session_vwap_memo(memo, arrays, anchor):
+    key = ('vwap', _anchor_key(anchor))
+    if key not in memo:
+        memo[key] = session_vwap(arrays, key[1])
+    return memo[key]
+
+def batch_signals(arrays, params, memo):
+    close = arrays['close']
+    mr = params[['mean_reversion_period']].to_numpy()
+    sma_mr = _gather(memo, 'sma', mr, lambda p: sma(close, p))
+    std_mr = _gather(memo, 'stddev', mr, lambda p: stddev(close, p))
+    dev_factor = params['mean_reversion_dev_factor'].to_numpy(dtype=float)[:, None]
+    upper = sma_mr + std_mr * dev_factor
+    lower = sma_mr - std_mr * dev_factor
+    crsi_keys = params[['crsi_rsi_period', 'crsi_streak_rsi_period', 'crsi_rank_period']].to_numpy()
+    crsi = _gather(memo, 'crsi', crsi_keys, lambda a, b, c: connors_rsi(close, a, b, c)[0])
+    sma_tf = _gather(memo, 'sma', params[['trend_following_period']].to_numpy(), lambda p: sma(close, p))
+
+    def shifted(x):
+        out = np.full(x.shape, np.nan)
+        out[1:] = x[:-1]
+        return out
+
+    bo = params[['breakout_period']].to_numpy()
+    prev_high = _gather(memo, 'prev_high', bo, lambda p: shifted(highest(arrays['high'], p)))
+    prev_low = _gather(memo, 'prev_low', bo, lambda p: shifted(lowest(arrays['low'], p)))
+
+    use_vwap = params['vwap_condition'].to_numpy(dtype=bool)[:, None]
+    with np.errstate(invalid='ignore'):
+        if use_vwap.any():
+            vw = np.stack([_session_vwap_memo(memo, arrays, anchor) for anchor in params['vwap_anchor']])
+            below_vwap = ~use_vwap | (close < vw)
+            above_vwap = ~use_vwap | (close > vw)
+        else:
+            below_vwap = above_vwap = np.ones((len(params), 1), dtype=bool)
+
+        lower_threshold = params['crsi_lower_threshold'].to_numpy(dtype=float)[:, None]
+        upper_threshold = params['crsi_upper_threshold'].to_numpy(dtype=float)[:, None]
+        entry_mr = (close < lower) & (crsi < lower_threshold) & below_vwap
+        block_mr = (close > upper) | (crsi > upper_threshold) | (use_vwap & ~below_vwap & above_vwap)
+        entry_tf = (close > sma_tf) & above_vwap
+        block_tf = (close < sma_tf) | (use_vwap & below_vwap & ~above_vwap)
+        entry_bo = (close > prev_high) & above_vwap
+        exit_signal = (close < lower) | (close < sma_tf) | (close < prev_low)
+
+    buy = entry_mr | (~block_mr & (entry_tf | (~block_tf & entry_bo)))
+    crsi_minperiod = np.maximum(np.maximum(crsi_keys[:, 0] + 1, crsi_keys[:, 1] + 2), crsi_keys[:, 2])
+    start = np.maximum.reduce([mr[:, 0], crsi_minperiod, params['trend_following_period'].to_numpy(), bo[:, 0]]) - 1
+    return buy, exit_signal, start
+
+# simulate() for a batch; returns the (row x time) value matrix and trade statistics.
+# Rows are parameter sets on one price series, or one parameter set (a
+# one-row params) on a (path x time) matrix of prices.
+def batch_simulate(arrays, params, buy, exit_signal, start):
+    open_ = arrays['open']
+    close = arrays['close']
+    n_params, n = buy.shape
+    stop_factor = 1 - params['stop_loss'].to_numpy(dtype=float)
+    profit_factor = 1 + params['take_profit'].to_numpy(dtype=float)
+
+    value = np.empty((n_params, n))
+    cash = np.full(n_params, STARTING_CASH)
+    position = np.zeros(n_params, dtype=bool)
+    buy_price = np.zeros(n_params)
+    pending = np.zeros(n_params, dtype=np.int8)
+    entry_bar = np.zeros(n_params, dtype=np.int64)
+    entry_price = np.zeros(n_params)
+    closed = np.zeros(n_params, dtype=np.int64)
+    won = np.zeros(n_params, dtype=np.int64)
+    bars = np.zeros(n_params, dtype=np.int64)
+    for t in range(n):
+        o = open_[..., t]
+        filled_buy = (pending == 1) & (o <= cash)
+        cash -= np.where(filled_buy, o, 0.0)
+        position |= filled_buy
+        entry_bar[filled_buy] = t
+        entry_price = np.where(filled_buy, o, entry_price)
+
+        filled_sell = pending == -1
+        cash += np.where(filled_sell, o, 0.0)
+        position &= ~filled_sell
+        closed += filled_sell
+        won += filled_sell & (o - entry_price >= 0)
+        bars += np.where(filled_sell, t - entry_bar, 0)
+        pending[:] = 0
+
+        active = t >= start
+        c = close[..., t]
+        new_buy = active & ~position & buy[:, t]
+        buy_price = np.where(new_buy, c, buy_price)
+        pending[new_buy] = 1
+        held = active & position
+        sell = held & (buy_price != 0) & ((c <= buy_price * stop_factor) | (c >= buy_price * profit_factor))
+        sell |= held & exit_signal[:, t]
+        pending[sell] = -1
+        value[:, t] = cash + position * c
+    return value, closed, won, bars
+
+# Index of the bar closing each day (the TimeReturn periods)
+def last_bars_of_day(index):
+    days = pd.DatetimeIndex(index).normalize()
+    return np.flatnonzero(np.append(days[1:] != days[:-1], True))
+
+# evaluate_batch one chunk of at most chunk_size param sets at a time, for
+# callers that keep each chunk as it finishes. Yields (metrics, value) with
+# value the chunk's (param set x bar) portfolio values.
+def iter_evaluate_batch(data, param_sets, chunk_size=1024):
+    params = pd.DataFrame(param_sets).reset_index(drop=True)
+    for name, default in default_params().items():
+        if name not in params:
+            params[name] = [default] * len(params)
+    arrays = frame_arrays(data)
+    last_of_day = last_bars_of_day(data.index)
+
+    memo = {}
+    for first in range(0, len(params), chunk_size):
+        chunk = params.iloc[first:first + chunk_size]
+        buy, exit_signal, start = batch_signals(arrays, chunk, memo)
+        value, closed, won, bars = batch_simulate(arrays, chunk, buy, exit_signal, start)
+        yield batch_metrics(value, closed, won, bars, last_of_day, index=chunk.index), value
+
+# Metrics for every row of param_sets (a DataFrame of CombinedStrategy params;
+# missing columns take the defaults). chunk_size bounds the matrices held at once.
+def evaluate_batch(data, param_sets, chunk_size=1024):
+    frames = [metrics for metrics, _ in iter_evaluate_batch(data, param_sets, chunk_size)]
+    if not frames:
+        # No param sets: an empty table with the metric columns
+        empty = np.zeros(0, dtype=np.int64)
+        return batch_metrics(np.empty((0, len(data))), empty, empty, empty, last_bars_of_day(data.index),
+                             index=pd.RangeIndex(0))
+    return pd.concat(frames)
+
+# evaluate()'s TimeReturn for each row of a batch_simulate value matrix, as a
+# (row x day) matrix of daily returns
+def batch_time_returns(value, last_of_day):
+    day_value = value[:, last_of_day]
+    previous = np.concatenate([np.full((len(value), 1), STARTING_CASH), day_value[:, :-1]], axis=1)
+    return day_value / previous - 1.0
+
+# evaluate()'s metrics for each row of a batch_simulate result; last_of_day
+# holds the bar index closing each day (the TimeReturn periods)
+def batch_metrics(value, closed, won, bars, last_of_day, index=None):
+    rate = pow(1.0 + RISK_FREE_RATE, 1.0 / TRADING_DAYS) - 1.0
+    returns = batch_time_returns(value, last_of_day)
+    ret_free = returns - rate
+    deviation = ret_free.std(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = ret_free.mean(axis=1) / deviation
+        total_returns = np.where(returns[:, 0] == 0, 0.0, (returns[:, -1] - returns[:, 0]) / returns[:, 0])
+    sharpe[np.ptp(ret_free, axis=1) == 0] = -np.inf
+    peak = np.maximum.accumulate(value, axis=1)
+
+    return pd.DataFrame({
+        'sharpe_ratio': sharpe,
+        'max_drawdown': np.max(100.0 * (peak - value) / peak, axis=1),
+        'total_trades': closed,
+        'winning_trades': won,
+        'losing_trades': closed - won,
+        'avg_trade_duration': np.where(closed > 0, bars / np.maximum(closed, 1), 0.0),
+        'total_returns': total_returns,
+    }, index=index)
@@ -0,0 +1,163 @@
+# walk_forward.py
+#
+# Walk-forward optimisation of CombinedStrategy. History is split into
+# train/test folds (rolling or anchored); each fold searches the parameter
+# grid on its train window with the vector engine, then trades the winner on
+# the following test window. Test-window equity curves are chained into one
+# out-of-sample curve.
+#
+# Folds are independent and run on a process pool. The frame is written once
+# to memory-mapped .npy files (grid_search.share_frame) and every fold slices
+# its windows out of that shared array without copying.
+
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+import pandas as pd
+from main import fetch_data
+from grid_search import (all_combinations, WARMUP_BARS, SEARCH_MIN_BARS, strategy_params, run_backtest,
+                         run_batch, share_frame, load_shared_frame)
+import optimizer
+import vector_engine
+from parameters import TICKER, END_DATE
+
+# Train/test bar ranges. Rolling folds move a train_bars window forward by
+# `step` (default test_bars); anchored folds keep every train window starting
+# at bar 0. The last test window may be shorter than test_bars.
+def make_folds(n_bars, train_bars, test_bars, step=None, anchored=False):
+    step = test_bars if step is None else step
+    folds = []
+    test_start = train_bars
+    while test_start < n_bars:
+        train_start = 0 if anchored else test_start - train_bars
+        folds.append({'fold': len(folds), 'train_start': train_start, 'train_end': test_start,
+                      'test_start': test_start, 'test_end': min(test_start + test_bars, n_bars)})
+        test_start += step
+    return folds
+
+def _metrics(param_comb, data):
+    return run_backtest(param_comb, data, backend='vector')[0]
+
+# Search one train window; returns (best_params, best train Sharpe, backtests run)
+def search(train, method='halving', seed=0, **kwargs):
+    if method == 'grid':
+        results = run_batch(all_combinations, train)
+    elif method == 'halving':
+        results = optimizer.successive_halving(all_combinations, train, _metrics, min_bars=SEARCH_MIN_BARS,
+                                               warmup_bars=WARMUP_BARS, seed=seed, **kwargs)
+    elif method == 'hyperband':
+        results = optimizer.hyperband(all_combinations, train, _metrics, min_bars=SEARCH_MIN_BARS,
+                                      warmup_bars=WARMUP_BARS, seed=seed, **kwargs)
+    elif method == 'tpe':
+        results = optimizer.tpe(all_combinations, train, _metrics, seed=seed, **kwargs)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+    backtests = len(results)
+    if 'bars' in results:
+        results = results[results['bars'] == len(train)].reset_index(drop=True)
+    best = results['sharpe_ratio'].idxmax()
+    return results.at[best, 'params'], results.at[best, 'sharpe_ratio'], backtests
+
+# Trade param_comb over data[test_start:test_end], with just enough earlier
+# bars in front for its indicators to be ready on the first test bar
+def trade_test_window(data, param_comb, test_start, test_end):
+    params = strategy_params(param_comb)
+    offset = min(vector_engine.warmup_bars(params), test_start)
+    trades, value = vector_engine.backtest(data.iloc[test_start - offset:test_end], **params)
+    value = value.iloc[offset:]
+    returns = vector_engine.time_returns(value.index, value.to_numpy())
+    sharpe = vector_engine.sharpe_ratio(list(returns.values()))
+    return value, {
+        'test_sharpe': float('-inf') if sharpe is None else sharpe,
+        'test_max_drawdown': vector_engine.max_drawdown(value.to_numpy()),
+        'test_trades': len(trades),
+        'test_return': value.iloc[-1] / vector_engine.STARTING_CASH - 1,
+    }
+
+def run_fold(data, fold, method='halving', seed=0, **kwargs):
+    started = time.perf_counter()
+    train = data.iloc[fold['train_start']:fold['train_end']]
+    best_params, train_sharpe, backtests = search(train, method, seed + fold['fold'], **kwargs)
+    searched = time.perf_counter()
+    value, test_metrics = trade_test_window(data, best_params, fold['test_start'], fold['test_end'])
+    finished = time.perf_counter()
+    row = {
+        **fold,
+        'params': best_params,
+        'backtests': backtests,
+        'train_sharpe': train_sharpe,
+        **test_metrics,
+        'search_seconds': searched - started,
+        'test_seconds': finished - searched,
+        'fold_seconds': finished - started,
+        'pid': os.getpid(),
+    }
+    return row, value.to_numpy()
+
+_worker_data = None
+
+def _init_worker(spec):
+    global _worker_data
+    # Ctrl-C is handled once in the parent, which tears the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_data = load_shared_frame(spec)
+
+def _run_shared_fold(task):
+    fold, method, seed, kwargs = task
+    return run_fold(_worker_data, fold, method, seed, **kwargs)
+
+# Chain each fold's test equity (up to the next fold's test start) into one
+# curve starting from STARTING_CASH. With step > test_bars the bars between
+# test windows are traded by no fold and left out of the curve.
+def stitch(index, folds, values):
+    pieces = []
+    scale = 1.0
+    for k, (fold, value) in enumerate(zip(folds, values)):
+        stop = min(folds[k + 1]['test_start'], fold['test_end']) if k + 1 < len(folds) else fold['test_end']
+        growth = value[:stop - fold['test_start']] / vector_engine.STARTING_CASH
+        pieces.append(pd.Series(scale * growth, index=index[fold['test_start']:stop]))
+        scale *= growth[-1]
+    equity = pd.concat(pieces) if pieces else pd.Series(dtype=float)
+    return vector_engine.STARTING_CASH * equity
+
+# Run the whole walk-forward; returns (per-fold results, stitched out-of-sample equity).
+# n_jobs=1 runs the folds in this process, n_jobs=None uses every core.
+def walk_forward(data, train_bars=504, test_bars=126, step=None, anchored=False, method='halving', n_jobs=None,
+                 seed=0, **kwargs):
+    folds = make_folds(len(data), train_bars, test_bars, step, anchored)
+    if not folds:
+        raise ValueError(f"Walk-forward needs more than train_bars={train_bars} bars, got {len(data)}")
+    started = time.perf_counter()
+    if n_jobs == 1:
+        outputs = [run_fold(data, fold, method, seed, **kwargs) for fold in folds]
+    else:
+        with tempfile.TemporaryDirectory(prefix='walk_forward_') as directory:
+            spec = share_frame(data, directory)
+            pool = multiprocessing.Pool(n_jobs, initializer=_init_worker, initargs=(spec,))
+            try:
+                outputs = pool.map(_run_shared_fold, [(fold, method, seed, kwargs) for fold in folds])
+                pool.close()
+            finally:
+                pool.terminate()
+                pool.join()
+    wall_seconds = time.perf_counter() - started
+
+    results = pd.DataFrame([row for row, _ in outputs])
+    for name in ('train_start', 'train_end', 'test_start', 'test_end'):
+        # Report dates; *_end is the last bar inside the window
+        positions = results[name] - (1 if name.endswith('_end') else 0)
+        results[name] = data.index[positions.to_numpy()]
+    equity = stitch(data.index, folds, [value for _, value in outputs])
+    results.attrs['wall_seconds'] = wall_seconds
+    return results, equity
+
+if __name__ == '__main__':
+    data = fetch_data(TICKER, start='2014-01-01', end=END_DATE)
+    results, equity = walk_forward(data)
+    pd.set_option('display.width', 200)
+    print(results.drop(columns=['pid']))
+    print(f"Out-of-sample return: {equity.iloc[-1] / vector_engine.STARTING_CASH - 1:.2%}")
+    print(f"Fold time {results['fold_seconds'].sum():.1f}s across {results['pid'].nunique()} processes, "
+          f"wall time {results.attrs['wall_seconds']:.1f}s")
@@ -1,19 +1,14 @@
-# Install yfinance if not already installed
-try:
-    import yfinance as yf
-except ModuleNotFoundError:
-    import os
-    os.system('pip install yfinance')
-    import yfinance as yf
-
 import pandas as pd
+from market_data import MarketDataStore
+from pair_screener import screen
+from rolling_correlation import crossing_events
 
 # Step 1: Data Collection
 tickers = [
     'XOM', 'DAL', 'CVX', 'AAL', 'AMZN', 'M', 'AAPL', 'JCP', 
     'NEE', 'CCL', 'DUK', 'TSLA', 'GOLD', 'JPM', 'NEM', 'BAC'
 ]
-data = yf.download(tickers, start='2022-01-01', end='2023-01-01')['Adj Close']
+data = MarketDataStore().get_many(tickers, '2022-01-01', '2023-01-01')
 
 # Step 2: Calculate Returns
 daily_returns = data.pct_change().dropna()
@@ -24,29 +19,22 @@ monthly_returns = data.resample('M').ffill().pct_change().dropna()
 moving_avg_20 = data.rolling(window=20).mean()
 moving_avg_50 = data.rolling(window=50).mean()
 
-# Step 4: Compute Correlation Matrices
-correlation_matrices = {
-    'Daily Returns': daily_returns.corr(),
-    'Weekly Returns': weekly_returns.corr(),
-    'Monthly Returns': monthly_returns.corr(),
-    '20-Day Moving Average': moving_avg_20.corr(),
-    '50-Day Moving Average': moving_avg_50.corr()
+# Step 4: Return Horizons to Screen (pair_screener works tile by tile, never building the full matrix)
+horizons = {
+    'Daily Returns': daily_returns,
+    'Weekly Returns': weekly_returns,
+    'Monthly Returns': monthly_returns,
+    '20-Day Moving Average': moving_avg_20,
+    '50-Day Moving Average': moving_avg_50
 }
 
-# Step 5: Output Correlation Matrices
-for name, matrix in correlation_matrices.items():
-    print(f"\nCorrelation Matrix: {name}")
-    print(matrix)
-    matrix.to_csv(f'{name.replace(" ", "_").lower()}_correlation_matrix.csv')
-
-# Step 6: Identify Negatively Correlated Pairs
+# Step 5: Identify Negatively Correlated Pairs, most negative first
 threshold = -0.5
-for name, matrix in correlation_matrices.items():
-    neg_corr_pairs = []
-    for i in range(len(matrix.columns)):
-        for j in range(i):
-            if matrix.iloc[i, j] < threshold:
-                neg_corr_pairs.append((matrix.columns[i], matrix.columns[j]))
+for name, pairs in screen(horizons, threshold=threshold).items():
     print(f"\nNegatively Correlated Pairs for {name}:")
-    for pair in neg_corr_pairs:
-        print(pair)
+    print(pairs.to_string(index=False))
+
+# Step 6: Check whether daily-return pairs stay negatively correlated over a rolling 60-day window
+rolling_events = crossing_events(daily_returns, window=60, threshold=threshold)
+print("\nRolling 60-Day Threshold Crossings for Daily Returns:")
+print(rolling_events.to_string(index=False))
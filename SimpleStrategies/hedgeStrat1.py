@@ -1,45 +1,36 @@
-# Install required libraries if not already installed
-try:
-    import yfinance as yf
-    import matplotlib.pyplot as plt
-    from ta.momentum import RSIIndicator
-    from ta.volatility import BollingerBands
-    from ta.trend import MACD
-except ModuleNotFoundError:
-    import os
-    os.system('pip install yfinance matplotlib ta')
-    import yfinance as yf
-    import matplotlib.pyplot as plt
-    from ta.momentum import RSIIndicator
-    from ta.volatility import BollingerBands
-    from ta.trend import MACD
-
+import os
+import sys
 import pandas as pd
 import numpy as np
+import matplotlib.pyplot as plt
+import kernels
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from market_data import MarketDataStore
 
 # Connors RSI calculation
 def connors_rsi(df, window_rsi=3, window_streak=2, window_rank=200):
-    # Short-term RSI
-    rsi = RSIIndicator(df['Close'], window=window_rsi).rsi()
-    
-    # Up/Down Streak
-    df['Up_Down'] = np.where(df['Close'] > df['Close'].shift(1), 1, -1)
-    df['Streak'] = df['Up_Down'].groupby((df['Up_Down'] != df['Up_Down'].shift()).cumsum()).cumsum()
-    streak_rsi = RSIIndicator(df['Streak'], window=window_streak).rsi()
-    
-    # Percent Rank
-    rank = 100 * df['Close'].rolling(window=window_rank).apply(lambda x: pd.Series(x).rank().iloc[-1] / window_rank)
-    
-    # Connors RSI
-    connors_rsi = (rsi + streak_rsi + rank) / 3
-    return connors_rsi
+    # Wilder RSIs, unchanged closes count as down days in the streak
+    crsi = kernels.connors_rsi(df['Close'].to_numpy(), window_rsi, window_streak, window_rank,
+                               method='wilder', ties='down')
+    return pd.Series(crsi, index=df.index)
+
+# Number of consecutive down closes ending at each bar, capped at `cap`.
+# Bar 0 is compared with the last bar, as the original close.iloc[-1] lookup did.
+def downturn_run_lengths(close, cap=9):
+    close = np.asarray(close, dtype=float)
+    down = np.zeros(len(close), dtype=bool)
+    if len(close):
+        down[1:] = close[1:] < close[:-1]
+        down[0] = close[0] < close[-1]
+    index = np.arange(len(close))
+    last_up = np.maximum.accumulate(np.where(down, -1, index)) if len(close) else index
+    return np.minimum(index - last_up, cap)
 
 # Mean Reversion Strategy with Connors RSI and Bollinger Bands
 def mean_reversion_strategy_with_connors_rsi_and_bb(df, initial_cash=1000, z_entry=35, z_exit=70, transaction_cost=0.001):
     df['Connors_RSI'] = connors_rsi(df)
-    bb = BollingerBands(df['Close'])
-    df['BB_Upper'] = bb.bollinger_hband()
-    df['BB_Lower'] = bb.bollinger_lband()
+    _, df['BB_Upper'], df['BB_Lower'] = kernels.bollinger_bands(df['Close'].to_numpy(), window=20, num_std_dev=2, ddof=0)
     
     df['Position'] = 0
     cash = initial_cash
@@ -48,30 +39,29 @@ def mean_reversion_strategy_with_connors_rsi_and_bb(df, initial_cash=1000, z_ent
     buy_dates = []
     sell_dates = []
     
-    for i in range(1, len(df)):
+    # Plain lists keep the per-bar loop free of pandas indexing
+    close = df['Close'].tolist()
+    crsi = df['Connors_RSI'].tolist()
+    bb_lower = df['BB_Lower'].tolist()
+    downturn = downturn_run_lengths(df['Close'].to_numpy(), cap=9).tolist()
+    
+    for i in range(1, len(close)):
         # Check if the stock has been in a downturn for at least 3 days and no more than 9 days
-        downturn_days = 0
-        for j in range(1, 10):
-            if i - j < 0:
-                break
-            if df['Close'].iloc[i-j] < df['Close'].iloc[i-j-1]:
-                downturn_days += 1
-            else:
-                break
+        downturn_days = downturn[i-1]
         
-        if df['Connors_RSI'].iloc[i-1] < z_entry and df['Close'].iloc[i-1] < df['BB_Lower'].iloc[i-1] and cash > 0 and 3 <= downturn_days <= 9:
+        if crsi[i-1] < z_entry and close[i-1] < bb_lower[i-1] and cash > 0 and 3 <= downturn_days <= 9:
             # Buy signal
-            shares_bought = cash // df['Close'].iloc[i]
-            cash -= shares_bought * df['Close'].iloc[i] * (1 + transaction_cost)
+            shares_bought = cash // close[i]
+            cash -= shares_bought * close[i] * (1 + transaction_cost)
             shares += shares_bought
             buy_dates.append(df.index[i])
-        elif df['Connors_RSI'].iloc[i-1] > z_exit and shares > 0:
+        elif crsi[i-1] > z_exit and shares > 0:
             # Sell signal
-            cash += shares * df['Close'].iloc[i] * (1 - transaction_cost)
+            cash += shares * close[i] * (1 - transaction_cost)
             shares = 0
             sell_dates.append(df.index[i])
         
-        portfolio_value.append(cash + shares * df['Close'].iloc[i])
+        portfolio_value.append(cash + shares * close[i])
     
     df['Portfolio Value'] = portfolio_value
     return df, buy_dates, sell_dates
@@ -95,7 +85,7 @@ def calculate_performance_metrics(df):
 
 # Step 1: Data Collection
 tickers = ['TWST', 'CMPS', 'SIGA', 'ATAI', 'OPGN', 'MBRX', 'LCTX', 'AEMD', 'CKPT', 'WINT']# 'BTC-USD', 'ETH-USD', 'XRP-USD', 'LTC-USD', 'BCH-USD']  # Small-cap biotech stocks and popular cryptocurrencies
-data = yf.download(tickers, start='2016-01-01', end='2024-01-01')['Adj Close']
+data = MarketDataStore().get_many(tickers, '2016-01-01', '2024-01-01')
 
 # Step 2: Apply Strategy to Each Ticker
 results = {}
@@ -135,5 +125,5 @@ for ticker in tickers:
     
     results[ticker] = df
 
-# Note: This script assumes you have matplotlib, yfinance, and ta installed. If not, install them using:
-# pip install matplotlib yfinance ta
+# Note: This script assumes you have matplotlib installed. If not, install it using:
+# pip install matplotlib
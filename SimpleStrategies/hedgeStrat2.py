@@ -1,10 +1,16 @@
-import yfinance as yf
+import os
+import sys
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 from scipy import stats
 import statsmodels.api as sm
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from market_data import MarketDataStore
+from pair_screener import screen
+from pair_engine import spread_matrix, backtest_pairs, entries_and_exits
+
 # Step 1: Data Collection
 tickers = [
     'XOM', 'DAL', 'CVX', 'AAL', 'AMZN', 'M', 'AAPL', 'JCP', 
@@ -13,7 +19,7 @@ tickers = [
     'XEL', 'ED', 'AEE', 'SO', 'DTE', 'DUK', 'NEE', 'EXC', 'EIX',
     'SPG', 'O', 'REG', 'PSA', 'VNO', 'SLG', 'BXP', 'EQR', 'AVB'
 ]
-data = yf.download(tickers, start='2022-01-01', end='2023-01-01')['Adj Close']
+data = MarketDataStore().get_many(tickers, '2022-01-01', '2023-01-01')
 
 # Step 2: Calculate Returns
 daily_returns = data.pct_change().dropna()
@@ -24,29 +30,22 @@ monthly_returns = data.resample('M').ffill().pct_change().dropna()
 moving_avg_20 = data.rolling(window=20).mean()
 moving_avg_50 = data.rolling(window=50).mean()
 
-# Step 4: Compute Correlation Matrices
-correlation_matrices = {
-    'Daily Returns': daily_returns.corr(),
-    'Weekly Returns': weekly_returns.corr(),
-    'Monthly Returns': monthly_returns.corr(),
-    '20-Day Moving Average': moving_avg_20.corr(),
-    '50-Day Moving Average': moving_avg_50.corr()
+# Step 4: Return Horizons to Screen (pair_screener works tile by tile, never building the full matrix)
+horizons = {
+    'Daily Returns': daily_returns,
+    'Weekly Returns': weekly_returns,
+    'Monthly Returns': monthly_returns,
+    '20-Day Moving Average': moving_avg_20,
+    '50-Day Moving Average': moving_avg_50
 }
 
-# Step 5: Output Correlation Matrices to Terminal
-for name, matrix in correlation_matrices.items():
-    print(f"\nCorrelation Matrix: {name}")
-    print(matrix)
-
-# Step 6: Identify Negatively Correlated Pairs
+# Step 5: Identify Negatively Correlated Pairs
 threshold = -0.8  # Higher threshold for stronger negative correlation
-neg_corr_pairs = {}
-for name, matrix in correlation_matrices.items():
-    neg_corr_pairs[name] = []
-    for i in range(len(matrix.columns)):
-        for j in range(i):
-            if matrix.iloc[i, j] < threshold:
-                neg_corr_pairs[name].append((matrix.columns[i], matrix.columns[j]))
+# Matrix order keeps the pairs (and so the cash allocation below) in the original scan order
+neg_corr_pairs = {
+    name: list(pairs[['ticker_1', 'ticker_2']].itertuples(index=False, name=None))
+    for name, pairs in screen(horizons, threshold=threshold, order='matrix').items()
+}
 
 # Output the negatively correlated pairs
 for name, pairs in neg_corr_pairs.items():
@@ -54,90 +53,56 @@ for name, pairs in neg_corr_pairs.items():
     for pair in pairs:
         print(pair)
 
-# Step 7: Adjusted Hedging Strategy with Reasonable Z-score and Risk Management Parameters
+# Step 6: Adjusted Hedging Strategy with Reasonable Z-score and Risk Management Parameters
 def calculate_zscore(spread):
     mean = spread.mean()
     std = spread.std()
     return (spread - mean) / std
 
-def backtest_hedging_strategy(long_ticker, short_ticker, data, z_entry=2.5, z_exit=1.0, stop_loss=-0.4, take_profit=0.4, transaction_cost=0.00):
+# Expanding-window z-score of each new spread value, keeping only a running
+# mean and sum of squared deviations (Welford) so every update is O(1)
+class RunningZScore:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(np.float64(self.m2) / (self.count - 1)) if self.count > 1 else np.nan
+            return (np.float64(x) - self.mean) / std
+
+# zscore_window=None scores the spread against its full-sample mean and std;
+# an integer uses a trailing window instead (no lookahead)
+def backtest_hedging_strategy(long_ticker, short_ticker, data, z_entry=2.5, z_exit=1.0, stop_loss=-0.4, take_profit=0.4, transaction_cost=0.00, zscore_window=None):
     # Calculate daily returns
     returns = data[[long_ticker, short_ticker]].pct_change().dropna()
     
     # Calculate the spread
     returns['Spread'] = returns[long_ticker] - returns[short_ticker]
     
-    # Calculate the Z-score of the spread
-    returns['Z-score'] = calculate_zscore(returns['Spread'])
-    
-    # Initialize position, signals, and P&L tracking
-    position = 0
-    signals = []
-    pnl = []
-    long_entries = []
-    short_entries = []
-    exits = []
-    
-    for i in range(len(returns)):
-        z = returns['Z-score'].iloc[i]
-        if position == 0:
-            if z > z_entry:
-                # Short both stocks when spread is high (expecting convergence)
-                position = -1
-                signals.append(position)
-                short_entries.append(returns.index[i])
-            elif z < -z_entry:
-                # Long both stocks when spread is low (expecting divergence)
-                position = 1
-                signals.append(position)
-                long_entries.append(returns.index[i])
-            else:
-                signals.append(0)
-        elif position == 1:
-            pnl.append(returns['Spread'].iloc[i])
-            if z > -z_exit or sum(pnl) < stop_loss or sum(pnl) > take_profit:
-                # Exit long position
-                position = 0
-                signals.append(position)
-                exits.append(returns.index[i])
-                pnl = []
-            else:
-                signals.append(position)
-        elif position == -1:
-            pnl.append(-returns['Spread'].iloc[i])
-            if z < z_exit or sum(pnl) < stop_loss or sum(pnl) > take_profit:
-                # Exit short position
-                position = 0
-                signals.append(position)
-                exits.append(returns.index[i])
-                pnl = []
-            else:
-                signals.append(position)
-        else:
-            signals.append(position)
-    
-    returns['Position'] = signals
-    returns['Strategy'] = returns['Position'].shift(1) * returns['Spread']
-    
-    # Adjust for transaction costs
-    returns['Strategy'] -= transaction_cost * np.abs(returns['Position'].diff()).fillna(0)
-    
-    # Calculate performance metrics
-    strategy_returns = returns['Strategy'].dropna()
-    expected_return = strategy_returns.mean()
-    std_dev = strategy_returns.std()
-    risk_free_rate = 0.01 / 252
-    sharpe_ratio = (expected_return - risk_free_rate) / std_dev
+    # Run the entry/exit state machine and score the positions
+    metrics, positions, strategy, zscore = backtest_pairs(
+        returns[['Spread']], z_entry, z_exit, stop_loss, take_profit, transaction_cost, zscore_window)
+    returns['Z-score'] = zscore['Spread']
+    returns['Position'] = positions['Spread'].astype(int)
+    returns['Strategy'] = strategy['Spread']
+    long_entries, short_entries, exits = entries_and_exits(positions['Spread'])
     
     # Calculate cumulative strategy returns
+    strategy_returns = returns['Strategy'].dropna()
     returns['Cumulative Strategy'] = (1 + strategy_returns).cumprod()
     
-    # Calculate total return
-    total_return = returns['Cumulative Strategy'].iloc[-1] - 1
-    
+    expected_return = metrics.at['Spread', 'expected_return']
+    sharpe_ratio = metrics.at['Spread', 'sharpe_ratio']
+    total_return = metrics.at['Spread', 'total_return']
     return expected_return, sharpe_ratio, returns, long_entries, short_entries, exits, total_return
 
-# Step 8: Multiple Positions Management and Combined Strategy
+# Step 7: Multiple Positions Management and Combined Strategy
 def combined_strategy(data, neg_corr_pairs, initial_cash=1000, max_investment_pct=0.1):
     cash = initial_cash
     portfolio_value = [initial_cash]
@@ -147,10 +112,17 @@ def combined_strategy(data, neg_corr_pairs, initial_cash=1000, max_investment_pc
     all_exits = {}
     total_returns = {}
     
+    # Backtest every pair in one pass of the pair engine
+    spreads = spread_matrix(data, [pair for pairs in neg_corr_pairs.values() for pair in pairs])
+    metrics, pair_positions, _, _ = backtest_pairs(spreads)
+    
     for name, pairs in neg_corr_pairs.items():
         for long_ticker, short_ticker in pairs:
             print(f"\nBacktesting strategy for {name} - {long_ticker} and {short_ticker}:")
-            expected_return, sharpe_ratio, returns, long_entries, short_entries, exits, total_return = backtest_hedging_strategy(long_ticker, short_ticker, data)
+            pair_metrics = metrics.loc[(long_ticker, short_ticker)]
+            long_entries, short_entries, exits = entries_and_exits(pair_positions[(long_ticker, short_ticker)])
+            sharpe_ratio = pair_metrics['sharpe_ratio']
+            total_return = pair_metrics['total_return']
             
             print(f"Parameters for {long_ticker} and {short_ticker}: z_entry=3.0, z_exit=1.0, stop_loss=-0.03, take_profit=0.03")
             print(f"Sharpe Ratio: {sharpe_ratio:.6f}")
@@ -158,25 +130,27 @@ def combined_strategy(data, neg_corr_pairs, initial_cash=1000, max_investment_pc
             
             investment_amount = min(cash * max_investment_pct, initial_cash * max_investment_pct)
             cash -= investment_amount
-            positions[(long_ticker, short_ticker)] = investment_amount / returns['Cumulative Strategy'].iloc[-1]
+            positions[(long_ticker, short_ticker)] = investment_amount / pair_metrics['cumulative']
             
             all_long_entries[(long_ticker, short_ticker)] = long_entries
             all_short_entries[(long_ticker, short_ticker)] = short_entries
             all_exits[(long_ticker, short_ticker)] = exits
             total_returns[(long_ticker, short_ticker)] = total_return
     
-    # Update the portfolio value for each day
-    for i in range(1, len(data)):
-        daily_value = cash
-        for pair, shares in positions.items():
-            long_ticker, short_ticker = pair
-            returns = data[[long_ticker, short_ticker]].pct_change().dropna().iloc[:i+1]
-            spread = returns[long_ticker] - returns[short_ticker]
-            zscore = calculate_zscore(spread)
-            position = np.sign(zscore.iloc[-1])
-            strategy_returns = position * spread.iloc[-1]
-            daily_value += shares * (1 + strategy_returns)
-        portfolio_value.append(daily_value)
+    # Update the portfolio value for each day. Day i holds each pair on the sign of
+    # its expanding-window spread z-score, streamed once per pair instead of
+    # being recomputed over the whole history every day.
+    days = np.arange(1, len(data))
+    daily_values = np.full(len(days), float(cash))
+    for pair, shares in positions.items():
+        long_ticker, short_ticker = pair
+        returns = data[[long_ticker, short_ticker]].pct_change().dropna()
+        spread = (returns[long_ticker] - returns[short_ticker]).to_numpy()
+        zscore = RunningZScore()
+        strategy_returns = np.array([np.sign(zscore.update(s)) * s for s in spread])
+        # Once the pair's returns run out the last one is reused, as the prefix slice did
+        daily_values += shares * (1 + strategy_returns[np.minimum(days, len(spread) - 1)])
+    portfolio_value.extend(daily_values.tolist())
     
     # Plot combined equity curve
     fig = go.Figure()
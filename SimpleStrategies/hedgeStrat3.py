@@ -1,51 +1,33 @@
-import yfinance as yf
+import os
+import sys
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
+import kernels
+from portfolio import simulate
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from market_data import MarketDataStore
 
 def rsi(series, period=14):
-    delta = series.diff(1)
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+    return pd.Series(kernels.rsi(series.to_numpy(), period, method='sma'), index=series.index)
 
 def connors_rsi(df, period_rsi=3, period_streak=2, period_rank=100):
-    rsi_close = rsi(df['Close'], period_rsi)
-    
-    streak = np.zeros(len(df['Close']))
-    for i in range(1, len(df['Close'])):
-        if df['Close'].iloc[i] > df['Close'].iloc[i - 1]:
-            streak[i] = streak[i - 1] + 1 if streak[i - 1] > 0 else 1
-        elif df['Close'].iloc[i] < df['Close'].iloc[i - 1]:
-            streak[i] = streak[i - 1] - 1 if streak[i - 1] < 0 else -1
-        else:
-            streak[i] = 0
-    
-    rsi_streak = rsi(pd.Series(streak), period_streak)
-    
-    def rank_within_window(x):
-        return pd.Series(x).rank(pct=True).iloc[-1] * 100 if len(x.dropna()) > 1 else np.nan
-    
-    daily_changes = df['Close'].diff(1)
-    rank = daily_changes.rolling(window=period_rank, min_periods=1).apply(rank_within_window, raw=False).fillna(0)
-    
-    return (rsi_close + rsi_streak + rank) / 3
+    crsi = kernels.connors_rsi(df['Close'].to_numpy(), period_rsi, period_streak, period_rank,
+                               method='sma', ties='reset', rank_on='change', rank_min_periods=2, rank_fill=0)
+    return pd.Series(crsi, index=df.index)
 
 def bollinger_bands(df, window=20, num_std_dev=2):
-    rolling_mean = df['Close'].rolling(window).mean()
-    rolling_std = df['Close'].rolling(window).std()
-    df['Bollinger Upper'] = rolling_mean + (rolling_std * num_std_dev)
-    df['Bollinger Lower'] = rolling_mean - (rolling_std * num_std_dev)
+    _, df['Bollinger Upper'], df['Bollinger Lower'] = kernels.bollinger_bands(df['Close'].to_numpy(), window, num_std_dev)
 
 # List of 10 small-cap biotech stocks (hypothetical tickers)
 tickers = ['AXSM', 'ADAP', 'ADMA', 'ADVM', 'AGTC', 'AKBA', 'ALDX', 'ALNA', 'ALRN', 'ALXO']
 
 # Download stock data
+store = MarketDataStore()
 data = {}
 for ticker in tickers:
     try:
-        df = yf.download(ticker, start='2020-01-01', end='2023-01-01')
+        df = store.get(ticker, '2020-01-01', '2023-01-01').copy()
         if not df.empty:
             data[ticker] = df
         else:
@@ -71,30 +53,9 @@ stop_loss_pct = 0.05   # 5% stop loss
 
 # Backtesting
 initial_cash = 10000
-cash = initial_cash
-positions = {ticker: 0 for ticker in data.keys()}
-entry_prices = {ticker: 0 for ticker in data.keys()}
-portfolio_value = []
-
-for date, row in aligned_data.iterrows():
-    total_value = cash + sum(positions[ticker] * row[f'{ticker}_Close'] for ticker in data.keys())
-    
-    for ticker in data.keys():
-        if row[f'{ticker}_Buy Signal'] == 1 and cash > 0:
-            max_position_value = 0.1 * total_value
-            amount_to_invest = min(cash, max_position_value)
-            positions[ticker] += amount_to_invest / row[f'{ticker}_Close']
-            entry_prices[ticker] = row[f'{ticker}_Close']
-            cash -= amount_to_invest
-        
-        # Implement take profit and stop loss
-        elif positions[ticker] > 0:
-            current_price = row[f'{ticker}_Close']
-            if current_price >= entry_prices[ticker] * (1 + take_profit_pct) or current_price <= entry_prices[ticker] * (1 - stop_loss_pct):
-                cash += positions[ticker] * current_price
-                positions[ticker] = 0
-    
-    portfolio_value.append(total_value)
+close = aligned_data[[f'{ticker}_Close' for ticker in data.keys()]].to_numpy()
+buy_signal = aligned_data[[f'{ticker}_Buy Signal' for ticker in data.keys()]].to_numpy()
+portfolio_value, positions, cash = simulate(close, buy_signal, initial_cash, take_profit_pct, stop_loss_pct)
 
 aligned_data['Portfolio Value'] = portfolio_value
 
@@ -0,0 +1,155 @@
+# kernels.py
+#
+# Array-in/array-out indicator kernels shared by the hedgeStrat scripts.
+# Every function takes a 1-D series or a 2-D (tickers x time) array and works
+# along the last axis, so a whole universe is computed in one call.
+
+import numpy as np
+
+def _as_float(x):
+    return np.asarray(x, dtype=float)
+
+# First difference along time, NaN in the first column (like Series.diff)
+def diff(x):
+    x = _as_float(x)
+    out = np.full(x.shape, np.nan)
+    out[..., 1:] = x[..., 1:] - x[..., :-1]
+    return out
+
+# Trailing window sum ignoring NaNs, NaN until `window` valid values are present
+def _rolling_sum(x, window):
+    valid = ~np.isnan(x)
+    zero_padded = np.zeros(x.shape[:-1] + (x.shape[-1] + 1,))
+    count_padded = np.zeros_like(zero_padded)
+    np.cumsum(np.where(valid, x, 0.0), axis=-1, out=zero_padded[..., 1:])
+    np.cumsum(valid, axis=-1, out=count_padded[..., 1:])
+    total = np.full(x.shape, np.nan)
+    count = np.zeros(x.shape)
+    total[..., window - 1:] = zero_padded[..., window:] - zero_padded[..., :-window]
+    count[..., window - 1:] = count_padded[..., window:] - count_padded[..., :-window]
+    total[count < window] = np.nan
+    return total
+
+def rolling_mean(x, window):
+    return _rolling_sum(_as_float(x), window) / window
+
+def rolling_std(x, window, ddof=1):
+    x = _as_float(x)
+    # Centre each row first so the sum-of-squares form does not lose precision
+    with np.errstate(invalid='ignore'):
+        centre = np.nanmean(x, axis=-1, keepdims=True)
+    centred = x - np.nan_to_num(centre)
+    total = _rolling_sum(centred, window)
+    total_sq = _rolling_sum(centred * centred, window)
+    var = (total_sq - total * total / window) / (window - ddof)
+    return np.sqrt(np.maximum(var, 0.0))
+
+# Exponential smoothing with alpha=1/period (ewm adjust=False), seeded per row
+# from its first valid value; NaNs are skipped and stay NaN in the output
+def _wilder_smooth(x, period):
+    out = np.full(x.shape, np.nan)
+    alpha = 1.0 / period
+    state = np.full(x.shape[:-1], np.nan)
+    seen = np.zeros(x.shape[:-1])
+    for t in range(x.shape[-1]):
+        value = x[..., t]
+        valid = ~np.isnan(value)
+        state = np.where(valid, np.where(np.isnan(state), value, state + alpha * (value - state)), state)
+        seen += valid
+        out[..., t] = np.where(valid & (seen >= period), state, np.nan)
+    return out
+
+# RSI with Wilder smoothing (as ta.momentum.RSIIndicator) or simple moving averages
+def rsi(close, period=14, method='wilder'):
+    delta = diff(close)
+    with np.errstate(invalid='ignore'):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+    # The first bar of a series counts as unchanged (as Series.where does), but
+    # missing prices stay missing so NaN-padded tickers get no RSI there
+    missing = np.isnan(_as_float(close))
+    gain[missing] = np.nan
+    loss[missing] = np.nan
+    if method == 'wilder':
+        avg_gain = _wilder_smooth(gain, period)
+        avg_loss = _wilder_smooth(loss, period)
+    elif method == 'sma':
+        avg_gain = rolling_mean(gain, period)
+        avg_loss = rolling_mean(loss, period)
+    else:
+        raise ValueError(f"Unknown RSI method: {method}")
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = 100 - 100 / (1 + avg_gain / avg_loss)
+    out[avg_loss == 0] = 100.0
+    return out
+
+# Signed length of the current run of up (+) or down (-) closes.
+# ties='reset' gives 0 on unchanged closes (Connors' definition),
+# ties='down' counts unchanged closes and the first bar as down days.
+def streak(close, ties='reset'):
+    close = _as_float(close)
+    direction = np.zeros(close.shape)
+    with np.errstate(invalid='ignore'):
+        up = close[..., 1:] > close[..., :-1]
+        down = close[..., 1:] < close[..., :-1]
+    if ties == 'reset':
+        direction[..., 1:] = np.where(up, 1.0, np.where(down, -1.0, 0.0))
+    elif ties == 'down':
+        direction[..., 0] = -1.0
+        direction[..., 1:] = np.where(up, 1.0, -1.0)
+    else:
+        raise ValueError(f"Unknown ties mode: {ties}")
+
+    # Run length from the index of the last direction change
+    index = np.broadcast_to(np.arange(close.shape[-1], dtype=float), close.shape)
+    starts = np.zeros(close.shape)
+    starts[..., 1:] = np.where(direction[..., 1:] != direction[..., :-1], index[..., 1:], 0.0)
+    run_start = np.maximum.accumulate(starts, axis=-1)
+    return direction * (index - run_start + 1)
+
+# Percent rank (0-100) of each value within its trailing window, ties averaged
+# like Series.rank(pct=True). NaNs are skipped; windows with fewer than
+# min_periods valid values give NaN.
+def percent_rank(x, window, min_periods=None):
+    x = _as_float(x)
+    if min_periods is None:
+        min_periods = window
+    padded = np.concatenate([np.full(x.shape[:-1] + (window - 1,), np.nan), x], axis=-1)
+    less = np.zeros(x.shape)
+    equal = np.zeros(x.shape)
+    count = np.zeros(x.shape)
+    n = x.shape[-1]
+    with np.errstate(invalid='ignore'):
+        for k in range(window):
+            other = padded[..., k:k + n]
+            less += other < x
+            equal += other == x
+            count += ~np.isnan(other)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = 100 * (less + (equal + 1) / 2) / count
+    out[(count < min_periods) | np.isnan(x)] = np.nan
+    return out
+
+# Middle, upper and lower Bollinger bands
+def bollinger_bands(close, window=20, num_std_dev=2, ddof=1):
+    middle = rolling_mean(close, window)
+    std = rolling_std(close, window, ddof=ddof)
+    return middle, middle + num_std_dev * std, middle - num_std_dev * std
+
+# ConnorsRSI = mean of the price RSI, the streak RSI and the percent rank.
+# rank_on='change' ranks the one-bar price change instead of the close, and
+# rank_fill replaces undefined ranks during warm-up.
+def connors_rsi(close, rsi_period=3, streak_period=2, rank_period=100, method='wilder',
+                ties='reset', rank_on='close', rank_min_periods=None, rank_fill=None):
+    close = _as_float(close)
+    price_rsi = rsi(close, rsi_period, method=method)
+    streak_rsi = rsi(streak(close, ties=ties), streak_period, method=method)
+    if rank_on == 'close':
+        rank = percent_rank(close, rank_period, min_periods=rank_min_periods)
+    elif rank_on == 'change':
+        rank = percent_rank(diff(close), rank_period, min_periods=rank_min_periods)
+    else:
+        raise ValueError(f"Unknown rank source: {rank_on}")
+    if rank_fill is not None:
+        rank = np.where(np.isnan(rank), rank_fill, rank)
+    return (price_rsi + streak_rsi + rank) / 3
@@ -0,0 +1,122 @@
+# pair_engine.py
+#
+# Spread-trading engine for hedgeStrat2. All pairs are held in one
+# (time x pairs) spread matrix and the entry / exit / stop-loss /
+# take-profit state machine steps through time for every pair at once,
+# keeping a running P&L per open position instead of re-summing a list.
+# A pair's spread is NaN on days it has no return (that pair's rows dropped
+# by pct_change().dropna()); those days leave its state untouched.
+
+import numpy as np
+import pandas as pd
+
+RISK_FREE_RATE = 0.01 / 252
+
+# Daily return spread (long minus short) for each (long_ticker, short_ticker) pair
+def spread_matrix(prices, pairs):
+    spreads = {}
+    for long_ticker, short_ticker in dict.fromkeys(pairs):
+        returns = prices[[long_ticker, short_ticker]].pct_change().dropna()
+        spreads[(long_ticker, short_ticker)] = returns[long_ticker] - returns[short_ticker]
+    return pd.DataFrame(spreads)
+
+# Z-score of each spread over its own observed days. window=None uses the
+# full-sample mean and std (looks ahead); an integer window uses trailing
+# rolling statistics only, so it is safe for walk-forward runs.
+def zscores(spreads, window=None, min_periods=None):
+    values = spreads.to_numpy(dtype=float)
+    out = np.full(values.shape, np.nan)
+    for k in range(values.shape[1]):
+        observed = ~np.isnan(values[:, k])
+        spread = pd.Series(values[observed, k])
+        if window is None:
+            z = (spread - spread.mean()) / spread.std()
+        else:
+            rolling = spread.rolling(window, min_periods=window if min_periods is None else min_periods)
+            z = (spread - rolling.mean()) / rolling.std()
+        out[observed, k] = z.to_numpy()
+    return pd.DataFrame(out, index=spreads.index, columns=spreads.columns)
+
+# Position held after each day (-1, 0, 1; NaN on days a pair has no spread)
+def positions(spreads, zscore, z_entry=2.5, z_exit=1.0, stop_loss=-0.4, take_profit=0.4):
+    spread_values = spreads.to_numpy(dtype=float)
+    z_values = zscore.to_numpy(dtype=float)
+    n_days, n_pairs = spread_values.shape
+    out = np.full((n_days, n_pairs), np.nan)
+    position = np.zeros(n_pairs)
+    pnl = np.zeros(n_pairs)
+    with np.errstate(invalid='ignore'):
+        for t in range(n_days):
+            spread = spread_values[t]
+            z = z_values[t]
+            observed = ~np.isnan(spread)
+            flat = observed & (position == 0)
+            is_long = observed & (position == 1)
+            is_short = observed & (position == -1)
+
+            # Spread high: short it (expecting convergence); spread low: long it
+            enter_short = flat & (z > z_entry)
+            enter_long = flat & ~enter_short & (z < -z_entry)
+
+            pnl = np.where(is_long, pnl + spread, np.where(is_short, pnl + -spread, pnl))
+            risk_exit = (pnl < stop_loss) | (pnl > take_profit)
+            exit_long = is_long & ((z > -z_exit) | risk_exit)
+            exit_short = is_short & ((z < z_exit) | risk_exit)
+
+            position[enter_short] = -1
+            position[enter_long] = 1
+            position[exit_long | exit_short] = 0
+            pnl[exit_long | exit_short] = 0.0
+            out[t] = np.where(observed, position, np.nan)
+    return pd.DataFrame(out, index=spreads.index, columns=spreads.columns)
+
+# Each day's strategy return: yesterday's position times today's spread, less
+# transaction costs on position changes. NaN on a pair's first observed day.
+def strategy_returns(spreads, position, transaction_cost=0.0):
+    spread_values = spreads.to_numpy(dtype=float)
+    position_values = position.to_numpy(dtype=float)
+    previous = np.full(position_values.shape, np.nan)
+    previous[1:] = position.ffill().to_numpy(dtype=float)[:-1]
+    with np.errstate(invalid='ignore'):
+        change = np.abs(position_values - previous)
+        out = previous * spread_values - transaction_cost * np.where(np.isnan(change), 0.0, change)
+    out[np.isnan(spread_values)] = np.nan
+    return pd.DataFrame(out, index=spreads.index, columns=spreads.columns)
+
+# Entry and exit dates from one pair's position column
+def entries_and_exits(position):
+    position = position.dropna()
+    previous = position.shift(1, fill_value=0)
+    long_entries = list(position.index[(position == 1) & (previous == 0)])
+    short_entries = list(position.index[(position == -1) & (previous == 0)])
+    exits = list(position.index[(position == 0) & (previous != 0)])
+    return long_entries, short_entries, exits
+
+# Run every pair and return (metrics, positions, strategy returns, z-scores).
+# metrics has one row per pair: expected_return, std_dev, sharpe_ratio,
+# cumulative (final growth of 1) and total_return, plus entry/exit counts.
+def backtest_pairs(spreads, z_entry=2.5, z_exit=1.0, stop_loss=-0.4, take_profit=0.4, transaction_cost=0.00,
+                   zscore_window=None, min_periods=None):
+    zscore = zscores(spreads, zscore_window, min_periods)
+    position = positions(spreads, zscore, z_entry, z_exit, stop_loss, take_profit)
+    strategy = strategy_returns(spreads, position, transaction_cost)
+
+    rows = []
+    for column in spreads.columns:
+        returns = strategy[column].dropna()
+        expected_return = returns.mean()
+        std_dev = returns.std()
+        cumulative = (1 + returns).cumprod().iloc[-1] if len(returns) else np.nan
+        long_entries, short_entries, exits = entries_and_exits(position[column])
+        rows.append({
+            'expected_return': expected_return,
+            'std_dev': std_dev,
+            'sharpe_ratio': (expected_return - RISK_FREE_RATE) / std_dev,
+            'cumulative': cumulative,
+            'total_return': cumulative - 1,
+            'long_entries': len(long_entries),
+            'short_entries': len(short_entries),
+            'exits': len(exits),
+        })
+    metrics = pd.DataFrame(rows, index=spreads.columns)
+    return metrics, position, strategy, zscore
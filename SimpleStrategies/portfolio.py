@@ -0,0 +1,45 @@
+# portfolio.py
+#
+# Long-only multi-asset portfolio simulator for hedgeStrat3 over aligned
+# (days x assets) close and buy-signal matrices. Positions, entry prices and
+# cash live in arrays. Each day the take-profit / stop-loss check runs as one
+# vector comparison across all assets. Only the assets with something to do
+# that day (a buy signal or an exit) go through a short loop in column order,
+# because each buy is sized from the cash left by the assets before it.
+
+import numpy as np
+
+# Returns (portfolio value at the start of each day, final positions, final cash).
+# A buy signal invests min(cash, max_position_pct of the day's opening
+# equity) and resets the entry price; a held asset without a buy signal is
+# sold outright once it is take_profit_pct above or stop_loss_pct below entry.
+def simulate(close, buy_signal, initial_cash=10000, take_profit_pct=0.1, stop_loss_pct=0.05, max_position_pct=0.1):
+    close = np.asarray(close, dtype=float)
+    buy_signal = np.asarray(buy_signal) == 1
+    n_days, n_assets = close.shape
+    cash = initial_cash
+    positions = np.zeros(n_assets)
+    entry_prices = np.zeros(n_assets)
+    portfolio_value = np.empty(n_days)
+
+    for t in range(n_days):
+        price = close[t]
+        signal = buy_signal[t]
+        # Holdings are added left to right, matching a running Python sum
+        holdings = np.add.accumulate(positions * price)[-1] if n_assets else 0.0
+        total_value = cash + holdings
+
+        exits = (positions > 0) & ((price >= entry_prices * (1 + take_profit_pct)) |
+                                   (price <= entry_prices * (1 - stop_loss_pct)))
+        for k in np.flatnonzero(signal | exits):
+            if signal[k] and cash > 0:
+                amount_to_invest = min(cash, max_position_pct * total_value)
+                positions[k] += amount_to_invest / price[k]
+                entry_prices[k] = price[k]
+                cash -= amount_to_invest
+            elif exits[k]:
+                cash += positions[k] * price[k]
+                positions[k] = 0
+
+        portfolio_value[t] = total_value
+    return portfolio_value, positions, cash
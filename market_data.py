@@ -0,0 +1,243 @@
+# market_data.py
+#
+# Local on-disk market data store shared by the CombinedStrategy and
+# SimpleStrategies scripts. Each ticker gets a directory of memory-mapped
+# .npy columns plus the date ranges already downloaded, so repeat runs only
+# go to the provider for dates that are missing.
+#
+# Any number of processes can share one store. Writers to a ticker take its
+# lock file in turn; each writes a complete snapshot (index, values and the
+# ranges they cover) to a fresh directory and publishes it by swapping the
+# CURRENT pointer, so a reader always gets index and values from the same
+# write.
+#
+# A provider raises when a download fails and the range is tried again on
+# the next call. A range that comes back empty (a holiday, a delisted
+# ticker) is remembered for empty_ttl before the provider is asked again;
+# ranges without a weekday are never fetched.
+
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+DEFAULT_CACHE_DIR = os.environ.get('MARKET_DATA_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'market_data'))
+DEFAULT_EMPTY_TTL = pd.Timedelta(days=1)
+
+# Daily bars from Yahoo Finance. A failed download raises; a ticker or range
+# Yahoo has no prices for (delisted, holidays) comes back as an empty frame.
+class YahooProvider:
+    def fetch(self, ticker, start, end):
+        import warnings
+        import yfinance as yf
+        from yfinance.exceptions import YFTickerMissingError
+        with warnings.catch_warnings():
+            # raise_errors is deprecated in recent yfinance but still honoured
+            warnings.simplefilter('ignore', DeprecationWarning)
+            try:
+                frame = yf.Ticker(ticker).history(start=start, end=end, auto_adjust=False, actions=False,
+                                                  raise_errors=True)
+            except YFTickerMissingError:
+                return pd.DataFrame(columns=FIELDS)
+        if frame.index.tz is not None:
+            frame.index = frame.index.tz_localize(None)
+        return frame
+
+# Offline stand-in reading <ticker>.parquet or <ticker>.csv from a directory
+class LocalDirectoryProvider:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def fetch(self, ticker, start, end):
+        path = os.path.join(self.directory, ticker)
+        if os.path.exists(path + '.parquet'):
+            frame = pd.read_parquet(path + '.parquet')
+        elif os.path.exists(path + '.csv'):
+            frame = pd.read_csv(path + '.csv', index_col=0, parse_dates=True, float_precision='round_trip')
+        else:
+            return pd.DataFrame(columns=FIELDS)
+        frame.index = pd.DatetimeIndex(frame.index)
+        return frame[(frame.index >= start) & (frame.index < end)]
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+# Parts of [start, end) not covered by any of the (sorted, merged) ranges
+def _missing_ranges(covered, start, end):
+    missing = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+# Exclusive lock on `path` for the duration of the block
+@contextmanager
+def _locked(path):
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class MarketDataStore:
+    def __init__(self, root=DEFAULT_CACHE_DIR, provider=None, empty_ttl=DEFAULT_EMPTY_TTL):
+        self.root = root
+        self.provider = provider if provider is not None else YahooProvider()
+        self.empty_ttl = pd.Timedelta(empty_ttl)
+
+    def _path(self, ticker, name):
+        return os.path.join(self.root, ticker, name)
+
+    # Directory of the published snapshot (the ticker directory itself for
+    # stores written before snapshots were versioned), None when there is none
+    def _snapshot(self, ticker):
+        try:
+            with open(self._path(ticker, 'CURRENT')) as f:
+                return self._path(ticker, f.read().strip())
+        except FileNotFoundError:
+            legacy = os.path.join(self.root, ticker)
+            return legacy if os.path.exists(os.path.join(legacy, 'meta.json')) else None
+
+    # (frame, covered ranges, empty ranges) of the published snapshot. A
+    # writer may retire the snapshot between reading CURRENT and opening its
+    # files, in which case the new one is read instead.
+    def _load(self, ticker):
+        for _ in range(100):
+            directory = self._snapshot(ticker)
+            if directory is None:
+                empty = pd.DataFrame(columns=FIELDS, index=pd.DatetimeIndex([], name='Date'), dtype=float)
+                return empty, [], []
+            try:
+                with open(os.path.join(directory, 'meta.json')) as f:
+                    meta = json.load(f)
+                index = np.load(os.path.join(directory, 'index.npy'), mmap_mode='r')
+                values = np.load(os.path.join(directory, 'values.npy'), mmap_mode='r')
+            except FileNotFoundError:
+                if self._snapshot(ticker) == directory:
+                    raise
+                continue
+            frame = pd.DataFrame(values, index=pd.DatetimeIndex(index, name='Date'), columns=FIELDS, copy=False)
+            covered = [[pd.Timestamp(start), pd.Timestamp(end)] for start, end in meta['covered']]
+            empty = [[pd.Timestamp(start), pd.Timestamp(end), pd.Timestamp(checked)]
+                     for start, end, checked in meta.get('empty', [])]
+            return frame, covered, empty
+        raise RuntimeError(f"Could not read a stable snapshot of {ticker}")
+
+    def _read(self, ticker):
+        return self._load(ticker)[0]
+
+    # Publish a new snapshot; the caller holds the ticker's lock
+    def _write(self, ticker, frame, covered, empty):
+        directory = os.path.join(self.root, ticker)
+        snapshot = tempfile.mkdtemp(prefix='v-', dir=directory)
+        np.save(os.path.join(snapshot, 'index.npy'), frame.index.to_numpy(dtype='datetime64[ns]'))
+        np.save(os.path.join(snapshot, 'values.npy'), frame.to_numpy(dtype=float))
+        with open(os.path.join(snapshot, 'meta.json'), 'w') as f:
+            json.dump({'columns': FIELDS,
+                       'covered': [[str(start.date()), str(end.date())] for start, end in covered],
+                       'empty': [[str(start.date()), str(end.date()), checked.isoformat()]
+                                 for start, end, checked in empty]}, f)
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            f.write(os.path.basename(snapshot))
+        os.replace(tmp, self._path(ticker, 'CURRENT'))
+        # Earlier snapshots are no longer reachable; readers still holding
+        # their memory maps keep them until they let go
+        for name in os.listdir(directory):
+            if name.startswith('v-') and name != os.path.basename(snapshot):
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    # Parts of [start, end) neither covered nor recently found empty
+    def _missing(self, covered, empty, start, end, now):
+        recent = [[s, e] for s, e, checked in empty if now - checked < self.empty_ttl]
+        return _missing_ranges(_merge_ranges(covered + recent), start, end)
+
+    # Fetch whatever part of [start, end) has not been downloaded yet. A
+    # provider error propagates after the ranges fetched before it are saved.
+    def update(self, ticker, start, end):
+        start = pd.Timestamp(start)
+        # Days that have not happened yet are never marked as covered
+        end = min(pd.Timestamp(end), pd.Timestamp.today().normalize())
+        now = pd.Timestamp.now()
+        _, covered, empty = self._load(ticker)
+        if not self._missing(covered, empty, start, end, now):
+            return
+
+        os.makedirs(os.path.join(self.root, ticker), exist_ok=True)
+        with _locked(self._path(ticker, 'lock')):
+            # Another process may have fetched the range while this one waited
+            frame, covered, empty = self._load(ticker)
+            missing = self._missing(covered, empty, start, end, now)
+            if not missing:
+                return
+            frames = [frame]
+            changed = False
+            try:
+                for missing_start, missing_end in missing:
+                    if not len(pd.bdate_range(missing_start, missing_end, inclusive='left')):
+                        # Weekends only: nothing to fetch
+                        covered.append([missing_start, missing_end])
+                        changed = True
+                        continue
+                    fetched = self.provider.fetch(ticker, missing_start, missing_end)
+                    if len(fetched):
+                        frames.append(fetched.reindex(columns=FIELDS).astype(float))
+                        covered.append([missing_start, missing_end])
+                    else:
+                        empty = [entry for entry in empty if entry[:2] != [missing_start, missing_end]]
+                        empty.append([missing_start, missing_end, now])
+                    changed = True
+            finally:
+                if changed:
+                    frames = [f for f in frames if len(f)]
+                    frame = pd.concat(frames) if frames else frame
+                    frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+                    covered = _merge_ranges(covered)
+                    # Empty ranges since covered by real data are dropped
+                    empty = [entry for entry in empty if _missing_ranges(covered, entry[0], entry[1])]
+                    self._write(ticker, frame, covered, empty)
+
+    # OHLCV frame for one ticker over [start, end)
+    def get(self, ticker, start, end):
+        self.update(ticker, start, end)
+        frame = self._read(ticker)
+        # The index is sorted, so a positional slice keeps the memory map instead of copying
+        first, last = frame.index.searchsorted([pd.Timestamp(start), pd.Timestamp(end)])
+        return frame.iloc[first:last]
+
+    # One field for several tickers, aligned on a shared date index
+    def get_many(self, tickers, start, end, field='Adj Close'):
+        columns = {ticker: self.get(ticker, start, end)[field] for ticker in dict.fromkeys(tickers)}
+        return pd.DataFrame(columns).sort_index()
@@ -0,0 +1,133 @@
+# pair_screener.py
+#
+# Finds negatively correlated ticker pairs without building the full
+# correlation matrix. Each column is standardised once, then correlations are
+# computed one (block_size x block_size) tile at a time over the upper
+# triangle, so memory stays around block_size**2 values however many tickers
+# there are. Columns with gaps use pairwise-complete observations, as
+# DataFrame.corr() does.
+
+import numpy as np
+import pandas as pd
+
+PAIR_COLUMNS = ['ticker_1', 'ticker_2', 'correlation']
+TOP_K_COLUMNS = ['ticker', 'rank', 'partner', 'correlation']
+
+# Centre and scale every column. Returns the standardised values with NaNs
+# replaced by 0, and the validity mask (None when nothing is missing).
+def standardize(frame):
+    values = np.asarray(frame, dtype=float)
+    mask = ~np.isnan(values)
+    if mask.all():
+        centred = values - values.mean(axis=0)
+        norm = np.sqrt((centred * centred).sum(axis=0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return centred / norm, None
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centred = values - np.nanmean(values, axis=0)
+        scaled = centred / np.nanstd(centred, axis=0)
+    return np.where(mask, scaled, 0.0), mask.astype(float)
+
+# Correlation tile between columns a and b of the standardised data
+def _tile(z, mask, a, b):
+    za, zb = z[:, a], z[:, b]
+    if mask is None:
+        return np.clip(za.T @ zb, -1.0, 1.0)
+    ma, mb = mask[:, a], mask[:, b]
+    n = ma.T @ mb
+    sum_a = za.T @ mb
+    sum_b = ma.T @ zb
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = za.T @ zb - sum_a * sum_b / n
+        var_a = (za * za).T @ mb - sum_a * sum_a / n
+        var_b = ma.T @ (zb * zb) - sum_b * sum_b / n
+        corr = cov / np.sqrt(var_a * var_b)
+    corr[n < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+# Yield (rows, cols, tile) over the upper triangle, diagonal tiles included
+def _tiles(z, mask, block_size):
+    n = z.shape[1]
+    for start_a in range(0, n, block_size):
+        a = slice(start_a, min(start_a + block_size, n))
+        for start_b in range(start_a, n, block_size):
+            b = slice(start_b, min(start_b + block_size, n))
+            yield a, b, _tile(z, mask, a, b)
+
+# Full correlation matrix assembled from tiles (for small universes and checks)
+def correlation_matrix(frame, block_size=512):
+    z, mask = standardize(frame)
+    out = np.empty((z.shape[1], z.shape[1]))
+    for a, b, tile in _tiles(z, mask, block_size):
+        out[a, b] = tile
+        out[b, a] = tile.T
+    return pd.DataFrame(out, index=frame.columns, columns=frame.columns)
+
+# Every pair with correlation below threshold. ticker_1 is the later column,
+# matching the `for i ... for j in range(i)` scan it replaces.
+# order='correlation' sorts most negative first; order='matrix' keeps that
+# scan's order (by ticker_1 position, then ticker_2 position).
+def pairs_below(frame, threshold=-0.5, block_size=512, order='correlation'):
+    z, mask = standardize(frame)
+    first, second, values = [], [], []
+    for a, b, tile in _tiles(z, mask, block_size):
+        hits = tile < threshold
+        if a == b:
+            hits = np.triu(hits, k=1)
+        rows, cols = np.nonzero(hits)
+        first.append(cols + b.start)
+        second.append(rows + a.start)
+        values.append(tile[rows, cols])
+    first = np.concatenate(first) if first else np.empty(0, dtype=int)
+    second = np.concatenate(second) if second else np.empty(0, dtype=int)
+    values = np.concatenate(values) if values else np.empty(0)
+
+    if order == 'correlation':
+        sort = np.lexsort((second, first, values))
+    elif order == 'matrix':
+        sort = np.lexsort((second, first))
+    else:
+        raise ValueError(f"Unknown order: {order}")
+    columns = np.asarray(frame.columns)
+    return pd.DataFrame({'ticker_1': columns[first[sort]], 'ticker_2': columns[second[sort]],
+                         'correlation': values[sort]}, columns=PAIR_COLUMNS)
+
+# The k most negatively correlated partners of every ticker
+def top_k_negative(frame, k=5, block_size=512):
+    z, mask = standardize(frame)
+    n = z.shape[1]
+    k = min(k, n - 1)
+    best = np.full((n, k), np.inf)
+    partner = np.full((n, k), -1)
+
+    def merge(rows, candidates, offset):
+        values = np.concatenate([best[rows], candidates], axis=1)
+        index = np.concatenate([partner[rows], np.broadcast_to(np.arange(candidates.shape[1]) + offset, candidates.shape)], axis=1)
+        keep = np.argpartition(values, k - 1, axis=1)[:, :k]
+        best[rows] = np.take_along_axis(values, keep, axis=1)
+        partner[rows] = np.take_along_axis(index, keep, axis=1)
+
+    if k > 0:
+        for a, b, tile in _tiles(z, mask, block_size):
+            tile = np.where(np.isnan(tile), np.inf, tile)
+            if a == b:
+                np.fill_diagonal(tile, np.inf)
+            merge(a, tile, b.start)
+            if a != b:
+                merge(b, tile.T, a.start)
+
+    order = np.lexsort((partner, best), axis=1) if k > 0 else np.empty((n, 0), dtype=int)
+    best = np.take_along_axis(best, order, axis=1)
+    partner = np.take_along_axis(partner, order, axis=1)
+    found = np.isfinite(best)
+    columns = np.asarray(frame.columns)
+    ticker = np.repeat(np.arange(n), k).reshape(n, k)
+    rank = np.broadcast_to(np.arange(1, k + 1), (n, k))
+    return pd.DataFrame({'ticker': columns[ticker[found]], 'rank': rank[found],
+                         'partner': columns[partner[found]], 'correlation': best[found]}, columns=TOP_K_COLUMNS)
+
+# Screen several return horizons at once: {name: frame} -> {name: pair table}
+def screen(horizons, threshold=-0.5, top_k=None, block_size=512, order='correlation'):
+    if top_k is not None:
+        return {name: top_k_negative(frame, top_k, block_size) for name, frame in horizons.items()}
+    return {name: pairs_below(frame, threshold, block_size, order) for name, frame in horizons.items()}
@@ -0,0 +1,118 @@
+# rolling_correlation.py
+#
+# Rolling correlation matrix over a sliding window of daily returns, kept up
+# to date one trading day at a time. For every pair it holds the running
+# observation count, sums, sums of squares and cross-products, so a new day
+# costs O(n^2) (add the new row, remove the one leaving the window) instead
+# of recomputing the window. The sums are rebuilt from the window every
+# `window` days so floating point drift never accumulates. Missing values
+# are handled pairwise, like DataFrame.rolling(window).corr().
+#
+# Memory is a few n x n float arrays, so this suits universes of hundreds of
+# tickers; use pair_screener for one-off screens of thousands.
+
+import numpy as np
+import pandas as pd
+
+EVENT_COLUMNS = ['date', 'ticker_1', 'ticker_2', 'correlation', 'event']
+
+class RollingCorrelation:
+    def __init__(self, columns, window, threshold=-0.5, min_periods=None):
+        self.columns = pd.Index(columns)
+        self.window = window
+        self.threshold = threshold
+        self.min_periods = window if min_periods is None else min_periods
+        n = len(self.columns)
+        self._buffer = np.full((window, n), np.nan)
+        self._appended = 0
+        self._count = np.zeros((n, n))
+        self._sum = np.zeros((n, n))  # [i, j]: sum of x_i over days where i and j are both present
+        self._sum_sq = np.zeros((n, n))
+        self._cross = np.zeros((n, n))
+        # Pairs are reported once, with ticker_1 the later column (as pair_screener does)
+        self._lower = np.tril(np.ones((n, n), dtype=bool), k=-1)
+        self._below = np.zeros((n, n), dtype=bool)
+        self._events = []
+        self.date = None
+
+    def _apply(self, row, sign):
+        present = ~np.isnan(row)
+        x = np.where(present, row, 0.0)
+        m = present.astype(float)
+        self._count += sign * np.outer(m, m)
+        self._sum += sign * np.outer(x, m)
+        self._sum_sq += sign * np.outer(x * x, m)
+        self._cross += sign * np.outer(x, x)
+
+    def _rebuild(self):
+        present = ~np.isnan(self._buffer)
+        x = np.where(present, self._buffer, 0.0)
+        m = present.astype(float)
+        self._count = m.T @ m
+        self._sum = x.T @ m
+        self._sum_sq = (x * x).T @ m
+        self._cross = x.T @ x
+
+    # Current correlation matrix as an array (NaN where a pair has fewer than min_periods days)
+    def correlation(self):
+        count = self._count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = self._cross - self._sum * self._sum.T / count
+            var = self._sum_sq - self._sum * self._sum / count
+            corr = cov / np.sqrt(var * var.T)
+        corr[count < max(self.min_periods, 2)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    # Add one trading day of returns (a Series is aligned on the columns)
+    # and record pairs that crossed the threshold on that day
+    def update(self, date, row):
+        if isinstance(row, pd.Series):
+            row = row.reindex(self.columns)
+        row = np.asarray(row, dtype=float)
+        slot = self._appended % self.window
+        if self._appended >= self.window:
+            self._apply(self._buffer[slot], -1.0)
+        self._buffer[slot] = row
+        self._appended += 1
+        if self._appended % self.window == 0:
+            self._rebuild()
+        else:
+            self._apply(row, 1.0)
+        self.date = date
+
+        corr = self.correlation()
+        with np.errstate(invalid='ignore'):
+            below = (corr < self.threshold) & self._lower
+        first, second = np.nonzero(below != self._below)
+        for i, j in zip(first, second):
+            self._events.append((date, self.columns[i], self.columns[j], corr[i, j], 'enter' if below[i, j] else 'exit'))
+        self._below = below
+        return corr
+
+    # Add several days (rows of a frame indexed by date)
+    def extend(self, frame):
+        frame = frame.reindex(columns=self.columns)
+        for date, row in zip(frame.index, frame.to_numpy(dtype=float)):
+            self.update(date, row)
+        return self
+
+    def matrix(self):
+        return pd.DataFrame(self.correlation(), index=self.columns, columns=self.columns)
+
+    # Pairs below the threshold right now, most negative first
+    def pairs_below(self):
+        corr = self.correlation()
+        first, second = np.nonzero(self._below)
+        values = corr[first, second]
+        order = np.argsort(values, kind='stable')
+        return pd.DataFrame({'ticker_1': self.columns[first[order]], 'ticker_2': self.columns[second[order]],
+                             'correlation': values[order]})
+
+    # Every threshold crossing so far: 'enter' when a pair drops below the
+    # threshold, 'exit' when it rises back above it (or runs out of data)
+    def events(self):
+        return pd.DataFrame(self._events, columns=EVENT_COLUMNS)
+
+# Threshold crossings of the rolling correlation over a whole frame
+def crossing_events(frame, window, threshold=-0.5, min_periods=None):
+    return RollingCorrelation(frame.columns, window, threshold, min_periods).extend(frame).events()